@@ -0,0 +1,202 @@
+"""
+Cold storage for the messages of inactive chat sessions.
+
+Archived messages are serialized as JSON lines, zlib-compressed as one frame
+per session, and appended to numbered segment files in
+``CHAT_ARCHIVE['DIR']``. Segments are append-only and roll over once they
+exceed ``CHAT_ARCHIVE['SEGMENT_SIZE']``. The session row records the segment,
+offset and length of its frame, so a cold read is a single slice of a
+memory-mapped file plus one decompress.
+
+When an archived session gets a new message, its history is copied back into
+the database and the frame is simply abandoned.
+"""
+import fcntl
+import json
+import mmap
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ChatMessages, ChatSession
+from .signals import messages_restored
+
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.jsonl.z'
+
+
+class SegmentStore:
+    """
+    Append-only segment files with cached read-only memory maps.
+
+    At most ``max_maps`` segments stay mapped; the least recently read one is
+    closed to make room for another.
+    """
+
+    def __init__(self, directory, segment_size, max_maps=16):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_maps = max_maps
+        self._maps = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _current_segment(self):
+        names = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+        if names and os.path.getsize(self._path(names[-1])) < self.segment_size:
+            return names[-1]
+        number = int(names[-1][len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) + 1 if names else 1
+        return f'{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}'
+
+    def append(self, frame):
+        """Durably append ``frame`` and return ``(segment, offset, length)``."""
+        os.makedirs(self.directory, exist_ok=True)
+        name = self._current_segment()
+        with open(self._path(name), 'ab') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(frame)
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return name, offset, len(frame)
+
+    def read(self, name, offset, length):
+        with self._lock:
+            mapped = self._maps.get(name)
+            if mapped is None or offset + length > len(mapped):
+                # Not mapped yet, or the segment grew since it was mapped;
+                # remap to its current size.
+                with open(self._path(name), 'rb') as f:
+                    new = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if mapped is not None:
+                    mapped.close()
+                mapped = self._maps[name] = new
+                while len(self._maps) > self.max_maps:
+                    self._maps.popitem(last=False)[1].close()
+            self._maps.move_to_end(name)
+            # Slicing copies, so nothing refers to the map once it's closed.
+            return mapped[offset:offset + length]
+
+    def close(self):
+        """Unmap every cached segment."""
+        with self._lock:
+            while self._maps:
+                self._maps.popitem()[1].close()
+
+
+store = SegmentStore(
+    settings.CHAT_ARCHIVE['DIR'],
+    settings.CHAT_ARCHIVE['SEGMENT_SIZE'],
+    settings.CHAT_ARCHIVE['MAX_OPEN_SEGMENTS'],
+)
+
+
+def encode_messages(messages):
+    lines = (
+        json.dumps({
+            'id': message.pk,
+            'message': message.message,
+            'author': message.author,
+            'date': message.date.isoformat(),
+        }, separators=(',', ':'))
+        for message in messages
+    )
+    return zlib.compress('\n'.join(lines).encode(), 6)
+
+
+def decode_messages(session, frame):
+    data = zlib.decompress(frame).decode()
+    messages = []
+    for line in data.splitlines():
+        record = json.loads(line)
+        messages.append(ChatMessages(
+            id=record['id'],
+            session=session,
+            message=record['message'],
+            author=record['author'],
+            date=datetime.fromisoformat(record['date']),
+        ))
+    return messages
+
+
+def archive_session(session):
+    """
+    Move a session's messages into cold storage.
+
+    The frame is written before the database is touched, so a failure leaves
+    at worst an unreferenced frame in the segment, never lost messages.
+    Returns the number of archived messages.
+    """
+    messages = list(session.messages.order_by('id'))
+    if not messages:
+        return 0
+    segment, offset, length = store.append(encode_messages(messages))
+    with transaction.atomic():
+        locked = ChatSession.objects.select_for_update().get(pk=session.pk)
+        if locked.is_archived or locked.last_activity_at != session.last_activity_at:
+            # Someone wrote to the session meanwhile; leave it hot.
+            return 0
+        # Delete by session, not by the snapshot's ids: a message posted
+        # after the snapshot would otherwise stay behind, hidden from the
+        # archived history.
+        deleted = ChatMessages.objects.filter(session=session).delete()[1].get(ChatMessages._meta.label, 0)
+        if deleted != len(messages):
+            transaction.set_rollback(True)
+            return 0
+        ChatSession.objects.filter(pk=session.pk).update(
+            archived_at=timezone.now(),
+            archive_segment=segment,
+            archive_offset=offset,
+            archive_length=length,
+        )
+    return len(messages)
+
+
+def archived_messages(session):
+    """Read an archived session's history straight from its segment."""
+    frame = store.read(session.archive_segment, session.archive_offset, session.archive_length)
+    return decode_messages(session, frame)
+
+
+def get_history(session):
+    """
+    Messages of ``session``: a queryset, or a list read from cold storage if
+    the session is archived.
+    """
+    if session.is_archived:
+        return archived_messages(session)
+    return session.messages.all()
+
+
+@transaction.atomic
+def unarchive_session(session):
+    """Copy an archived session's messages back into the database."""
+    locked = ChatSession.objects.select_for_update().get(pk=session.pk)
+    if not locked.is_archived:
+        return
+    messages = ChatMessages.objects.bulk_create(archived_messages(locked), batch_size=500)
+    ChatSession.objects.filter(pk=session.pk).update(
+        archived_at=None,
+        archive_segment='',
+        archive_offset=None,
+        archive_length=None,
+    )
+    session.archived_at = None
+    session.archive_segment = ''
+    session.archive_offset = None
+    session.archive_length = None
+    messages_restored.send(sender=ChatSession, session=session, messages=messages)
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from chat.archive import archive_session
+from chat.models import ChatSession
+
+
+class Command(BaseCommand):
+    help = "Move messages of inactive chat sessions into compressed cold-storage segments."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--inactive-days',
+            type=int,
+            default=settings.CHAT_ARCHIVE['INACTIVE_AFTER'].days,
+            help='Archive sessions without activity for this many days.',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Archive at most this many sessions in one run.',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['inactive_days'])
+        sessions = ChatSession.objects.filter(
+            archived_at__isnull=True,
+            last_activity_at__lt=cutoff,
+        ).order_by('last_activity_at')
+        if options['limit']:
+            sessions = sessions[:options['limit']]
+
+        archived_sessions = archived_messages = 0
+        for session in sessions.iterator():
+            count = archive_session(session)
+            if count:
+                archived_sessions += 1
+                archived_messages += count
+        self.stdout.write(f'Archived {archived_messages} messages from {archived_sessions} sessions')
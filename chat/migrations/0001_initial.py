@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:49
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic_name', models.CharField(blank=True, max_length=255, verbose_name='topic name')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('last_activity_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='last activity at')),
+                ('archived_at', models.DateTimeField(blank=True, null=True, verbose_name='archived at')),
+                ('archive_segment', models.CharField(blank=True, max_length=64)),
+                ('archive_offset', models.BigIntegerField(blank=True, null=True)),
+                ('archive_length', models.IntegerField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChatMessages',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.TextField(verbose_name='message')),
+                ('author', models.CharField(choices=[('User', 'User'), ('ChatBot', 'ChatBot')], help_text='Tracks whether the user or the chat bot wrote the message.', max_length=16, verbose_name='author')),
+                ('date', models.DateTimeField(default=django.utils.timezone.now, verbose_name='date')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='chat.chatsession')),
+            ],
+            options={
+                'verbose_name_plural': 'chat messages',
+                'ordering': ('date', 'id'),
+            },
+        ),
+    ]
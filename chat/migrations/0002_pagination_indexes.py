@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessages',
+            index=models.Index(fields=['session', 'date', 'id'], name='chat_message_session_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(fields=['user', 'last_activity_at', 'id'], name='chat_session_user_activity_idx'),
+        ),
+    ]
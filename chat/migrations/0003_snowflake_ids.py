@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:52
+
+import core.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='chatmessages',
+            options={'ordering': ('id',), 'verbose_name_plural': 'chat messages'},
+        ),
+        migrations.RemoveIndex(
+            model_name='chatmessages',
+            name='chat_message_session_date_idx',
+        ),
+        migrations.AlterField(
+            model_name='chatmessages',
+            name='id',
+            field=core.fields.SnowflakeField(),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessages',
+            index=models.Index(fields=['session', 'id'], name='chat_message_session_id_idx'),
+        ),
+    ]
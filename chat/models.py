@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from core.fields import SnowflakeField
+
+
+class Author(models.TextChoices):
+    USER = 'User', _('User')
+    CHATBOT = 'ChatBot', _('ChatBot')
+
+
+class ChatSession(models.Model):
+    """
+    A chat conversation between a user and the assistant.
+
+    Once a session has been inactive for a while its messages are moved out
+    of the database into a compressed segment file (see chat/archive.py);
+    the ``archive_*`` fields locate that frame.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='chat_sessions',
+    )
+    topic_name = models.CharField(_('topic name'), max_length=255, blank=True)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    last_activity_at = models.DateTimeField(_('last activity at'), auto_now_add=True, db_index=True)
+
+    archived_at = models.DateTimeField(_('archived at'), null=True, blank=True)
+    archive_segment = models.CharField(max_length=64, blank=True)
+    archive_offset = models.BigIntegerField(null=True, blank=True)
+    archive_length = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of a user's sessions, most recent first.
+            models.Index(fields=['user', 'last_activity_at', 'id'], name='chat_session_user_activity_idx'),
+        ]
+
+    def __str__(self):
+        return self.topic_name or f'Session {self.pk}'
+
+    @property
+    def is_archived(self):
+        return self.archived_at is not None
+
+
+class ChatMessages(models.Model):
+    """
+    A single message within a chat session. Ids are time-ordered (see
+    core/snowflake.py), so the history is sorted by ``id`` alone.
+    """
+    id = SnowflakeField()
+    session = models.ForeignKey(
+        ChatSession,
+        on_delete=models.CASCADE,
+        related_name='messages',
+    )
+    message = models.TextField(_('message'))
+    author = models.CharField(
+        _('author'),
+        max_length=16,
+        choices=Author.choices,
+        help_text=_('Tracks whether the user or the chat bot wrote the message.'),
+    )
+    # Not auto_now_add: restored archive rows must keep their original date.
+    date = models.DateTimeField(_('date'), default=timezone.now)
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name_plural = 'chat messages'
+        indexes = [
+            # Keyset pagination of a session's history.
+            models.Index(fields=['session', 'id'], name='chat_message_session_id_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.author}: {self.message[:50]}'
@@ -0,0 +1,40 @@
+from rest_framework import serializers
+
+from core.fields import SnowflakeIdField
+
+from .models import ChatMessages, ChatSession
+
+
+class ChatSessionSerializer(serializers.ModelSerializer):
+    """
+    Serializer for chat sessions.
+
+    Fields:
+        id: The unique identifier for the session (read-only)
+        topic_name: Free-form topic of the conversation
+        created_at: When the session was started (read-only)
+        last_activity_at: When the last message was posted (read-only)
+        is_archived: Whether the history currently lives in cold storage (read-only)
+    """
+    class Meta:
+        model = ChatSession
+        fields = ('id', 'topic_name', 'created_at', 'last_activity_at', 'is_archived')
+        read_only_fields = ('created_at', 'last_activity_at', 'is_archived')
+
+
+class ChatMessageSerializer(serializers.ModelSerializer):
+    """
+    Serializer for chat messages.
+
+    Fields:
+        id: The unique identifier for the message, a string (read-only)
+        message: The message text
+        author: Who wrote the message (User or ChatBot)
+        date: When the message was posted (read-only)
+    """
+    id = SnowflakeIdField()
+
+    class Meta:
+        model = ChatMessages
+        fields = ('id', 'message', 'author', 'date')
+        read_only_fields = ('date',)
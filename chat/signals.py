@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent after an archived session's history has been bulk-restored to the
+# database (bulk_create does not send post_save). Provides ``session`` and
+# ``messages``.
+messages_restored = Signal()
@@ -0,0 +1,140 @@
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from users.models import User
+
+from . import archive
+from .archive import SegmentStore, archive_session, get_history, unarchive_session
+from .models import ChatMessages, ChatSession
+from .signals import messages_restored
+
+
+class TempDirMixin:
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+
+
+class SegmentStoreTests(TempDirMixin, SimpleTestCase):
+    def store(self, **kwargs):
+        store = SegmentStore(self.directory, segment_size=100, **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def test_rolls_over_once_a_segment_reaches_its_size(self):
+        store = self.store()
+        frames = [bytes([i]) * 60 for i in range(4)]
+        locations = [store.append(frame) for frame in frames]
+        self.assertEqual(locations, [
+            ('segment-000001.jsonl.z', 0, 60),
+            # Still under SEGMENT_SIZE, so the segment takes one more frame.
+            ('segment-000001.jsonl.z', 60, 60),
+            ('segment-000002.jsonl.z', 0, 60),
+            ('segment-000002.jsonl.z', 60, 60),
+        ])
+        self.assertEqual([store.read(*location) for location in locations], frames)
+
+    def test_remaps_a_segment_that_grew(self):
+        store = self.store()
+        first = store.append(b'a' * 10)
+        self.assertEqual(store.read(*first), b'a' * 10)
+        mapped = store._maps[first[0]]
+        second = store.append(b'b' * 10)
+        self.assertEqual(store.read(*second), b'b' * 10)
+        self.assertTrue(mapped.closed)
+        self.assertEqual(len(store._maps), 1)
+
+    def test_least_recently_read_map_is_closed(self):
+        store = self.store(max_maps=2)
+        names = [store.append(b'x' * 100)[0] for _ in range(3)]
+        for name in (names[0], names[1], names[0]):
+            store.read(name, 0, 100)
+        maps = dict(store._maps)
+        self.assertEqual(store.read(names[2], 0, 100), b'x' * 100)
+        self.assertEqual(list(store._maps), [names[0], names[2]])
+        self.assertTrue(maps[names[1]].closed)
+        self.assertFalse(maps[names[0]].closed)
+        # An evicted segment is mapped again on its next read.
+        self.assertEqual(store.read(names[1], 0, 100), b'x' * 100)
+        self.assertTrue(maps[names[0]].closed)
+
+
+class ArchiveTests(TempDirMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='archivist@example.com', password='x')
+
+    def setUp(self):
+        super().setUp()
+        store = SegmentStore(self.directory, segment_size=1024)
+        self.addCleanup(store.close)
+        patcher = mock.patch.object(archive, 'store', store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.session = ChatSession.objects.create(user=self.user, topic_name='old')
+        start = timezone.now() - timedelta(days=60)
+        self.messages = [
+            ChatMessages.objects.create(
+                session=self.session, message=f'message {i} ✓', author=author, date=start + timedelta(minutes=i),
+            )
+            for i, author in enumerate(['User', 'ChatBot', 'User'])
+        ]
+
+    def fields(self, messages):
+        return [(m.pk, m.session_id, m.message, m.author, m.date) for m in messages]
+
+    def test_round_trip(self):
+        self.assertEqual(archive_session(self.session), 3)
+        self.session.refresh_from_db()
+        self.assertTrue(self.session.is_archived)
+        self.assertFalse(ChatMessages.objects.exists())
+
+        history = get_history(self.session)
+        self.assertIsInstance(history, list)
+        self.assertEqual(self.fields(history), self.fields(self.messages))
+
+        receiver = mock.Mock()
+        messages_restored.connect(receiver, sender=ChatSession)
+        self.addCleanup(messages_restored.disconnect, receiver, sender=ChatSession)
+        unarchive_session(self.session)
+        self.assertFalse(self.session.is_archived)
+        self.session.refresh_from_db()
+        self.assertFalse(self.session.is_archived)
+        self.assertEqual(self.session.archive_segment, '')
+        self.assertEqual(self.fields(get_history(self.session)), self.fields(self.messages))
+        receiver.assert_called_once()
+        self.assertEqual(self.fields(receiver.call_args.kwargs['messages']), self.fields(self.messages))
+
+    def test_empty_and_archived_sessions_are_skipped(self):
+        empty = ChatSession.objects.create(user=self.user)
+        self.assertEqual(archive_session(empty), 0)
+        archive_session(self.session)
+        self.assertEqual(archive_session(self.session), 0)
+
+    def test_session_written_to_meanwhile_stays_hot(self):
+        ChatSession.objects.filter(pk=self.session.pk).update(last_activity_at=timezone.now())
+        self.assertEqual(archive_session(self.session), 0)
+        self.session.refresh_from_db()
+        self.assertFalse(self.session.is_archived)
+        self.assertEqual(ChatMessages.objects.count(), 3)
+
+    def test_message_posted_after_the_snapshot_rolls_the_archive_back(self):
+        append = archive.store.append
+
+        def racing_append(frame):
+            # Posted once the history was read, without the activity bump
+            # having committed yet.
+            ChatMessages.objects.create(session=self.session, message='late', author='User')
+            return append(frame)
+        with mock.patch.object(archive.store, 'append', side_effect=racing_append):
+            self.assertEqual(archive_session(self.session), 0)
+        self.session.refresh_from_db()
+        self.assertFalse(self.session.is_archived)
+        self.assertEqual(self.session.archive_segment, '')
+        self.assertEqual(ChatMessages.objects.filter(session=self.session).count(), 4)
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'chat'
+
+urlpatterns = [
+    path('sessions/', views.ChatSessionListCreateView.as_view(), name='session_list'),
+    path('sessions/<int:session_id>/messages/', views.ChatMessageListCreateView.as_view(), name='message_list'),
+]
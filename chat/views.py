@@ -0,0 +1,121 @@
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import generics, permissions, status
+
+from core.pagination import paginated
+from users.schemas import RESPONSES, get_error_response
+
+from .archive import get_history, unarchive_session
+from .models import ChatSession
+from .serializers import ChatMessageSerializer, ChatSessionSerializer
+
+
+class ChatSessionListCreateView(generics.ListCreateAPIView):
+    """
+    get:
+    List the authenticated user's chat sessions
+
+    post:
+    Start a new chat session
+    """
+    serializer_class = ChatSessionSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    ordering = ('-last_activity_at', '-id')
+
+    def get_queryset(self):
+        return ChatSession.objects.filter(user=self.request.user).order_by(*self.ordering)
+
+    @swagger_auto_schema(
+        operation_description="List the authenticated user's chat sessions",
+        responses={
+            status.HTTP_200_OK: paginated(ChatSessionSerializer)(),
+            **{k: v for k, v in RESPONSES.items() if k in ['401_UNAUTHORIZED']}
+        },
+        tags=['Chat']
+    )
+    def get(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_description="Start a new chat session",
+        request_body=ChatSessionSerializer,
+        responses={
+            status.HTTP_201_CREATED: ChatSessionSerializer(),
+            status.HTTP_400_BAD_REQUEST: get_error_response(
+                'Validation Error',
+                {'topic_name': ['Ensure this field has no more than 255 characters.']}
+            ),
+            **{k: v for k, v in RESPONSES.items() if k in ['401_UNAUTHORIZED']}
+        },
+        tags=['Chat']
+    )
+    def post(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class ChatMessageListCreateView(generics.ListCreateAPIView):
+    """
+    get:
+    Retrieve the message history of a chat session
+
+    Archived sessions are read transparently from cold storage.
+
+    post:
+    Post a message to a chat session
+
+    Posting to an archived session restores its history to the database first.
+    """
+    serializer_class = ChatMessageSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    ordering = ('id',)
+
+    def get_session(self, for_update=False):
+        queryset = ChatSession.objects.select_for_update() if for_update else ChatSession.objects
+        return get_object_or_404(
+            queryset,
+            pk=self.kwargs['session_id'],
+            user=self.request.user,
+        )
+
+    @swagger_auto_schema(
+        operation_description="Retrieve the message history of a chat session",
+        responses={
+            status.HTTP_200_OK: paginated(ChatMessageSerializer)(),
+            **{k: v for k, v in RESPONSES.items() if k in ['401_UNAUTHORIZED', '404_NOT_FOUND']}
+        },
+        tags=['Chat']
+    )
+    def get(self, request, *args, **kwargs):
+        page = self.paginate_queryset(get_history(self.get_session()))
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    @swagger_auto_schema(
+        operation_description="Post a message to a chat session",
+        request_body=ChatMessageSerializer,
+        responses={
+            status.HTTP_201_CREATED: ChatMessageSerializer(),
+            status.HTTP_400_BAD_REQUEST: get_error_response(
+                'Validation Error',
+                {'message': ['This field is required.']}
+            ),
+            **{k: v for k, v in RESPONSES.items() if k in ['401_UNAUTHORIZED', '404_NOT_FOUND']}
+        },
+        tags=['Chat']
+    )
+    def post(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        # Locked until the activity bump commits, so archive_session() can't
+        # archive the history between the insert and the bump.
+        session = self.get_session(for_update=True)
+        if session.is_archived:
+            unarchive_session(session)
+        serializer.save(session=session)
+        ChatSession.objects.filter(pk=session.pk).update(last_activity_at=timezone.now())
@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after setup: the scheduler loads models and settings.
+from tasks.scheduler import SchedulerLifespan  # noqa: E402
+
+application = SchedulerLifespan(django_application)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,10 +45,18 @@ INSTALLED_APPS = [
     
     # Local apps
     'users.apps.UsersConfig',
+    'chat.apps.ChatConfig',
+    'tasks.apps.TasksConfig',
+    'search.apps.SearchConfig',
+    'tests.apps.TestsConfig',
+    'core.apps.CoreConfig',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -86,6 +95,28 @@ DATABASES = {
     }
 }
 
+# Read replicas, see core/routers.py. Safe-method requests read from a
+# healthy replica unless the client wrote within STICKY_FOR. To try it
+# locally, add a file copy of the SQLite database and refresh it with
+# `manage.py sync_sqlite_replicas`:
+#
+#   DATABASES['replica'] = {
+#       'ENGINE': 'django.db.backends.sqlite3',
+#       'NAME': BASE_DIR / 'db.replica.sqlite3',
+#       'TEST': {'MIRROR': 'default'},
+#   }
+#   DATABASE_REPLICAS['ALIASES'] = ['replica']
+#
+# STICKY_FOR pins are kept in the default cache, which must be shared
+# between processes (e.g. Redis) when running more than one worker.
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+DATABASE_REPLICAS = {
+    'ALIASES': [],
+    'STICKY_FOR': timedelta(seconds=10),
+    'HEALTH_CHECK_INTERVAL': 5,
+    'MAX_LAG': 5,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -123,11 +154,26 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Time-ordered ids for high-insert tables (core.fields.SnowflakeField), see
+# core/snowflake.py. Each process leases its own node id from the database
+# for LEASE_TIMEOUT and renews it halfway through; host clocks must agree to
+# well within that. NODE_ID pins the id a process leases (it fails to start
+# if another process holds it); None takes any free one. EPOCH must never
+# change once ids have been issued.
+SNOWFLAKE = {
+    'EPOCH': datetime(2025, 1, 1, tzinfo=timezone.utc),
+    'NODE_ID': None,
+    'LEASE_TIMEOUT': timedelta(minutes=1),
+}
+
 # Custom user model
 AUTH_USER_MODEL = 'users.User'
 
@@ -139,18 +185,92 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Keyset pagination for every list endpoint, see core/pagination.py.
+    # Clients may ask for up to KeysetPagination.max_page_size rows.
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+    'PAGE_SIZE': 20,
 }
 
 # JWT Settings
-from datetime import timedelta
-
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'UPDATE_LAST_LOGIN': True,
-    'ALGORITHM': 'HS256',
-    'SIGNING_KEY': SECRET_KEY,
+    'ALGORITHM': 'EdDSA',
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
+
+# Asymmetric signing keys, see users/keys.py. Run
+# `manage.py rotate_signing_keys` from cron; new keys are published at
+# /api/auth/jwks/ ROTATION_LEAD before they start signing tokens.
+JWT_KEYS = {
+    'KEY_DIR': BASE_DIR / 'keys',
+    'ROTATION_LEAD': timedelta(hours=1),
+}
+
+# Cold storage for messages of inactive chat sessions, see chat/archive.py.
+# At most MAX_OPEN_SEGMENTS segment files are kept memory-mapped per process.
+CHAT_ARCHIVE = {
+    'DIR': BASE_DIR / 'archive' / 'chat',
+    'INACTIVE_AFTER': timedelta(days=30),
+    'SEGMENT_SIZE': 64 * 1024 * 1024,
+    'MAX_OPEN_SEGMENTS': 16,
+}
+
+# Expiry of coding tasks, see tasks/scheduler.py. Runs inside the ASGI
+# application; deadlines are kept in a timing wheel of LEVELS levels of
+# 2**SLOT_BITS slots, TICK seconds apart (about 3 days at the defaults,
+# longer deadlines wait in a heap). Tasks started by other processes are
+# picked up every SYNC_INTERVAL seconds.
+TASK_SCHEDULER = {
+    'ENABLED': True,
+    'TICK': 1.0,
+    'SLOT_BITS': 6,
+    'LEVELS': 3,
+    'BATCH_SIZE': 500,
+    'SYNC_INTERVAL': 15,
+}
+
+# Question sets of tests, see tests/questions.py. Cached for
+# QUESTION_SET_TIMEOUT seconds under a key that changes with every edit to
+# the test's questions, so a per-process cache never serves stale sets.
+TESTS = {
+    'QUESTION_SET_TIMEOUT': 3600,
+}
+
+# Response compression, see core/middleware.py. ENCODINGS is the server's
+# order of preference; br and zstd need the brotli and zstandard packages.
+# Cacheable bodies are compressed once at CACHED_LEVELS and kept in CACHE.
+# EXCLUDE_PATHS return tokens and are not compressed (BREACH).
+COMPRESSION = {
+    'ENCODINGS': ('zstd', 'br', 'gzip'),
+    'MIN_SIZE': 1024,
+    'LEVELS': {'br': 4, 'zstd': 3, 'gzip': 6},
+    'CACHED_LEVELS': {'br': 9, 'zstd': 12, 'gzip': 9},
+    'CACHE': 'default',
+    'CACHE_TIMEOUT': 3600,
+    'CACHE_MAX_SIZE': 1024 * 1024,
+    'CONTENT_TYPES': (
+        'text/', 'application/json', 'application/javascript', 'application/xml',
+        'application/openapi', 'application/vnd.oai', 'image/svg+xml',
+    ),
+    'EXCLUDE_PATHS': ('/api/auth/login/', '/api/auth/register/', '/api/auth/token/'),
+}
+
+# On-demand request profiling, see core/profiling.py. Requests carrying an
+# `X-Profile` header from `manage.py profiles token`, or picked at
+# SAMPLE_RATE under PATHS, are sampled every INTERVAL seconds and written to
+# DIR as 'collapsed' stacks or 'speedscope' JSON. Only the newest
+# MAX_PROFILES files are kept (None keeps everything).
+PROFILING = {
+    'ENABLED': False,
+    'DIR': BASE_DIR / 'profiles',
+    'SAMPLE_RATE': 0.0,
+    'PATHS': ('/api/auth/login/', '/api/auth/token/refresh/'),
+    'INTERVAL': 0.001,
+    'FORMAT': 'collapsed',
+    'TOKEN_MAX_AGE': 3600,
+    'MAX_PROFILES': 500,
+}
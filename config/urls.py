@@ -26,6 +26,10 @@ urlpatterns = [
     
     # API Endpoints
     path('api/auth/', include('users.urls')),
+    path('api/chat/', include('chat.urls')),
+    path('api/search/', include('search.urls')),
+    path('api/tasks/', include('tasks.urls')),
+    path('api/tests/', include('tests.urls')),
     # Add other app URLs here as you create them
 ]
 
@@ -0,0 +1,130 @@
+"""
+Content codings for response compression.
+
+gzip is always available; br and zstd are offered when the ``brotli`` and
+``zstandard`` packages are installed. Every codec can compress a whole body
+at once or a stream chunk by chunk, flushing after each chunk so a client
+can decode everything sent so far (needed for server-sent events).
+"""
+import gzip
+import re
+import zlib
+from dataclasses import dataclass
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class GzipStream:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliStream:
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ZstdStream:
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+@dataclass(frozen=True)
+class Codec:
+    name: str
+    compress: object
+    stream: type
+
+
+CODECS = {'gzip': Codec('gzip', lambda data, level: gzip.compress(data, level, mtime=0), GzipStream)}
+if brotli is not None:
+    CODECS['br'] = Codec('br', lambda data, level: brotli.compress(data, quality=level), BrotliStream)
+if zstandard is not None:
+    CODECS['zstd'] = Codec(
+        'zstd', lambda data, level: zstandard.ZstdCompressor(level=level).compress(data), ZstdStream
+    )
+
+ETAG_SUFFIX_RE = re.compile(r'-(%s)"' % '|'.join(re.escape(name) for name in ('br', 'zstd', 'gzip')))
+
+
+def negotiate(accept_encoding, encodings):
+    """
+    Pick the coding for an Accept-Encoding header from ``encodings``, which
+    is in order of preference. Returns None if the client accepts none.
+    """
+    weights = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for name in encodings:
+        quality = weights.get(name, weights.get('*', 0.0))
+        # Ties go to the earlier, preferred coding.
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def tag_etag(etag, encoding):
+    """ETag of the ``encoding`` variant: ``"v1"`` becomes ``"v1-gzip"``."""
+    return etag[:-1] + f'-{encoding}"' if etag.endswith('"') else etag
+
+
+def untag_etags(header):
+    """
+    Strip variant suffixes from an If-Match/If-None-Match header. Returns
+    the header and the coding that was stripped, if any.
+    """
+    match = ETAG_SUFFIX_RE.search(header)
+    return ETAG_SUFFIX_RE.sub('"', header), match.group(1) if match else None
+
+
+def compress_sequence(chunks, stream):
+    for chunk in chunks:
+        data = stream.compress(chunk)
+        if data:
+            yield data
+    yield stream.finish()
+
+
+async def acompress_sequence(chunks, stream):
+    async for chunk in chunks:
+        data = stream.compress(chunk)
+        if data:
+            yield data
+    yield stream.finish()
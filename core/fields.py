@@ -0,0 +1,44 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+
+from . import snowflake
+
+
+class SnowflakeField(models.BigIntegerField):
+    """
+    Primary key holding a time-ordered id from ``core.snowflake``, assigned
+    when the model is instantiated rather than by the database.
+    """
+    description = _('Time-ordered 64-bit id')
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('primary_key', True)
+        kwargs.setdefault('default', snowflake.next_id)
+        kwargs.setdefault('editable', False)
+        kwargs.setdefault('verbose_name', 'ID')
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        for key, value in (
+            ('primary_key', True),
+            ('default', snowflake.next_id),
+            ('editable', False),
+            ('verbose_name', 'ID'),
+        ):
+            if kwargs.get(key) == value:
+                del kwargs[key]
+        # primary_key implies serialize=False, which deconstruct() then records.
+        kwargs.pop('serialize', None)
+        return name, path, args, kwargs
+
+
+class SnowflakeIdField(serializers.CharField):
+    """
+    Read-only serializer field rendering a ``SnowflakeField`` as a string:
+    64-bit ids exceed the integers JavaScript can represent exactly.
+    """
+    def __init__(self, **kwargs):
+        kwargs.setdefault('read_only', True)
+        super().__init__(**kwargs)
@@ -0,0 +1,67 @@
+import os
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import profiling
+
+
+class Command(BaseCommand):
+    help = (
+        "Inspect request profiles written by ProfilingMiddleware: list recent "
+        "profiles, summarize one, prune old ones, or print an X-Profile header token."
+    )
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='action', required=True)
+        list_parser = subparsers.add_parser('list', help='List the most recent profiles.')
+        list_parser.add_argument('--limit', type=int, default=20)
+        summary_parser = subparsers.add_parser('summary', help='Show the hottest frames of a profile.')
+        summary_parser.add_argument('name', help='Profile id (the X-Profile-Id response header) or file name.')
+        summary_parser.add_argument('--top', type=int, default=15)
+        prune_parser = subparsers.add_parser('prune', help='Delete all but the most recent profiles.')
+        prune_parser.add_argument(
+            '--keep', type=int, default=settings.PROFILING['MAX_PROFILES'],
+            required=settings.PROFILING['MAX_PROFILES'] is None,
+            help='Number of profiles to keep (default: PROFILING["MAX_PROFILES"]).',
+        )
+        subparsers.add_parser('token', help='Print a value for the X-Profile request header.')
+
+    def handle(self, *args, **options):
+        getattr(self, f'handle_{options["action"]}')(**options)
+
+    def handle_list(self, limit, **options):
+        for name in profiling.profile_files()[:limit]:
+            self.stdout.write(name)
+
+    def handle_summary(self, name, top, **options):
+        matches = [file_name for file_name in profiling.profile_files() if file_name.startswith(name)]
+        if not matches:
+            raise CommandError(f'No profile named {name!r} in {settings.PROFILING["DIR"]}.')
+        path = os.path.join(settings.PROFILING['DIR'], matches[0])
+        stacks = profiling.read_profile(path)
+        total = sum(stacks.values())
+        if not total:
+            self.stdout.write(f'{matches[0]}: no samples')
+            return
+
+        own, inclusive = Counter(), Counter()
+        for stack, weight in stacks.items():
+            own[stack[-1]] += weight
+            # Count recursive frames once per stack.
+            for frame in set(stack):
+                inclusive[frame] += weight
+
+        self.stdout.write(matches[0])
+        for title, counter in (('Self', own), ('Total', inclusive)):
+            self.stdout.write(f'\n{title:>6}  Frame')
+            for frame, weight in counter.most_common(top):
+                self.stdout.write(f'{weight / total:>6.1%}  {frame}')
+
+    def handle_prune(self, keep, **options):
+        deleted = profiling.prune_profiles(keep)
+        self.stdout.write(f'Deleted {deleted} profiles.')
+
+    def handle_token(self, **options):
+        self.stdout.write(profiling.make_token())
@@ -0,0 +1,34 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database over every SQLite replica in "
+        "DATABASE_REPLICAS, for exercising replica routing locally."
+    )
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('The primary database is not SQLite.')
+
+        for alias in settings.DATABASE_REPLICAS['ALIASES']:
+            replica = settings.DATABASES[alias]
+            if replica['ENGINE'] != 'django.db.backends.sqlite3':
+                self.stdout.write(f'Skipping {alias}: not SQLite')
+                continue
+            connections[alias].close()
+            # The backup API takes a consistent snapshot even while the
+            # primary is being written to.
+            source = sqlite3.connect(primary['NAME'])
+            target = sqlite3.connect(replica['NAME'])
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+            self.stdout.write(f'Copied {primary["NAME"]} to {replica["NAME"]} ({alias})')
@@ -0,0 +1,265 @@
+import hashlib
+import random
+import re
+import threading
+import time
+
+import jwt
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from rest_framework_simplejwt.settings import api_settings
+
+from . import compression, profiling
+from .routers import pool, replica_reads_allowed, replicas_used
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'db_primary_pin'
+# Cache-Control directives that let shared caches store a response.
+SHARED_CACHE_RE = re.compile(r'\b(public|s-maxage=[1-9]|max-age=[1-9])')
+
+
+class RetryOnPrimary(HttpResponse):
+    """Returned by ReplicaRoutingMiddleware.process_exception; never sent."""
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Allow replica reads for safe requests, except for clients that wrote
+    within ``DATABASE_REPLICAS['STICKY_FOR']`` (read-your-writes).
+
+    A client counts as having written recently if it carries the pin cookie
+    set after a successful unsafe request, if its user id was pinned in the
+    cache by such a request, or if its access token was issued within the
+    window (so register, login and refresh are covered for token clients).
+
+    If a request that read from a replica fails with a database error, the
+    replicas it used are marked unhealthy and the request is run again
+    through the rest of the middleware stack with every read on the
+    primary, instead of answering 500 until the next health check.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS['ALIASES']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sticky_for = int(settings.DATABASE_REPLICAS['STICKY_FOR'].total_seconds())
+
+    def __call__(self, request):
+        safe = request.method in SAFE_METHODS
+        token = replica_reads_allowed.set(safe and not self.is_pinned(request))
+        used_token = replicas_used.set(set())
+        try:
+            response = self.get_response(request)
+            if isinstance(response, RetryOnPrimary):
+                # Only safe requests read from replicas, so running them
+                # again has no side effects.
+                replica_reads_allowed.set(False)
+                response = self.get_response(request)
+        finally:
+            replicas_used.reset(used_token)
+            replica_reads_allowed.reset(token)
+
+        if not safe and response.status_code < 400:
+            response.set_cookie(PIN_COOKIE, '1', max_age=self.sticky_for, httponly=True, samesite='Lax')
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                cache.set(self.cache_key(user.pk), True, self.sticky_for)
+        return response
+
+    def process_exception(self, request, exception):
+        used = replicas_used.get()
+        if not isinstance(exception, DatabaseError) or not used:
+            return None
+        for alias in used:
+            pool.mark_unhealthy(alias)
+            try:
+                connections[alias].close()
+            except DatabaseError:
+                pass
+        used.clear()
+        # Unwinds the inner middleware like any response; __call__ then runs
+        # the request again.
+        return RetryOnPrimary(status=503)
+
+    def cache_key(self, user_id):
+        return f'db-primary-pin:{user_id}'
+
+    def token_claims(self, request):
+        header = request.META.get('HTTP_AUTHORIZATION', '').split()
+        if len(header) != 2 or header[0] not in api_settings.AUTH_HEADER_TYPES:
+            return None
+        try:
+            # Only used to pick a database; authentication verifies it later.
+            return jwt.decode(header[1], options={'verify_signature': False})
+        except jwt.InvalidTokenError:
+            return None
+
+    def is_pinned(self, request):
+        if PIN_COOKIE in request.COOKIES:
+            return True
+        claims = self.token_claims(request)
+        if claims is None:
+            return False
+        if time.time() - claims.get('iat', 0) < self.sticky_for:
+            return True
+        user_id = claims.get(api_settings.USER_ID_CLAIM)
+        return user_id is not None and bool(cache.get(self.cache_key(user_id)))
+
+
+class ProfilingMiddleware:
+    """
+    Profile selected requests with ``core.profiling.StackSampler``.
+
+    A request is profiled when it carries a valid ``X-Profile`` header (see
+    ``manage.py profiles token``) or is picked at ``PROFILING['SAMPLE_RATE']``
+    among requests under ``PROFILING['PATHS']``. When ``PROFILING['ENABLED']``
+    is false the middleware removes itself from the stack.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING['SAMPLE_RATE']
+        self.paths = tuple(settings.PROFILING['PATHS'])
+        self.interval = settings.PROFILING['INTERVAL']
+        self.output_format = settings.PROFILING['FORMAT']
+
+    def should_profile(self, request):
+        header = request.META.get('HTTP_X_PROFILE')
+        if header:
+            return profiling.check_token(header)
+        if self.paths and not request.path.startswith(self.paths):
+            return False
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        started_at = timezone.now()
+        start = time.perf_counter()
+        sampler = profiling.StackSampler(threading.get_ident(), self.interval)
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+        duration = time.perf_counter() - start
+
+        name = profiling.profile_name(started_at, request.method, request.path, duration, sum(stacks.values()))
+        profiling.write_profile(name, stacks, self.interval, self.output_format)
+        response['X-Profile-Id'] = name
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Compress response bodies with the best coding the client accepts, in
+    ``COMPRESSION['ENCODINGS']`` order.
+
+    Streaming responses, including server-sent events, are compressed chunk
+    by chunk and never buffered. Other bodies are skipped below
+    ``MIN_SIZE`` bytes. A cacheable body (with an ETag, or publicly
+    cacheable) is compressed once at ``CACHED_LEVELS`` and the result kept
+    in the cache, keyed by a hash of the body.
+
+    Each variant gets its own strong ETag (``"v1"`` becomes ``"v1-br"``);
+    the suffix is stripped from If-Match/If-None-Match before the view
+    compares validators.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = settings.COMPRESSION
+        self.encodings = [name for name in config['ENCODINGS'] if name in compression.CODECS]
+        if not self.encodings:
+            raise MiddlewareNotUsed
+        self.min_size = config['MIN_SIZE']
+        self.levels = config['LEVELS']
+        self.cached_levels = config['CACHED_LEVELS']
+        self.cache = caches[config['CACHE']]
+        self.cache_timeout = config['CACHE_TIMEOUT']
+        self.cache_max_size = config['CACHE_MAX_SIZE']
+        self.exclude_paths = tuple(config['EXCLUDE_PATHS'])
+        self.content_types = tuple(config['CONTENT_TYPES'])
+
+    def __call__(self, request):
+        stripped = None
+        for header in ('HTTP_IF_MATCH', 'HTTP_IF_NONE_MATCH'):
+            if header in request.META:
+                request.META[header], encoding = compression.untag_etags(request.META[header])
+                stripped = stripped or encoding
+
+        response = self.get_response(request)
+
+        if response.status_code == 304:
+            if stripped and response.has_header('ETag'):
+                response['ETag'] = compression.tag_etag(response['ETag'], stripped)
+            return response
+        if not self.is_compressible(request, response):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = compression.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.encodings)
+        if encoding is None:
+            return response
+        codec = compression.CODECS[encoding]
+
+        if response.streaming:
+            stream = codec.stream(self.levels[encoding])
+            if response.is_async:
+                response.streaming_content = compression.acompress_sequence(response.streaming_content, stream)
+            else:
+                response.streaming_content = compression.compress_sequence(response.streaming_content, stream)
+            # The compressed length isn't known up front.
+            del response['Content-Length']
+        else:
+            body = self.compress(response, codec)
+            if len(body) >= len(response.content):
+                return response
+            response.content = body
+            response['Content-Length'] = str(len(body))
+
+        response['Content-Encoding'] = encoding
+        if response.has_header('ETag'):
+            response['ETag'] = compression.tag_etag(response['ETag'], encoding)
+        return response
+
+    def is_compressible(self, request, response):
+        if response.has_header('Content-Encoding') or response.status_code == 206:
+            return False
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return False
+        if request.path.startswith(self.exclude_paths):
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        return content_type.startswith(self.content_types)
+
+    def is_cacheable(self, response):
+        if len(response.content) > self.cache_max_size:
+            return False
+        cache_control = response.get('Cache-Control', '')
+        if 'no-store' in cache_control:
+            return False
+        if response.has_header('ETag'):
+            return True
+        return 'private' not in cache_control and bool(SHARED_CACHE_RE.search(cache_control))
+
+    def compress(self, response, codec):
+        if not self.is_cacheable(response):
+            return codec.compress(response.content, self.levels[codec.name])
+        digest = hashlib.blake2b(response.content, digest_size=16).hexdigest()
+        key = f'compressed:{codec.name}:{digest}'
+        body = self.cache.get(key)
+        if body is None:
+            body = codec.compress(response.content, self.cached_levels[codec.name])
+            self.cache.set(key, body, self.cache_timeout)
+        return body
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnowflakeNodes',
+            fields=[
+                ('node_id', models.PositiveSmallIntegerField(primary_key=True, serialize=False, verbose_name='node id')),
+                ('owner', models.CharField(help_text='host:pid:token of the leasing process.', max_length=255, verbose_name='owner')),
+                ('expires_at', models.DateTimeField(verbose_name='expires at')),
+            ],
+            options={
+                'verbose_name_plural': 'snowflake nodes',
+            },
+        ),
+    ]
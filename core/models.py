@@ -0,0 +1,20 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class SnowflakeNodes(models.Model):
+    """
+    A snowflake node id leased by one process, see ``core.snowflake``.
+
+    The row is never deleted: a lease that is not renewed simply expires
+    and the id can be claimed again.
+    """
+    node_id = models.PositiveSmallIntegerField(_('node id'), primary_key=True)
+    owner = models.CharField(_('owner'), max_length=255, help_text=_('host:pid:token of the leasing process.'))
+    expires_at = models.DateTimeField(_('expires at'))
+
+    class Meta:
+        verbose_name_plural = 'snowflake nodes'
+
+    def __str__(self):
+        return f'{self.node_id} ({self.owner})'
@@ -0,0 +1,181 @@
+"""
+Keyset pagination for every list endpoint.
+
+Pages are ordered by the view's ``ordering`` (default ``('-pk',)``), whose
+last field must make the order unique, and each page starts right after the
+key of the previous page's last row:
+
+    WHERE date >= :date AND (date > :date OR (date = :date AND id > :id))
+    ORDER BY date, id LIMIT :page_size + 1
+
+With an index on the ordering fields (behind any equality filters such as
+the owner), every page costs the same however deep it is, and rows inserted
+or deleted meanwhile never shift a page. Cursors are opaque to clients.
+Totals are only computed when asked for with ``?count=true``. Tables with
+time-ordered ids (core/snowflake.py) are paged on ``('id',)`` alone.
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.db.models import Q
+from django.utils.encoding import force_str
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, replace_query_param
+from rest_framework.response import Response
+
+
+class KeysetPagination(CursorPagination):
+    ordering = ('-pk',)
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+    count_query_description = _('Set to true to include the total number of results.')
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'ordering', None) or self.ordering
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        ordering = tuple(ordering)
+        assert len({field.startswith('-') for field in ordering}) == 1, (
+            'Keyset pagination needs every ordering field sorted in the same direction.'
+        )
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Return one page of ``queryset``. Plain lists are paged in memory with
+        the same cursors, for results that do not come from the database.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.descending = self.ordering[0].startswith('-')
+        self.fields = [name.lstrip('-') for name in self.ordering]
+
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() in ('1', 'true'):
+            self.count = len(queryset) if isinstance(queryset, list) else queryset.count()
+
+        position, self.reverse = self.decode_cursor(request, queryset)
+        # Walking backwards flips the sort; the page is put back in order below.
+        descending = self.descending != self.reverse
+
+        if isinstance(queryset, list):
+            rows = sorted(queryset, key=self._key, reverse=descending)
+            if position is not None:
+                rows = [
+                    obj for obj in rows
+                    if (self._key(obj) < position if descending else self._key(obj) > position)
+                ]
+            rows = rows[:self.page_size + 1]
+        else:
+            queryset = queryset.order_by(*(('-' if descending else '') + name for name in self.fields))
+            if position is not None:
+                queryset = queryset.filter(self._after(position, descending))
+            rows = list(queryset[:self.page_size + 1])
+
+        has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+            self.has_previous, self.has_next = has_more, position is not None
+        else:
+            self.has_previous, self.has_next = position is not None, has_more
+        return self.page
+
+    def _after(self, position, descending):
+        """Filter for rows strictly after ``position`` in the given direction."""
+        lookup = 'lt' if descending else 'gt'
+        # (a > x) OR (a = x AND (b > y OR ...)), behind a plain range on the
+        # first field so the database can seek the index instead of scanning.
+        condition = Q(**{f'{self.fields[-1]}__{lookup}': position[-1]})
+        for name, value in reversed(list(zip(self.fields[:-1], position[:-1]))):
+            condition = Q(**{f'{name}__{lookup}': value}) | (Q(**{name: value}) & condition)
+        if len(self.fields) > 1:
+            condition &= Q(**{f'{self.fields[0]}__{lookup}e': position[0]})
+        return condition
+
+    def _key(self, obj):
+        return tuple(getattr(obj, name) for name in self.fields)
+
+    def _field(self, queryset, name):
+        model = queryset[0].__class__ if isinstance(queryset, list) else queryset.model
+        return model._meta.pk if name == 'pk' else model._meta.get_field(name)
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            reverse, *values = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            if len(values) != len(self.fields) or (isinstance(queryset, list) and not queryset):
+                raise ValueError
+            position = tuple(
+                self._field(queryset, name).to_python(value)
+                for name, value in zip(self.fields, values)
+            )
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(reverse)
+
+    def encode_cursor(self, obj, reverse):
+        values = [
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in self._key(obj)
+        ]
+        encoded = urlsafe_b64encode(json.dumps([int(reverse), *values]).encode()).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        response = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+        }
+        if self.count is not None:
+            response['count'] = self.count
+        response['results'] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count'] = {
+            'type': 'integer',
+            'nullable': True,
+            'description': force_str(self.count_query_description),
+        }
+        return response_schema
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [{
+            'name': self.count_query_param,
+            'required': False,
+            'in': 'query',
+            'description': force_str(self.count_query_description),
+            'schema': {'type': 'boolean'},
+        }]
+
+
+def paginated(serializer_class):
+    """
+    Serializer describing a ``KeysetPagination`` page of ``serializer_class``,
+    for documenting list responses in ``swagger_auto_schema``.
+    """
+    return type(f'Paginated{serializer_class.__name__}', (serializers.Serializer,), {
+        'next': serializers.URLField(allow_null=True, help_text=_('Link to the next page.')),
+        'previous': serializers.URLField(allow_null=True, help_text=_('Link to the previous page.')),
+        'count': serializers.IntegerField(required=False, help_text=_('Total results, only with ?count=true.')),
+        'results': serializer_class(many=True),
+    })
@@ -0,0 +1,172 @@
+"""
+Statistical profiling of individual requests.
+
+A background thread snapshots the request thread's Python stack every
+``PROFILING['INTERVAL']`` seconds via ``sys._current_frames()``; the request
+itself runs uninstrumented, so overhead is one stack walk per interval.
+Profiles are written as collapsed stacks (flamegraph.pl, speedscope and most
+flame graph tools read them) or as speedscope JSON.
+"""
+import json
+import os
+import re
+import sys
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+
+SIGNING_SALT = 'core.profiling'
+COLLAPSED_SUFFIX = '.collapsed'
+SPEEDSCOPE_SUFFIX = '.speedscope.json'
+
+
+class StackSampler(threading.Thread):
+    """Samples the stack of ``thread_id`` until stopped."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='request-profiler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        current_frames = sys._current_frames
+        while not self._stopped.wait(self.interval):
+            frame = current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        return self.stacks
+
+
+def frame_label(frame):
+    name, filename, lineno = frame
+    for prefix in sorted(sys.path, key=len, reverse=True):
+        if prefix and filename.startswith(prefix + os.sep):
+            filename = filename[len(prefix) + 1:]
+            break
+    # ';' separates frames in the collapsed format.
+    return f'{name} ({filename}:{lineno})'.replace(';', ':')
+
+
+def make_token():
+    """Value for the ``X-Profile`` header that makes the next requests profiled."""
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign('profile')
+
+
+def check_token(value):
+    try:
+        signing.TimestampSigner(salt=SIGNING_SALT).unsign(
+            value, max_age=settings.PROFILING['TOKEN_MAX_AGE']
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def profile_name(started_at, method, path, duration, samples):
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', path).strip('_') or 'root'
+    return f'{started_at:%Y%m%dT%H%M%S.%f}-{method}-{slug}-{duration * 1000:.0f}ms-{samples}'
+
+
+def profile_files():
+    """Names of the profiles in ``PROFILING['DIR']``, newest first."""
+    directory = settings.PROFILING['DIR']
+    if not os.path.isdir(directory):
+        return []
+    names = [name for name in os.listdir(directory) if name.endswith((COLLAPSED_SUFFIX, SPEEDSCOPE_SUFFIX))]
+    # Names start with the request's start time, so they sort chronologically.
+    return sorted(names, reverse=True)
+
+
+def prune_profiles(keep):
+    """Delete all but the ``keep`` newest profiles. Returns the number deleted."""
+    deleted = 0
+    for name in profile_files()[keep:]:
+        try:
+            os.remove(os.path.join(settings.PROFILING['DIR'], name))
+        except FileNotFoundError:
+            # Pruned by a concurrent request.
+            continue
+        deleted += 1
+    return deleted
+
+
+def write_profile(name, stacks, interval, output_format):
+    """
+    Write a profile to ``PROFILING['DIR']`` and return its path, then prune
+    the directory down to ``PROFILING['MAX_PROFILES']`` files.
+    """
+    directory = settings.PROFILING['DIR']
+    os.makedirs(directory, exist_ok=True)
+    if output_format == 'speedscope':
+        path = os.path.join(directory, name + SPEEDSCOPE_SUFFIX)
+        frames, index, samples, weights = [], {}, [], []
+        for stack, count in stacks.items():
+            sample = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({'name': frame[0], 'file': frame[1], 'line': frame[2]})
+                sample.append(index[frame])
+            samples.append(sample)
+            weights.append(count * interval * 1000)
+        document = {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': sum(weights),
+                'samples': samples,
+                'weights': weights,
+            }],
+        }
+        with open(path, 'w') as f:
+            json.dump(document, f)
+    else:
+        path = os.path.join(directory, name + COLLAPSED_SUFFIX)
+        with open(path, 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(';'.join(frame_label(frame) for frame in stack) + f' {count}\n')
+    if settings.PROFILING['MAX_PROFILES'] is not None:
+        prune_profiles(settings.PROFILING['MAX_PROFILES'])
+    return path
+
+
+def read_profile(path):
+    """
+    Return a Counter of ``tuple(frame labels) -> weight`` for a profile file.
+    Weights are sample counts for collapsed files and milliseconds for
+    speedscope files.
+    """
+    stacks = Counter()
+    if path.endswith(SPEEDSCOPE_SUFFIX):
+        with open(path) as f:
+            document = json.load(f)
+        frames = [
+            frame_label((frame['name'], frame.get('file', ''), frame.get('line', 0)))
+            for frame in document['shared']['frames']
+        ]
+        profile = document['profiles'][0]
+        for sample, weight in zip(profile['samples'], profile['weights']):
+            stacks[tuple(frames[i] for i in sample)] += weight
+    else:
+        with open(path) as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                stacks[tuple(stack.split(';'))] += int(count)
+    return stacks
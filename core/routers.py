@@ -0,0 +1,107 @@
+"""
+Primary/replica database routing.
+
+Reads go to a healthy replica only while serving a safe-method request
+(GET/HEAD/OPTIONS) for a client that has not written recently; everything
+else - writes, unsafe requests, management commands, background jobs - uses
+``default``. The request-scoped decision is made by
+``core.middleware.ReplicaRoutingMiddleware``.
+"""
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+PRIMARY = 'default'
+
+# True while handling a request whose reads may be served by a replica.
+replica_reads_allowed = ContextVar('replica_reads_allowed', default=False)
+# Replica aliases the current request has read from (a set, or None outside
+# a request), so a database error can be blamed on them.
+replicas_used = ContextVar('replicas_used', default=None)
+
+
+class ReplicaPool:
+    """
+    Tracks which replicas are usable.
+
+    A replica is checked at most once per ``check_interval`` seconds; it is
+    unhealthy if the probe fails or, on PostgreSQL, if replay lag exceeds
+    ``max_lag`` seconds.
+    """
+
+    def __init__(self, aliases, check_interval, max_lag):
+        self.aliases = list(aliases)
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self._status = {}
+        self._lock = threading.Lock()
+
+    def _probe(self, alias):
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    cursor.execute(
+                        'SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)'
+                    )
+                    return cursor.fetchone()[0] <= self.max_lag
+                # Touch a real table so a missing or unreadable copy fails.
+                cursor.execute('SELECT 1 FROM django_migrations LIMIT 1')
+                return True
+        except Exception:
+            return False
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        healthy, checked_at = self._status.get(alias, (False, None))
+        if checked_at is None or now - checked_at >= self.check_interval:
+            with self._lock:
+                healthy = self._probe(alias)
+                self._status[alias] = (healthy, now)
+        return healthy
+
+    def mark_unhealthy(self, alias):
+        """Skip ``alias`` until its next health check is due."""
+        self._status[alias] = (False, time.monotonic())
+
+    def choose(self):
+        healthy = [alias for alias in self.aliases if self.is_healthy(alias)]
+        return random.choice(healthy) if healthy else None
+
+
+pool = ReplicaPool(
+    settings.DATABASE_REPLICAS['ALIASES'],
+    check_interval=settings.DATABASE_REPLICAS['HEALTH_CHECK_INTERVAL'],
+    max_lag=settings.DATABASE_REPLICAS['MAX_LAG'],
+)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Follow-up reads from an object stay on the database it came from.
+            return instance._state.db
+        if not replica_reads_allowed.get() or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        alias = pool.choose()
+        if alias is None:
+            return PRIMARY
+        used = replicas_used.get()
+        if used is not None:
+            used.add(alias)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
@@ -0,0 +1,308 @@
+"""
+Time-ordered 64-bit ids, generated in the application.
+
+An id packs, from the most significant bit down:
+
+    1 bit   always 0, so ids fit a signed bigint
+    41 bits milliseconds since SNOWFLAKE['EPOCH'] (about 69 years)
+    10 bits node id
+    12 bits sequence within the millisecond
+
+Ids are assigned in Python before the INSERT, so ``bulk_create`` needs no
+returned keys and inserts never contend on a database sequence. Ids from
+one process strictly increase; across processes they are ordered by
+creation time to the millisecond, which makes the primary key alone a
+usable keyset cursor and time index (see ``id_range``).
+
+Every process generating ids at the same time needs its own node id, so
+each process leases one in the ``SnowflakeNodes`` table before its first id
+(see ``NodeLease``). SNOWFLAKE['NODE_ID'] pins the id to lease instead; a
+process whose id is held by another, or that finds all of them taken,
+raises ImproperlyConfigured rather than risk generating duplicates.
+"""
+import atexit
+import os
+import random
+import secrets
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+from django.utils import timezone
+
+TIMESTAMP_BITS = 41
+NODE_BITS = 10
+SEQUENCE_BITS = 12
+
+MAX_NODE = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+TIMESTAMP_SHIFT = NODE_BITS + SEQUENCE_BITS
+
+
+def epoch_ms():
+    return int(settings.SNOWFLAKE['EPOCH'].timestamp() * 1000)
+
+
+class SnowflakeGenerator:
+    """Thread-safe generator of ids for one node."""
+
+    def __init__(self, node_id, epoch, clock=time.time_ns):
+        if not 0 <= node_id <= MAX_NODE:
+            raise ValueError(f'Snowflake node id must be between 0 and {MAX_NODE}, got {node_id}.')
+        self.node_id = node_id
+        self.epoch = epoch
+        self.clock = clock
+        self.last = -1
+        self.sequence = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            now = self.clock() // 1_000_000 - self.epoch
+            if now > self.last:
+                self.last, self.sequence = now, 0
+            elif self.sequence < MAX_SEQUENCE:
+                # Same millisecond, or the clock stepped back: stay on the
+                # last timestamp so ids keep increasing.
+                self.sequence += 1
+            else:
+                # Sequence exhausted: borrow the next millisecond instead of
+                # waiting for it. The clock catches up within milliseconds.
+                self.last, self.sequence = self.last + 1, 0
+            return (self.last << TIMESTAMP_SHIFT) | (self.node_id << SEQUENCE_BITS) | self.sequence
+
+
+class NodeLease:
+    """
+    A node id held in the ``SnowflakeNodes`` table for ``timeout``.
+
+    ``get()`` claims an id on first use and renews the lease once half of
+    it has passed. The lease is only trusted until ``timeout`` after the
+    last successful claim or renewal was started; past that, ``get()``
+    raises instead of generating ids another process may have claimed.
+
+    Leases are written in autocommit: rolling back the caller's transaction
+    must not roll back the lease (see ``_refresh``).
+    """
+
+    def __init__(self, timeout, node_id=None):
+        if node_id is not None and not 0 <= node_id <= MAX_NODE:
+            raise ImproperlyConfigured(f"SNOWFLAKE['NODE_ID'] must be between 0 and {MAX_NODE}, got {node_id}.")
+        self.timeout = timeout
+        self.requested = node_id
+        self.pid = os.getpid()
+        self.owner = f'{socket.gethostname()}:{self.pid}:{secrets.token_hex(4)}'
+        self.node_id = None
+        self.renew_at = self.valid_until = 0
+        self.unconfirmed = False
+        self.lock = threading.Lock()
+
+    def get(self):
+        if self._due():
+            with self.lock:
+                if self._due():
+                    self._refresh()
+        return self.node_id
+
+    def _due(self):
+        return time.monotonic() >= self.renew_at or (
+            self.unconfirmed and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        )
+
+    def _refresh(self):
+        started = time.monotonic()
+        connection = connections[DEFAULT_DB_ALIAS]
+        update = self._claim if self.node_id is None else self._renew
+        try:
+            if not connection.in_atomic_block:
+                update()
+                unconfirmed = False
+            elif connection.vendor == 'sqlite':
+                # SQLite has a single writer, this transaction, so another
+                # connection would wait on it. Write the lease in it instead:
+                # no other process can claim an id until it ends, and once
+                # it has, committed or not, the lease is checked again.
+                with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                    update()
+                unconfirmed = True
+            else:
+                _isolated(update)
+                unconfirmed = False
+        except ImproperlyConfigured:
+            raise
+        except Exception:
+            # A failed renewal is retried on the next id while the lease
+            # still holds.
+            if started >= self.valid_until:
+                raise
+            return
+        seconds = self.timeout.total_seconds()
+        self.renew_at, self.valid_until = started + seconds / 2, started + seconds
+        self.unconfirmed = unconfirmed
+
+    def _claim(self):
+        from .models import SnowflakeNodes
+
+        now = timezone.now()
+        nodes = SnowflakeNodes.objects.using(DEFAULT_DB_ALIAS)
+        held = dict(nodes.values_list('node_id', 'expires_at'))
+        if self.requested is not None:
+            candidates = [self.requested]
+        else:
+            # Never-used ids first, in random order so concurrent claims
+            # rarely race for the same one.
+            unused = [node for node in range(MAX_NODE + 1) if node not in held]
+            expired = [node for node, expires_at in held.items() if expires_at <= now]
+            random.shuffle(unused)
+            random.shuffle(expired)
+            candidates = unused + expired
+        for node in candidates:
+            if node not in held:
+                try:
+                    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                        nodes.create(node_id=node, owner=self.owner, expires_at=now + self.timeout)
+                except IntegrityError:
+                    continue
+            elif held[node] > now or not nodes.filter(
+                node_id=node, expires_at=held[node],
+            ).update(owner=self.owner, expires_at=now + self.timeout):
+                continue
+            self.node_id = node
+            return
+        if self.requested is not None:
+            holder = nodes.get(node_id=self.requested)
+            raise ImproperlyConfigured(
+                f"Snowflake node id {self.requested} from SNOWFLAKE['NODE_ID'] is leased by {holder.owner} "
+                f'until {holder.expires_at:%Y-%m-%d %H:%M:%S}. Give every process its own NODE_ID, or leave '
+                'it unset to lease a free one.'
+            )
+        raise ImproperlyConfigured(f'All {MAX_NODE + 1} snowflake node ids are leased by other processes.')
+
+    def _renew(self):
+        from .models import SnowflakeNodes
+
+        renewed = SnowflakeNodes.objects.using(DEFAULT_DB_ALIAS).filter(
+            node_id=self.node_id, owner=self.owner,
+        ).update(expires_at=timezone.now() + self.timeout)
+        if not renewed:
+            # The lease expired (the process was idle or stalled) or the
+            # claim was rolled back, and the id may be another process's now.
+            self.node_id = None
+            self._claim()
+
+    def release(self):
+        """
+        Let the id go a second from now, so a restarted process can lease
+        it without waiting out the timeout. The second covers milliseconds
+        the generator may have borrowed ahead of the clock.
+        """
+        from .models import SnowflakeNodes
+
+        if self.node_id is None or os.getpid() != self.pid:
+            return
+        try:
+            SnowflakeNodes.objects.using(DEFAULT_DB_ALIAS).filter(node_id=self.node_id, owner=self.owner).update(
+                expires_at=timezone.now() + timedelta(seconds=1),
+            )
+        except Exception:
+            pass  # It expires on its own.
+
+
+def _isolated(fn):
+    """
+    Run ``fn`` on a new thread, hence on a database connection of its own,
+    outside the caller's transaction.
+    """
+    outcome = {}
+
+    def target():
+        try:
+            fn()
+        except Exception as exc:
+            outcome['error'] = exc
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=target, name='snowflake-lease')
+    thread.start()
+    thread.join()
+    if 'error' in outcome:
+        raise outcome['error']
+
+
+_generator = None
+_lease = None
+_generator_lock = threading.Lock()
+
+
+def get_generator():
+    """This process's generator, with its node id leased and current."""
+    global _generator, _lease
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                lease = NodeLease(settings.SNOWFLAKE['LEASE_TIMEOUT'], settings.SNOWFLAKE['NODE_ID'])
+                generator = SnowflakeGenerator(lease.get(), epoch_ms())
+                atexit.register(lease.release)
+                _lease, _generator = lease, generator
+    # Renewing may move to another node id if the lease was lost. Switch
+    # under the generator's lock, re-reading the lease there so a thread
+    # holding an older node id can't switch back after a newer one.
+    if _lease.get() != _generator.node_id:
+        with _generator.lock:
+            _generator.node_id = _lease.node_id
+    return _generator
+
+
+def _reset_after_fork():
+    # A forked worker must lease its own node id rather than continue its
+    # parent's sequence under the parent's.
+    global _generator, _lease, _generator_lock
+    _generator, _lease, _generator_lock = None, None, threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def next_id():
+    """A new id. Used as the default of ``core.fields.SnowflakeField``."""
+    return get_generator()()
+
+
+def timestamp_ms(snowflake):
+    return (snowflake >> TIMESTAMP_SHIFT) + epoch_ms()
+
+
+def to_datetime(snowflake):
+    """When ``snowflake`` was generated, as an aware UTC datetime."""
+    return settings.SNOWFLAKE['EPOCH'] + timedelta(milliseconds=snowflake >> TIMESTAMP_SHIFT)
+
+
+def node_id(snowflake):
+    return (snowflake >> SEQUENCE_BITS) & MAX_NODE
+
+
+def min_id(moment):
+    """The smallest id that can be generated at or after ``moment``."""
+    if isinstance(moment, datetime):
+        moment = int(moment.timestamp() * 1000)
+    return max(moment - epoch_ms(), 0) << TIMESTAMP_SHIFT
+
+
+def id_range(start=None, end=None):
+    """
+    Lookups selecting ids generated in ``[start, end)``, for example
+    ``ChatMessages.objects.filter(**id_range(start=yesterday))``.
+    Rows inserted before their table switched to snowflake ids have small
+    ids and count as older than the epoch.
+    """
+    lookups = {}
+    if start is not None:
+        lookups['pk__gte'] = min_id(start)
+    if end is not None:
+        lookups['pk__lt'] = min_id(end)
+    return lookups
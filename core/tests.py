@@ -0,0 +1,748 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+import zlib
+from base64 import urlsafe_b64encode
+from collections import Counter
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+import jwt
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import condition
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from chat.models import ChatSession
+from users.models import User
+
+from . import compression, profiling, snowflake
+from .compression import negotiate, tag_etag, untag_etags
+from .middleware import PIN_COOKIE, CompressionMiddleware, ProfilingMiddleware, ReplicaRoutingMiddleware
+from .models import SnowflakeNodes
+from .pagination import KeysetPagination
+from .routers import pool
+from .snowflake import MAX_NODE, MAX_SEQUENCE, TIMESTAMP_SHIFT, NodeLease, SnowflakeGenerator
+
+
+class View:
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(email='pager@example.com', password='x')
+        start = timezone.now().replace(microsecond=0)
+        ChatSession.objects.bulk_create([ChatSession(user=user, topic_name=f's{i}') for i in range(23)])
+        # Three sessions per timestamp, so pages break inside runs of equal
+        # leading values.
+        for i, session in enumerate(ChatSession.objects.order_by('id')):
+            ChatSession.objects.filter(pk=session.pk).update(last_activity_at=start + timedelta(minutes=i // 3))
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.queryset = ChatSession.objects.all()
+
+    def page(self, url, ordering, queryset=None, **params):
+        paginator = KeysetPagination()
+        request = Request(self.factory.get(url, params))
+        page = paginator.paginate_queryset(
+            self.queryset if queryset is None else queryset, request, View(ordering)
+        )
+        return [session.topic_name for session in page], paginator
+
+    def walk(self, ordering, link='next', queryset=None, url='/sessions/', page_size=5):
+        """Follow ``link`` from ``url`` to the end; returns every page."""
+        pages = []
+        while url:
+            query = parse_qs(urlsplit(url).query)
+            params = {'page_size': page_size}
+            if 'cursor' in query:
+                params['cursor'] = query['cursor'][0]
+            names, paginator = self.page('/sessions/', ordering, queryset, **params)
+            pages.append(names)
+            url = paginator.get_next_link() if link == 'next' else paginator.get_previous_link()
+        return pages
+
+    def cursor(self, url):
+        return {'cursor': parse_qs(urlsplit(url).query)['cursor'][0]}
+
+    def last_paginator(self, ordering, queryset):
+        _, paginator = self.page('/sessions/', ordering, queryset, page_size=5)
+        while paginator.get_next_link():
+            _, paginator = self.page(
+                '/sessions/', ordering, queryset, page_size=5, **self.cursor(paginator.get_next_link())
+            )
+        return paginator
+
+    def expected(self, ordering):
+        return [session.topic_name for session in self.queryset.order_by(*ordering)]
+
+    def test_walks_every_row_once_with_repeated_leading_values(self):
+        for ordering in (('last_activity_at', 'id'), ('-last_activity_at', '-id')):
+            with self.subTest(ordering=ordering):
+                pages = self.walk(ordering)
+                self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+                self.assertEqual(sum(pages, []), self.expected(ordering))
+
+    def test_previous_links_walk_back_in_order(self):
+        ordering = ('-last_activity_at', '-id')
+        _, first = self.page('/sessions/', ordering, page_size=5)
+        self.assertIsNone(first.get_previous_link())
+        last = self.last_paginator(ordering, self.queryset)
+        self.assertIsNone(last.get_next_link())
+        pages = self.walk(ordering, link='previous', url=last.get_previous_link())
+        self.assertEqual(pages, self.walk(ordering)[-2::-1])
+
+    def test_reverse_cursor_page_links_both_ways(self):
+        ordering = ('last_activity_at', 'id')
+        _, first = self.page('/sessions/', ordering, page_size=5)
+        second, paginator = self.page('/sessions/', ordering, page_size=5, **self.cursor(first.get_next_link()))
+        back, reverse = self.page('/sessions/', ordering, page_size=5, **self.cursor(paginator.get_previous_link()))
+        self.assertEqual(back, self.expected(ordering)[:5])
+        self.assertIsNone(reverse.get_previous_link())
+        again, _ = self.page('/sessions/', ordering, page_size=5, **self.cursor(reverse.get_next_link()))
+        self.assertEqual(again, second)
+
+    def test_in_memory_list_pages_like_the_queryset(self):
+        rows = list(ChatSession.objects.order_by('?'))
+        for ordering in (('last_activity_at', 'id'), ('-last_activity_at', '-id')):
+            with self.subTest(ordering=ordering):
+                pages = self.walk(ordering, queryset=rows)
+                self.assertEqual(pages, self.walk(ordering))
+                last = self.last_paginator(ordering, rows)
+                self.assertEqual(
+                    self.walk(ordering, link='previous', queryset=rows, url=last.get_previous_link()),
+                    pages[-2::-1],
+                )
+
+    def test_count_and_page_size_cap(self):
+        names, paginator = self.page('/sessions/', ('id',), count='true', page_size=1000)
+        self.assertEqual(paginator.count, 23)
+        self.assertEqual(len(names), 23)
+        _, paginator = self.page('/sessions/', ('id',))
+        self.assertIsNone(paginator.count)
+        self.assertEqual(KeysetPagination.max_page_size, 100)
+
+    def test_invalid_cursors_are_not_found(self):
+        def encode(value):
+            return urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+        for cursor in (
+            'garbage',
+            urlsafe_b64encode(b'not json').decode(),
+            encode([0, 1]),
+            encode([0, '2026-01-01T00:00:00+00:00', 1, 2]),
+            encode([0, 'not a date', 1]),
+            encode({'reverse': 0}),
+        ):
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(NotFound):
+                    self.page('/sessions/', ('last_activity_at', 'id'), cursor=cursor)
+                with self.assertRaises(NotFound):
+                    self.page('/sessions/', ('last_activity_at', 'id'), queryset=[], cursor=cursor)
+
+
+class NodeLeaseTests(TransactionTestCase):
+    # Leases are written on their own connection, so they must be visible
+    # outside the test's transaction.
+    timeout = timedelta(minutes=1)
+
+    def test_concurrent_processes_get_distinct_ids(self):
+        leases = [NodeLease(self.timeout) for _ in range(20)]
+        nodes = {lease.get() for lease in leases}
+        self.assertEqual(len(nodes), 20)
+        self.assertEqual(
+            dict(SnowflakeNodes.objects.values_list('node_id', 'owner')),
+            {lease.node_id: lease.owner for lease in leases},
+        )
+
+    def test_pinned_id_held_elsewhere_fails_loudly(self):
+        NodeLease(self.timeout, node_id=7).get()
+        with self.assertRaisesMessage(ImproperlyConfigured, 'node id 7'):
+            NodeLease(self.timeout, node_id=7).get()
+
+    def test_expired_and_released_ids_are_reclaimed(self):
+        first = NodeLease(self.timeout, node_id=3)
+        first.get()
+        first.release()
+        SnowflakeNodes.objects.update(expires_at=timezone.now())
+        self.assertEqual(NodeLease(self.timeout, node_id=3).get(), 3)
+
+    def test_renewal_moves_on_when_the_id_was_taken(self):
+        lease = NodeLease(self.timeout, node_id=None)
+        node = lease.get()
+        SnowflakeNodes.objects.filter(node_id=node).update(owner='other', expires_at=timezone.now() + self.timeout)
+        lease.renew_at = 0
+        self.assertNotEqual(lease.get(), node)
+        self.assertEqual(SnowflakeNodes.objects.get(node_id=node).owner, 'other')
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'Elsewhere leases are written on their own connection.')
+    def test_claim_rolled_back_with_the_callers_transaction_is_made_again(self):
+        lease = NodeLease(self.timeout)
+        with transaction.atomic():
+            node = lease.get()
+            transaction.set_rollback(True)
+        self.assertFalse(SnowflakeNodes.objects.exists())
+        self.assertIsNotNone(lease.get())
+        self.assertEqual(SnowflakeNodes.objects.get().owner, lease.owner)
+        self.assertFalse(lease.unconfirmed)
+        self.assertIsNotNone(node)
+
+    def test_all_ids_taken(self):
+        expires_at = timezone.now() + self.timeout
+        SnowflakeNodes.objects.bulk_create(
+            [SnowflakeNodes(node_id=node, owner='other', expires_at=expires_at) for node in range(MAX_NODE + 1)]
+        )
+        with self.assertRaisesMessage(ImproperlyConfigured, 'All 1024'):
+            NodeLease(self.timeout).get()
+
+
+# A replica alias mirroring the test database, configured the way the
+# settings comment next to DATABASE_REPLICAS describes. Added on import, so
+# it exists before the test runner sets up databases.
+REPLICA = 'replica'
+settings.DATABASES[REPLICA] = {
+    **connections['default'].settings_dict,
+    'TEST': {**connections['default'].settings_dict['TEST'], 'MIRROR': 'default'},
+}
+
+
+@override_settings(DATABASE_REPLICAS={**settings.DATABASE_REPLICAS, 'ALIASES': [REPLICA]})
+class ReplicaRoutingTests(TransactionTestCase):
+    # The mirror is a connection of its own, so it only sees committed rows.
+    databases = {'default', REPLICA}
+
+    def setUp(self):
+        patcher = mock.patch.multiple(pool, aliases=[REPLICA], _status={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(email='reader@example.com', password='x')
+        ChatSession.objects.create(user=self.user, topic_name='existing')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('chat:session_list')
+
+    def request(self, method, **kwargs):
+        """Returns the response and the chat session queries run on each alias."""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = getattr(self.client, method)(self.url, **kwargs)
+
+        def sessions(queries):
+            return [query['sql'] for query in queries if 'chat_chatsession' in query['sql']]
+        return response, sessions(primary.captured_queries), sessions(replica.captured_queries)
+
+    def test_safe_reads_go_to_the_replica(self):
+        response, primary, replica = self.request('get')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertTrue(replica)
+        self.assertEqual(primary, [])
+
+    def test_writes_go_to_the_primary_and_pin_the_client(self):
+        response, primary, replica = self.request('post', data={'topic_name': 'new'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(any(sql.startswith('INSERT') for sql in primary))
+        self.assertEqual(replica, [])
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertTrue(cache.get(ReplicaRoutingMiddleware.cache_key(None, self.user.pk)))
+
+        # The cookie keeps the client's next reads on the primary.
+        response, primary, replica = self.request('get')
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertTrue(primary)
+        self.assertEqual(replica, [])
+
+    def test_unsafe_requests_never_read_from_the_replica(self):
+        session = ChatSession.objects.get()
+        url = reverse('chat:message_list', args=[session.pk])
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = self.client.post(url, {'message': 'hi', 'author': 'User'}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(replica.captured_queries, [])
+
+    def test_failing_replica_falls_back_to_the_primary(self):
+        pool._status[REPLICA] = (True, time.monotonic())
+        process_view = CsrfViewMiddleware.process_view
+        with mock.patch.object(connections[REPLICA], 'cursor', side_effect=OperationalError('replica gone')), \
+                mock.patch.object(CsrfViewMiddleware, 'process_view', autospec=True, side_effect=process_view) as csrf:
+            response, primary, _replica = self.request('get')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([session['topic_name'] for session in response.data['results']], ['existing'])
+        # The retry went through the view middleware again.
+        self.assertEqual(csrf.call_count, 2)
+        self.assertTrue(primary)
+        self.assertFalse(pool.is_healthy(REPLICA))
+
+
+@override_settings(DATABASE_REPLICAS={**settings.DATABASE_REPLICAS, 'ALIASES': [REPLICA]})
+class ReplicaPinningTests(TestCase):
+    def setUp(self):
+        self.middleware = ReplicaRoutingMiddleware(lambda request: HttpResponse())
+        self.factory = RequestFactory()
+        self.addCleanup(cache.clear)
+
+    def request(self, issued_ago=None, cookie=False):
+        request = self.factory.get('/')
+        if issued_ago is not None:
+            token = jwt.encode(
+                {'user_id': 7, 'iat': int(time.time() - issued_ago)}, 'a shared secret of at least 32 bytes',
+            )
+            request.META['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        if cookie:
+            request.COOKIES[PIN_COOKIE] = '1'
+        return request
+
+    def test_unpinned(self):
+        self.assertFalse(self.middleware.is_pinned(self.request()))
+        self.assertFalse(self.middleware.is_pinned(self.request(issued_ago=3600)))
+
+    def test_pinned_by_cookie(self):
+        self.assertTrue(self.middleware.is_pinned(self.request(cookie=True)))
+
+    def test_pinned_by_a_fresh_token(self):
+        self.assertTrue(self.middleware.is_pinned(self.request(issued_ago=1)))
+
+    def test_pinned_by_the_cache_after_a_write(self):
+        cache.set(self.middleware.cache_key(7), True, 10)
+        self.assertTrue(self.middleware.is_pinned(self.request(issued_ago=3600)))
+
+    def test_malformed_token_is_not_pinned(self):
+        request = self.factory.get('/', HTTP_AUTHORIZATION='Bearer not-a-jwt')
+        self.assertFalse(self.middleware.is_pinned(request))
+
+
+class NegotiateTests(SimpleTestCase):
+    encodings = ('zstd', 'br', 'gzip')
+
+    def test_highest_quality_wins(self):
+        self.assertEqual(negotiate('gzip;q=0.5, br;q=0.8', self.encodings), 'br')
+        self.assertEqual(negotiate('GZIP ; q=1, br;q=0.999', self.encodings), 'gzip')
+
+    def test_ties_go_to_the_preferred_coding(self):
+        self.assertEqual(negotiate('gzip, br', self.encodings), 'br')
+        self.assertEqual(negotiate('gzip, br', ('gzip', 'br')), 'gzip')
+
+    def test_wildcard_covers_codings_not_listed(self):
+        self.assertEqual(negotiate('*', self.encodings), 'zstd')
+        self.assertEqual(negotiate('gzip;q=0.5, *;q=0.2', self.encodings), 'gzip')
+        self.assertEqual(negotiate('zstd;q=0.1, *;q=0.2', self.encodings), 'br')
+
+    def test_zero_quality_refuses_a_coding(self):
+        self.assertIsNone(negotiate('gzip;q=0', self.encodings))
+        self.assertEqual(negotiate('*, zstd;q=0, br;q=0', self.encodings), 'gzip')
+        self.assertIsNone(negotiate('*;q=0', self.encodings))
+        self.assertIsNone(negotiate('br;q=oops', ('br',)))
+
+    def test_nothing_acceptable(self):
+        self.assertIsNone(negotiate('', self.encodings))
+        self.assertIsNone(negotiate('identity, deflate', self.encodings))
+
+
+class EtagVariantTests(SimpleTestCase):
+    def test_tag_etag(self):
+        self.assertEqual(tag_etag('"v1"', 'br'), '"v1-br"')
+        self.assertEqual(tag_etag('W/"v1"', 'gzip'), 'W/"v1-gzip"')
+        self.assertEqual(tag_etag('unquoted', 'gzip'), 'unquoted')
+
+    def test_untag_etags_round_trips(self):
+        for encoding in ('br', 'zstd', 'gzip'):
+            with self.subTest(encoding=encoding):
+                self.assertEqual(untag_etags(tag_etag('"v1"', encoding)), ('"v1"', encoding))
+        self.assertEqual(untag_etags('"a-br", W/"b-br", "c"'), ('"a", W/"b", "c"', 'br'))
+        self.assertEqual(untag_etags('"plain"'), ('"plain"', None))
+        self.assertEqual(untag_etags('*'), ('*', None))
+
+
+DECOMPRESSORS = {
+    'gzip': lambda: zlib.decompressobj(16 + zlib.MAX_WBITS).decompress,
+    'br': lambda: compression.brotli.Decompressor().process,
+    'zstd': lambda: compression.zstandard.ZstdDecompressor().decompressobj().decompress,
+}
+
+
+def decompress(encoding, data):
+    return DECOMPRESSORS[encoding]()(data)
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    body = json.dumps({'items': list(range(1000))}).encode()
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.addCleanup(cache.clear)
+
+    def call(self, view, path='/api/things/', method='get', accept='gzip', **headers):
+        request = getattr(self.factory, method)(path, HTTP_ACCEPT_ENCODING=accept, **headers)
+        return CompressionMiddleware(view)(request)
+
+    def respond(self, body=None, **headers):
+        def view(request):
+            return HttpResponse(self.body if body is None else body, content_type='application/json', headers=headers)
+        return view
+
+    def test_compresses_with_the_negotiated_coding(self):
+        for encoding in compression.CODECS:
+            with self.subTest(encoding=encoding):
+                response = self.call(self.respond(), accept=f'{encoding}, identity;q=0.5')
+                self.assertEqual(response['Content-Encoding'], encoding)
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+                self.assertEqual(int(response['Content-Length']), len(response.content))
+                self.assertEqual(decompress(encoding, response.content), self.body)
+
+    def test_etag_variant_round_trips_through_a_304(self):
+        @condition(etag_func=lambda request: 'v1')
+        def view(request):
+            return self.respond()(request)
+
+        response = self.call(view)
+        self.assertEqual(response['ETag'], '"v1-gzip"')
+        revalidated = self.call(view, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated['ETag'], '"v1-gzip"')
+        self.assertFalse(revalidated.has_header('Content-Encoding'))
+        # The view compared the stripped validator, so a changed
+        # representation still fails the precondition.
+        self.assertEqual(self.call(view, HTTP_IF_NONE_MATCH='"v0-gzip"').status_code, 200)
+        self.assertEqual(self.call(view, method='put', HTTP_IF_MATCH='"v1-gzip"').status_code, 200)
+        self.assertEqual(self.call(view, method='put', HTTP_IF_MATCH='"v0-gzip"').status_code, 412)
+
+    def test_small_bodies_are_left_alone(self):
+        body = b'x' * (settings.COMPRESSION['MIN_SIZE'] - 1)
+        response = self.call(self.respond(body))
+        self.assertEqual(response.content, body)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertFalse(response.has_header('Vary'))
+
+    def test_excluded_paths_are_left_alone(self):
+        for path in settings.COMPRESSION['EXCLUDE_PATHS']:
+            with self.subTest(path=path):
+                response = self.call(self.respond(), path=path)
+                self.assertEqual(response.content, self.body)
+                self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_responses_that_must_not_be_transformed(self):
+        def partial(request):
+            response = self.respond(**{'Content-Range': f'bytes 0-{len(self.body) - 1}/*'})(request)
+            response.status_code = 206
+            return response
+
+        cases = {
+            'no-transform': self.respond(**{'Cache-Control': 'public, no-transform'}),
+            'partial content': partial,
+            'already encoded': self.respond(**{'Content-Encoding': 'identity'}),
+            'other content type': lambda request: HttpResponse(self.body, content_type='image/png'),
+        }
+        for label, view in cases.items():
+            with self.subTest(label):
+                response = self.call(view)
+                self.assertEqual(response.content, self.body)
+                self.assertNotEqual(response.get('Content-Encoding'), 'gzip')
+                self.assertFalse(response.has_header('Vary'))
+
+    def test_unacceptable_coding_still_varies(self):
+        response = self.call(self.respond(), accept='gzip;q=0')
+        self.assertEqual(response.content, self.body)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_incompressible_body_is_sent_as_is(self):
+        body = os.urandom(4096)
+        response = self.call(self.respond(body))
+        self.assertEqual(response.content, body)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_cacheable_bodies_are_compressed_once(self):
+        codec = compression.CODECS['gzip']
+        counted = compression.Codec('gzip', mock.Mock(side_effect=codec.compress), codec.stream)
+        for headers in ({'Cache-Control': 'public, max-age=60'}, {'ETag': '"v1"'}):
+            with self.subTest(headers=headers), mock.patch.dict(compression.CODECS, gzip=counted):
+                cache.clear()
+                counted.compress.reset_mock()
+                view = self.respond(**headers)
+                first, second = self.call(view), self.call(view)
+                self.assertEqual(counted.compress.call_count, 1)
+                self.assertEqual(first.content, second.content)
+                self.assertEqual(counted.compress.call_args.args[1], settings.COMPRESSION['CACHED_LEVELS']['gzip'])
+
+        with mock.patch.dict(compression.CODECS, gzip=counted):
+            counted.compress.reset_mock()
+            view = self.respond(**{'Cache-Control': 'private, max-age=60'})
+            self.call(view), self.call(view)
+        self.assertEqual(counted.compress.call_count, 2)
+
+    def test_event_stream_decodes_after_every_flush(self):
+        events = [f'id: {i}\ndata: {json.dumps({"n": i})}\n\n'.encode() for i in range(5)]
+
+        def view(request):
+            return StreamingHttpResponse(iter(events), content_type='text/event-stream')
+
+        for encoding in compression.CODECS:
+            with self.subTest(encoding=encoding):
+                response = self.call(view, accept=encoding)
+                self.assertEqual(response['Content-Encoding'], encoding)
+                self.assertFalse(response.has_header('Content-Length'))
+                decoder = DECOMPRESSORS[encoding]()
+                chunks = iter(response.streaming_content)
+                # Each event can be decoded as soon as its chunk is sent,
+                # without waiting for the next one or the end of the stream.
+                for event in events:
+                    self.assertEqual(decoder(next(chunks)), event)
+                self.assertEqual(decoder(b''.join(chunks)), b'')
+
+    def test_async_event_stream(self):
+        events = [b'data: one\n\n', b'data: two\n\n']
+
+        async def stream():
+            for event in events:
+                yield event
+
+        def view(request):
+            return StreamingHttpResponse(stream(), content_type='text/event-stream')
+
+        response = self.call(view)
+
+        async def consume():
+            return [chunk async for chunk in response.streaming_content]
+        chunks = async_to_sync(consume)()
+        decoder = DECOMPRESSORS['gzip']()
+        self.assertEqual([decoder(chunk) for chunk in chunks[:2]], events)
+
+
+class ProfilingTests(SimpleTestCase):
+    stacks = Counter({
+        (('handle', '/srv/app/views.py', 10), ('query', '/srv/app/db.py', 20)): 3,
+        (('handle', '/srv/app/views.py', 10),): 1,
+    })
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        self.settings = override_settings(PROFILING={
+            **settings.PROFILING, 'ENABLED': True, 'DIR': self.directory,
+            'SAMPLE_RATE': 0.5, 'PATHS': ('/api/auth/login/',), 'MAX_PROFILES': 3,
+        })
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+        self.factory = RequestFactory()
+
+    def test_tokens(self):
+        self.assertTrue(profiling.check_token(profiling.make_token()))
+        self.assertFalse(profiling.check_token(profiling.make_token() + 'x'))
+        self.assertFalse(profiling.check_token('profile'))
+        issued = time.time() - settings.PROFILING['TOKEN_MAX_AGE'] - 1
+        with mock.patch('django.core.signing.time.time', return_value=issued):
+            expired = profiling.make_token()
+        self.assertFalse(profiling.check_token(expired))
+
+    def test_which_requests_are_profiled(self):
+        middleware = ProfilingMiddleware(lambda request: HttpResponse())
+        token = profiling.make_token()
+        cases = [
+            # (path, X-Profile header, random draw, profiled)
+            ('/api/chat/', token, 0.9, True),
+            ('/api/chat/', 'forged', 0.0, False),
+            ('/api/auth/login/', 'forged', 0.0, False),
+            ('/api/auth/login/', None, 0.4, True),
+            ('/api/auth/login/', None, 0.6, False),
+            ('/api/chat/', None, 0.0, False),
+        ]
+        for path, header, draw, profiled in cases:
+            with self.subTest(path=path, header=header, draw=draw):
+                headers = {'HTTP_X_PROFILE': header} if header else {}
+                with mock.patch('core.middleware.random.random', return_value=draw):
+                    self.assertEqual(middleware.should_profile(self.factory.get(path, **headers)), profiled)
+
+    def test_disabled_middleware_removes_itself(self):
+        with override_settings(PROFILING={**settings.PROFILING, 'ENABLED': False}):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfilingMiddleware(lambda request: HttpResponse())
+
+    def test_profiled_request_is_written(self):
+        def busy_view(request):
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+            return HttpResponse()
+
+        middleware = ProfilingMiddleware(busy_view)
+        response = middleware(self.factory.get('/api/chat/', HTTP_X_PROFILE=profiling.make_token()))
+        name = response['X-Profile-Id']
+        self.assertRegex(name, r'-GET-api_chat-\d+ms-\d+$')
+        [file_name] = profiling.profile_files()
+        self.assertEqual(file_name, name + profiling.COLLAPSED_SUFFIX)
+        stacks = profiling.read_profile(os.path.join(self.directory, file_name))
+        self.assertTrue(stacks)
+        self.assertTrue(any('busy_view' in stack[-1] for stack in stacks))
+
+    def test_collapsed_output(self):
+        path = profiling.write_profile('p', self.stacks, 0.001, 'collapsed')
+        with open(path) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines, [
+            'handle (/srv/app/views.py:10);query (/srv/app/db.py:20) 3',
+            'handle (/srv/app/views.py:10) 1',
+        ])
+        self.assertEqual(
+            profiling.read_profile(path),
+            Counter({tuple(profiling.frame_label(frame) for frame in stack): n for stack, n in self.stacks.items()}),
+        )
+
+    def test_speedscope_output(self):
+        path = profiling.write_profile('p', self.stacks, 0.002, 'speedscope')
+        self.assertTrue(path.endswith(profiling.SPEEDSCOPE_SUFFIX))
+        with open(path) as f:
+            document = json.load(f)
+        self.assertEqual([frame['name'] for frame in document['shared']['frames']], ['handle', 'query'])
+        [profile] = document['profiles']
+        self.assertEqual(profile['samples'], [[0, 1], [0]])
+        self.assertEqual(profile['weights'], [6.0, 2.0])
+        self.assertEqual(profile['endValue'], 8.0)
+        labels = {stack: tuple(profiling.frame_label(frame) for frame in stack) for stack in self.stacks}
+        self.assertEqual(
+            profiling.read_profile(path), Counter({labels[stack]: n * 2.0 for stack, n in self.stacks.items()}),
+        )
+
+    def test_only_the_newest_profiles_are_kept(self):
+        names = [f'2024010{day}T000000.000000-GET-root-1ms-1' for day in range(1, 6)]
+        for i, name in enumerate(names):
+            profiling.write_profile(name, self.stacks, 0.001, 'speedscope' if i % 2 else 'collapsed')
+        self.assertEqual(profiling.profile_files(), [
+            names[4] + profiling.COLLAPSED_SUFFIX,
+            names[3] + profiling.SPEEDSCOPE_SUFFIX,
+            names[2] + profiling.COLLAPSED_SUFFIX,
+        ])
+
+        with override_settings(PROFILING={**settings.PROFILING, 'DIR': self.directory, 'MAX_PROFILES': None}):
+            profiling.write_profile('20240109T000000.000000-GET-root-1ms-1', self.stacks, 0.001, 'collapsed')
+            self.assertEqual(len(profiling.profile_files()), 4)
+        with open(os.path.join(self.directory, 'notes.txt'), 'w'):
+            pass
+        call_command('profiles', 'prune', '--keep', '1', stdout=StringIO())
+        self.assertEqual(profiling.profile_files(), ['20240109T000000.000000-GET-root-1ms-1.collapsed'])
+        self.assertIn('notes.txt', os.listdir(self.directory))
+
+
+class Clock:
+    """Settable stand-in for time.time_ns, in milliseconds."""
+
+    def __init__(self, ms):
+        self.ms = ms
+
+    def __call__(self):
+        return self.ms * 1_000_000
+
+
+class SnowflakeGeneratorTests(SimpleTestCase):
+    def setUp(self):
+        self.epoch = snowflake.epoch_ms()
+        self.start = self.epoch + 10_000
+        self.clock = Clock(self.start)
+        self.generate = SnowflakeGenerator(5, self.epoch, clock=self.clock)
+
+    def test_bit_layout(self):
+        first = self.generate()
+        self.assertEqual(first, (10_000 << 22) | (5 << 12))
+        self.assertEqual(snowflake.timestamp_ms(first), self.start)
+        self.assertEqual(snowflake.node_id(first), 5)
+        self.assertEqual(snowflake.to_datetime(first), settings.SNOWFLAKE['EPOCH'] + timedelta(seconds=10))
+        self.assertEqual(self.generate() & MAX_SEQUENCE, 1)
+        self.assertLess(0, first, 1 << 63)
+
+    def test_increasing_within_a_millisecond(self):
+        ids = [self.generate() for _ in range(100)]
+        self.assertEqual(ids, sorted(set(ids)))
+        self.assertEqual({snowflake.timestamp_ms(i) for i in ids}, {self.start})
+        self.clock.ms += 1
+        later = self.generate()
+        self.assertGreater(later, ids[-1])
+        self.assertEqual(later & MAX_SEQUENCE, 0)
+
+    def test_exhausted_sequence_borrows_the_next_millisecond(self):
+        ids = [self.generate() for _ in range(MAX_SEQUENCE + 1)]
+        self.assertEqual(ids[-1] & MAX_SEQUENCE, MAX_SEQUENCE)
+        # Rather than waiting for the clock, the next id is the first of the
+        # next millisecond...
+        borrowed = self.generate()
+        self.assertEqual((snowflake.timestamp_ms(borrowed), borrowed & MAX_SEQUENCE), (self.start + 1, 0))
+        # ...which the clock then continues from.
+        self.clock.ms += 1
+        following = self.generate()
+        self.assertEqual((snowflake.timestamp_ms(following), following & MAX_SEQUENCE), (self.start + 1, 1))
+        self.assertEqual(len({*ids, borrowed, following}), MAX_SEQUENCE + 3)
+
+    def test_clock_stepping_back(self):
+        before = [self.generate() for _ in range(3)]
+        self.clock.ms -= 50
+        during = [self.generate() for _ in range(3)]
+        # Ids stay on the last timestamp until the clock passes it again.
+        self.assertEqual(before + during, sorted(set(before + during)))
+        self.assertEqual({snowflake.timestamp_ms(i) for i in during}, {self.start})
+        self.clock.ms += 51
+        self.assertEqual(snowflake.timestamp_ms(self.generate()), self.start + 1)
+
+    def test_invalid_node_id(self):
+        for node in (-1, MAX_NODE + 1):
+            with self.subTest(node=node), self.assertRaises(ValueError):
+                SnowflakeGenerator(node, self.epoch)
+
+    def test_min_id_and_id_range(self):
+        first = self.generate()
+        self.clock.ms += 5
+        later = self.generate()
+        # The smallest id of later's millisecond: node and sequence zero.
+        boundary = later >> TIMESTAMP_SHIFT << TIMESTAMP_SHIFT
+        self.assertEqual(snowflake.min_id(snowflake.to_datetime(later)), boundary)
+        self.assertEqual(snowflake.min_id(self.start + 5), boundary)
+        self.assertEqual(snowflake.min_id(settings.SNOWFLAKE['EPOCH'] - timedelta(days=1)), 0)
+        lookups = snowflake.id_range(start=snowflake.to_datetime(first), end=snowflake.to_datetime(later))
+        self.assertEqual(lookups, {'pk__gte': first >> TIMESTAMP_SHIFT << TIMESTAMP_SHIFT, 'pk__lt': boundary})
+        self.assertTrue(lookups['pk__gte'] <= first < lookups['pk__lt'] <= later)
+        self.assertEqual(snowflake.id_range(), {})
+
+    def test_node_id_switches_under_the_generator_lock(self):
+        generator = self.generate
+        held = []
+
+        class RecordingLock:
+            def __init__(self):
+                self.lock = threading.Lock()
+
+            def __enter__(self):
+                self.lock.acquire()
+                held.append(('enter', generator.node_id))
+
+            def __exit__(self, *exc_info):
+                held.append(('exit', generator.node_id))
+                self.lock.release()
+
+        generator.lock = RecordingLock()
+        lease = mock.Mock(node_id=9, **{'get.return_value': 9})
+        with mock.patch.multiple(snowflake, _generator=generator, _lease=lease):
+            self.assertEqual(snowflake.node_id(snowflake.next_id()), 9)
+            # Switched inside the lock, then the id generated.
+            self.assertEqual(held, [('enter', 5), ('exit', 9), ('enter', 9), ('exit', 9)])
+            held.clear()
+            snowflake.next_id()
+            self.assertEqual(held, [('enter', 9), ('exit', 9)])
@@ -0,0 +1,51 @@
+"""
+Shared setup for the benchmark scripts in this directory.
+
+Benchmarks never touch the configured database: Django is pointed at a
+throwaway SQLite file given on the command line, migrated on first use.
+"""
+import os
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django(db=None, fresh=False):
+    """
+    Configure Django. With ``db``, use that SQLite file as the default
+    database (deleted first if ``fresh``) and return True if it had to be
+    created and migrated.
+    """
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    from django.conf import settings
+
+    django.setup()
+    # Query logging would dominate the timings.
+    settings.DEBUG = False
+    if db is None:
+        return False
+    db = Path(db)
+    if fresh and db.exists():
+        db.unlink()
+    created = not db.exists()
+    settings.DATABASES['default']['NAME'] = str(db)
+    if created:
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+    return created
+
+
+def timed(fn, repeat=5):
+    """Median wall time of ``fn()`` over ``repeat`` runs, in milliseconds."""
+    import statistics
+    import time
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
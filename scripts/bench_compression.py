@@ -0,0 +1,60 @@
+"""
+Benchmark response compression.
+
+Compresses a JSON body of ``--size`` bytes with every available coding at
+the per-request and cached levels from ``COMPRESSION``, and times a full
+pass through CompressionMiddleware with and without the compressed-body
+cache.
+
+    python scripts/bench_compression.py --size 65536
+"""
+import argparse
+import json
+
+from _setup import setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=64 * 1024)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.core.cache import cache
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+
+    from core import compression
+    from core.middleware import CompressionMiddleware
+
+    rows, body = [], b''
+    while len(body) < args.size:
+        rows.append({'id': str(len(rows) * 7919), 'author': 'User', 'message': f'message number {len(rows)}'})
+        body = json.dumps({'results': rows}).encode()
+    config = settings.COMPRESSION
+    print(f'body: {len(body):,} bytes')
+
+    for name, codec in compression.CODECS.items():
+        for label, level in (('request', config['LEVELS'][name]), ('cached', config['CACHED_LEVELS'][name])):
+            size = len(codec.compress(body, level))
+            ms = timed(lambda: codec.compress(body, level), repeat=args.repeat)
+            print(f'{name:>4} level {level:>2} ({label:7}): {ms:7.3f} ms, {size:>7,} bytes ({size / len(body):.1%})')
+
+    factory = RequestFactory()
+    for cache_control in ('private', 'public, max-age=60'):
+        middleware = CompressionMiddleware(
+            lambda request: HttpResponse(body, content_type='application/json', headers={
+                'Cache-Control': cache_control,
+            })
+        )
+        for name in middleware.encodings:
+            cache.clear()
+            request = factory.get('/api/things/', HTTP_ACCEPT_ENCODING=name)
+            ms = timed(lambda: middleware(request), repeat=args.repeat)
+            print(f'middleware, {name:>4}, Cache-Control: {cache_control:18}: {ms:7.3f} ms/req')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark inserts into the snowflake-keyed chat messages table.
+
+Times raw id generation, ``bulk_create`` of ``--rows`` messages in batches
+of 500 (ids assigned in Python, no returned keys needed), single-row
+``create()`` in autocommit, and a time-range query on the primary key
+against the same range on ``date``.
+
+    python scripts/bench_inserts.py --rows 200000
+"""
+import argparse
+import time
+from datetime import timedelta
+
+from _setup import setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--creates', type=int, default=5000)
+    parser.add_argument('--db', default='/tmp/bench_inserts.sqlite3')
+    args = parser.parse_args()
+
+    setup_django(args.db, fresh=True)
+    from django.db import transaction
+    from django.utils import timezone
+
+    from chat.models import ChatMessages, ChatSession
+    from core import snowflake
+    from users.models import User
+
+    session = ChatSession.objects.create(
+        user=User.objects.create_user(email='bench@example.com', password='x'), topic_name='bench',
+    )
+
+    begin = time.perf_counter()
+    for _ in range(1_000_000):
+        snowflake.next_id()
+    elapsed = time.perf_counter() - begin
+    print(f'next_id: {1_000_000 / elapsed:,.0f} ids/s')
+
+    def bulk():
+        ChatMessages.objects.all().delete()
+        with transaction.atomic():
+            ChatMessages.objects.bulk_create(
+                [ChatMessages(session=session, message='hello world', author='User') for _ in range(args.rows)],
+                batch_size=500,
+            )
+
+    ms = timed(bulk, repeat=3)
+    print(f'bulk_create {args.rows} rows: {ms / 1000:.2f} s ({args.rows / ms * 1000:,.0f} rows/s)')
+
+    begin = time.perf_counter()
+    for _ in range(args.creates):
+        ChatMessages.objects.create(session=session, message='hello', author='User')
+    elapsed = time.perf_counter() - begin
+    print(f'create() in autocommit: {args.creates / elapsed:,.0f} rows/s')
+
+    since = timezone.now() - timedelta(seconds=1)
+    by_id = ChatMessages.objects.filter(session=session, **snowflake.id_range(start=since))
+    by_date = ChatMessages.objects.filter(session=session, date__gte=since)
+    for label, queryset in (('id_range', by_id), ('date', by_date)):
+        ms = timed(lambda: queryset.count(), repeat=20)
+        print(f'messages of the last second by {label:8}: {ms:6.2f} ms, {queryset.count()} rows')
+
+
+if __name__ == '__main__':
+    main()
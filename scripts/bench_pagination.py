@@ -0,0 +1,124 @@
+"""
+Benchmark deep pagination: LIMIT/OFFSET against KeysetPagination.
+
+Seeds ``--rows`` chat messages into a throwaway SQLite database, a fifth
+of them in one session, and a tenth as many sessions for one user, three
+per ``last_activity_at`` so the leading sort values repeat. Then pages deep
+into that session's history and that user's session list, each with its
+view's ordering.
+
+    python scripts/bench_pagination.py --rows 10000000
+
+Seeding 10M rows takes a few minutes and about 1 GB of disk; pass
+``--reuse`` to skip it on later runs.
+"""
+import argparse
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlsplit
+
+from _setup import setup_django, timed
+
+PAGE_SIZE = 20
+MESSAGE_SESSIONS = 1000
+
+
+class View:
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+
+def seed(db, rows):
+    from django.db import connection
+
+    from users.models import User
+
+    User.objects.create_user(email='bench@example.com', password='x')
+    connection.close()
+    con = sqlite3.connect(db)
+    con.execute('PRAGMA journal_mode=OFF')
+    con.execute('PRAGMA synchronous=OFF')
+    base = datetime(2025, 1, 1)
+    start = time.perf_counter()
+    con.executemany(
+        "INSERT INTO chat_chatsession (id, user_id, topic_name, created_at, last_activity_at, archive_segment) "
+        "VALUES (?, 1, 't', '2026-01-01 00:00:00', ?, '')",
+        (
+            (i, (base + timedelta(seconds=i // 3)).strftime('%Y-%m-%d %H:%M:%S'))
+            for i in range(1, max(rows // 10, MESSAGE_SESSIONS) + 1)
+        ),
+    )
+    con.executemany(
+        'INSERT INTO chat_chatmessages (id, session_id, message, author, date) VALUES (?, ?, ?, ?, ?)',
+        (
+            (i, 1 if i % 5 == 0 else 2 + i % (MESSAGE_SESSIONS - 1), 'hello world message text', 'User',
+             (base + timedelta(seconds=i // 3)).strftime('%Y-%m-%d %H:%M:%S'))
+            for i in range(1, rows + 1)
+        ),
+    )
+    con.commit()
+    con.execute('ANALYZE')
+    con.close()
+    print(f'seeded in {time.perf_counter() - start:.0f} s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--db', default='/tmp/bench_pagination.sqlite3')
+    parser.add_argument('--reuse', action='store_true', help='Use the rows seeded by an earlier run.')
+    args = parser.parse_args()
+
+    if setup_django(args.db, fresh=not args.reuse):
+        seed(args.db, args.rows)
+
+    from django.conf import settings
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from chat.models import ChatMessages, ChatSession
+    from chat.views import ChatMessageListCreateView, ChatSessionListCreateView
+    from core.pagination import KeysetPagination
+
+    settings.ALLOWED_HOSTS = ['testserver']
+    factory = APIRequestFactory()
+
+    def keyset_page(queryset, ordering, cursor):
+        params = {'cursor': cursor} if cursor else {}
+        return KeysetPagination().paginate_queryset(queryset, Request(factory.get('/', params)), View(ordering))
+
+    def cursor_at(queryset, ordering, offset):
+        # The cursor a client would hold after walking to ``offset``.
+        if not offset:
+            return None
+        paginator = KeysetPagination()
+        paginator.fields = [name.lstrip('-') for name in ordering]
+        paginator.base_url = 'http://testserver/'
+        row = queryset.order_by(*ordering)[offset - 1]
+        return parse_qs(urlsplit(paginator.encode_cursor(row, reverse=False)).query)['cursor'][0]
+
+    for label, queryset, ordering in (
+        ('messages of one session', ChatMessages.objects.filter(session_id=1), ChatMessageListCreateView.ordering),
+        ('sessions of one user', ChatSession.objects.filter(user_id=1), ChatSessionListCreateView.ordering),
+    ):
+        total = queryset.count()
+        print(f'{total} {label}, ordered by {ordering}:')
+        last_page = total // PAGE_SIZE
+        for page in sorted({page for page in (1, 1_000, 10_000) if page <= last_page} | {last_page // 2, last_page}):
+            offset = (page - 1) * PAGE_SIZE
+            offset_ms = timed(lambda: list(queryset.order_by(*ordering)[offset:offset + PAGE_SIZE + 1]), repeat=3)
+            cursor = cursor_at(queryset, ordering, offset)
+            assert [row.pk for row in keyset_page(queryset, ordering, cursor)] == list(
+                queryset.order_by(*ordering).values_list('pk', flat=True)[offset:offset + PAGE_SIZE]
+            )
+            keyset_ms = timed(lambda: keyset_page(queryset, ordering, cursor))
+            print(f'  page {page:>7} (offset {offset:>8}): OFFSET {offset_ms:8.2f} ms   keyset {keyset_ms:6.2f} ms')
+
+        request = Request(factory.get('/', {'count': 'true'}))
+        count_ms = timed(lambda: KeysetPagination().paginate_queryset(queryset, request, View(ordering)), repeat=3)
+        print(f'  ?count=true: {count_ms:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
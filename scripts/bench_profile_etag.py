@@ -0,0 +1,61 @@
+"""
+Benchmark conditional requests to the user profile.
+
+Times ``--requests`` full GETs of /api/auth/profile/ against revalidations
+with If-None-Match (304, no body), and If-Match PATCHes, through the Django
+test client on a throwaway SQLite database.
+
+    python scripts/bench_profile_etag.py --requests 2000
+"""
+import argparse
+import itertools
+import time
+
+from _setup import setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--db', default='/tmp/bench_profile_etag.sqlite3')
+    args = parser.parse_args()
+
+    setup_django(args.db, fresh=True)
+    from django.conf import settings
+    from rest_framework.test import APIClient
+
+    from users.models import User
+
+    settings.ALLOWED_HOSTS = ['testserver']
+    user = User.objects.create_user(email='bench@example.com', password='x', first_name='Bench')
+    client = APIClient()
+    client.force_authenticate(user)
+    url = '/api/auth/profile/'
+    etag = client.get(url)['ETag']
+
+    def run(label, request, status):
+        response = request()
+        assert response.status_code == status, response.status_code
+        size = len(response.serialize())
+        begin = time.perf_counter()
+        for _ in range(args.requests):
+            request()
+        elapsed = time.perf_counter() - begin
+        print(f'{label:<22} {elapsed / args.requests * 1e3:6.2f} ms/req, {size} bytes (headers + body)')
+
+    run('200 full body:', lambda: client.get(url), 200)
+    run('304 revalidate:', lambda: client.get(url, HTTP_IF_NONE_MATCH=etag), 304)
+
+    names = itertools.cycle(['Bench', 'Benchy'])
+
+    def patch():
+        nonlocal etag
+        response = client.patch(url, {'first_name': next(names)}, format='json', HTTP_IF_MATCH=etag)
+        etag = response['ETag']
+        return response
+
+    run('If-Match PATCH:', patch, 200)
+
+
+if __name__ == '__main__':
+    main()
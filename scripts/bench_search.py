@@ -0,0 +1,82 @@
+"""
+Benchmark the message search index.
+
+Indexes ``--rows`` synthetic messages (owned by ``--users`` users, words
+drawn from a Zipf-distributed vocabulary), then times incremental inserts
+and updates and a set of queries from rare to common terms.
+
+    python scripts/bench_search.py --rows 10000000
+
+The 10M row default takes several minutes and about 2 GB of disk.
+"""
+import argparse
+import itertools
+import os
+import random
+import time
+
+from _setup import setup_django, timed
+
+COMMON_WORDS = ['python', 'django', 'error', 'function', 'class', 'list', 'loop', 'async', 'database', 'query']
+QUERIES = ['python', 'database query', 'w3', 'w31', 'w19000', 'pyth', 'async error loop']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--vocabulary', type=int, default=20_000)
+    parser.add_argument('--db', default='/tmp/bench_search.sqlite3')
+    parser.add_argument('--reuse', action='store_true', help='Query an index built by an earlier run.')
+    args = parser.parse_args()
+
+    setup_django(args.db, fresh=not args.reuse)
+    from django.db import transaction
+
+    from search.backends import get_backend
+    from search.indexes import INDEXES
+
+    index, backend = INDEXES['messages'], get_backend()
+    rnd = random.Random(1)
+
+    if not args.reuse:
+        vocabulary = [f'w{i}' for i in range(args.vocabulary)]
+        weights = list(itertools.accumulate(1 / (i + 1) for i in range(args.vocabulary)))
+        start = time.perf_counter()
+        batch = 20_000
+        for first in range(1, args.rows + 1, batch):
+            rows = [
+                (pk, rnd.randrange(args.users), ' '.join(
+                    rnd.choices(vocabulary, cum_weights=weights, k=10) + rnd.sample(COMMON_WORDS, 2)
+                ))
+                for pk in range(first, min(first + batch, args.rows + 1))
+            ]
+            with transaction.atomic():
+                backend.upsert(index, rows, replace=False)
+        elapsed = time.perf_counter() - start
+        print(f'bulk index: {args.rows} rows in {elapsed:.0f} s ({args.rows / elapsed:.0f} rows/s), '
+              f'{os.path.getsize(args.db) / 1e9:.2f} GB')
+
+        def insert():
+            for i in range(1000):
+                with transaction.atomic():
+                    backend.upsert(index, [(args.rows + 1 + i, 5, 'python async loop fixed')], replace=False)
+
+        def update():
+            for i in range(1000):
+                with transaction.atomic():
+                    backend.upsert(index, [(args.rows + 1 + i, 5, 'python async loop fixed again')])
+
+        print(f'incremental insert: {timed(insert, repeat=1) / 1000:.2f} ms/row')
+        print(f'incremental update: {timed(update, repeat=1) / 1000:.2f} ms/row')
+
+    for query in QUERIES:
+        for page in (1, 5):
+            owner = rnd.randrange(args.users)
+            hits = []
+            ms = timed(lambda: hits.append(len(backend.search(index, owner, query, 21, (page - 1) * 20))), repeat=20)
+            print(f'query {query!r:20} page {page}: {ms:6.1f} ms, {hits[-1]} hits')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark coding task expiry.
+
+In memory: schedules ``--deadlines`` deadlines (5 min to 8 h, 2% spread
+over several days) in the timing wheel, cancels a third of them, ticks
+through 8 hours, and compares with a plain heap.
+
+With ``--db``: seeds that many pending tasks (plus 20% finished ones) into
+a throwaway SQLite database and times TaskScheduler's restore,
+incremental load and batched expiry.
+
+    python scripts/bench_timing_wheel.py --deadlines 1000000
+    python scripts/bench_timing_wheel.py --deadlines 1000000 --db /tmp/bench_tasks.sqlite3
+"""
+import argparse
+import heapq
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from _setup import setup_django
+
+HOURS = 8
+
+
+def bench_memory(count):
+    from tasks.timing_wheel import TimingWheel
+
+    rnd = random.Random(1)
+    start = time.time()
+    deadlines = [
+        start + (rnd.uniform(300, HOURS * 3600) if rnd.random() > 0.02 else rnd.uniform(4 * 86400, 10 * 86400))
+        for _ in range(count)
+    ]
+
+    wheel = TimingWheel(start, tick=1.0, slot_bits=6, levels=3)
+    begin = time.perf_counter()
+    for key, deadline in enumerate(deadlines):
+        wheel.add(key, deadline)
+    added = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    for key in range(0, count, 3):
+        wheel.remove(key)
+    removed = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    fired = worst = 0
+    for second in range(1, HOURS * 3600 + 1):
+        tick = time.perf_counter()
+        fired += len(wheel.advance(start + second))
+        worst = max(worst, time.perf_counter() - tick)
+    ticked = time.perf_counter() - begin
+    print(f'wheel: add {count} in {added:.2f} s ({added / count * 1e6:.2f} us each), '
+          f'cancel {len(range(0, count, 3))} in {removed:.2f} s')
+    print(f'wheel: {HOURS} h of 1 s ticks in {ticked:.2f} s '
+          f'({ticked / (HOURS * 3600) * 1e6:.0f} us/tick, worst {worst * 1e3:.2f} ms), '
+          f'{fired} expired, {len(wheel)} pending, {len(wheel.overflow)} in overflow')
+
+    heap = []
+    begin = time.perf_counter()
+    for key, deadline in enumerate(deadlines):
+        heapq.heappush(heap, (deadline, key))
+    pushed = time.perf_counter() - begin
+    begin = time.perf_counter()
+    popped = 0
+    while heap and heap[0][0] <= start + HOURS * 3600:
+        heapq.heappop(heap)
+        popped += 1
+    drained = time.perf_counter() - begin
+    print(f'heap:  push {count} in {pushed:.2f} s ({pushed / count * 1e6:.2f} us each), '
+          f'pop {popped} in {drained:.2f} s ({drained / popped * 1e6:.2f} us each); '
+          f'cancelling means a linear search or lazy deletion')
+
+
+def seed(count):
+    from django.db import connection
+
+    from users.models import User
+
+    User.objects.bulk_create([User(email=f'u{i}@example.com') for i in range(10_000)])
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    now = datetime.now(timezone.utc)
+    rnd = random.Random(2)
+    sql = (
+        'INSERT INTO tasks_codingtasks (title, user_id, task_goal, time_limit, started, completed, expired, '
+        'started_at, deadline, created_at) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)'
+    )
+    rows = []
+    with connection.cursor() as cursor:
+        for i in range(count + count // 5):
+            started = now - timedelta(seconds=rnd.uniform(0, 3600))
+            deadline = started + timedelta(minutes=rnd.uniform(5, HOURS * 60))
+            rows.append(('t', rnd.choice(user_ids), 'goal', 60, True, i >= count, False, started, deadline, now))
+            if len(rows) == 50_000:
+                cursor.executemany(sql, rows)
+                rows = []
+        cursor.executemany(sql, rows)
+
+
+def bench_db(count, db):
+    if setup_django(db, fresh=True):
+        seed(count)
+    from tasks.models import CodingTasks
+    from tasks.scheduler import TaskScheduler
+
+    scheduler = TaskScheduler(tick=1.0, slot_bits=6, levels=3, batch_size=500, sync_interval=15)
+    begin = time.perf_counter()
+    loaded = scheduler.load()
+    print(f'restore {loaded} pending deadlines: {time.perf_counter() - begin:.2f} s')
+    begin = time.perf_counter()
+    loaded = scheduler.load()
+    print(f'incremental load ({loaded} rows in the overlap window): {(time.perf_counter() - begin) * 1e3:.1f} ms')
+
+    ids = list(CodingTasks.objects.pending().values_list('pk', flat=True)[:22_000])
+    past = datetime.now(timezone.utc) - timedelta(seconds=1)
+    for i in range(0, len(ids), 500):
+        CodingTasks.objects.filter(pk__in=ids[i:i + 500]).update(deadline=past)
+    begin = time.perf_counter()
+    rows = scheduler.expire(ids[:20_000])
+    elapsed = time.perf_counter() - begin
+    print(f'expire {len(rows)} due tasks in batches of 500: {elapsed:.2f} s ({elapsed / len(rows) * 1e6:.0f} us/task)')
+    begin = time.perf_counter()
+    for pk in ids[20_000:]:
+        CodingTasks.objects.filter(pk=pk).update(expired=True)
+    elapsed = time.perf_counter() - begin
+    print(f'one UPDATE per task instead: {elapsed / len(ids[20_000:]) * 1e6:.0f} us/task')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--deadlines', type=int, default=1_000_000)
+    parser.add_argument('--db', help='Also benchmark restore and expiry against this SQLite file.')
+    args = parser.parse_args()
+    setup_django()
+    bench_memory(args.deadlines)
+    if args.db:
+        bench_db(args.deadlines, args.db)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Full-text search backends.
+
+Each registered index is a separate table keyed by the source row's primary
+key, and every query is scoped to the user who owns the rows:
+
+* SQLite uses an FTS5 virtual table whose tokens are prefixed with the
+  owner (``u42_binary``). A query only ever reads the caller's own posting
+  lists, so its cost does not grow with other users' data; results are
+  ranked with bm25(). The original text stays in the source table.
+* PostgreSQL uses a plain table with a weighted ``tsvector`` column (GIN
+  indexed) next to a btree-indexed owner column, ranked with ts_rank_cd().
+"""
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+MIN_PREFIX_LENGTH = 3
+
+
+class SQLiteBackend:
+    tokenizer = "unicode61 remove_diacritics 2 tokenchars '_'"
+
+    def create_index(self, schema_editor, index):
+        columns = ', '.join(index.fields)
+        tokenizer = self.tokenizer.replace("'", "''")
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {index.table} USING fts5({columns}, tokenize = '{tokenizer}')"
+        )
+
+    def drop_index(self, schema_editor, index):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {index.table}')
+
+    def _scoped(self, owner_id, text):
+        return ' '.join(f'u{owner_id}_{term}' for term in TERM_RE.findall((text or '').lower()))
+
+    def upsert(self, index, rows, replace=True):
+        """
+        Index ``(pk, owner_id, *field_values)`` rows. Pass ``replace=False``
+        when the rows are known to be new.
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        columns = ', '.join(('rowid', *index.fields))
+        placeholders = ', '.join(['%s'] * (len(index.fields) + 1))
+        with connection.cursor() as cursor:
+            if replace:
+                # FTS5 has no UPSERT; delete first so updates don't duplicate.
+                cursor.executemany(f'DELETE FROM {index.table} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {index.table} ({columns}) VALUES ({placeholders})',
+                [
+                    (pk, *(self._scoped(owner_id, value) for value in values))
+                    for pk, owner_id, *values in rows
+                ],
+            )
+
+    def delete(self, index, pks):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {index.table} WHERE rowid = %s', [(pk,) for pk in pks])
+
+    def search(self, index, owner_id, query, limit, offset):
+        terms = TERM_RE.findall(query.lower())
+        if not terms:
+            return []
+        # Quote every term so user input can't inject FTS5 operators. The last
+        # term is a prefix match to support search-as-you-type, unless it is
+        # so short that expanding it would touch a large part of the index.
+        match = ' '.join(f'"u{owner_id}_{term}"' for term in terms)
+        if len(terms[-1]) >= MIN_PREFIX_LENGTH:
+            match += '*'
+        weights = ', '.join(str(weight) for weight in index.weights)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, bm25({index.table}, {weights}) AS score '
+                f'FROM {index.table} WHERE {index.table} MATCH %s '
+                f'ORDER BY score LIMIT %s OFFSET %s',
+                [match, limit, offset],
+            )
+            # bm25() is lower-is-better; flip it so higher scores rank first.
+            return [(pk, -score) for pk, score in cursor.fetchall()]
+
+
+class PostgresBackend:
+    config = 'english'
+    weight_labels = 'ABCD'
+
+    def create_index(self, schema_editor, index):
+        schema_editor.execute(
+            f'CREATE TABLE {index.table} ('
+            'id bigint PRIMARY KEY, owner bigint NOT NULL, document tsvector NOT NULL)'
+        )
+        schema_editor.execute(f'CREATE INDEX {index.table}_owner ON {index.table} (owner)')
+        schema_editor.execute(f'CREATE INDEX {index.table}_document ON {index.table} USING gin (document)')
+
+    def drop_index(self, schema_editor, index):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {index.table}')
+
+    def _document_sql(self, index):
+        return ' || '.join(
+            f"setweight(to_tsvector('{self.config}', coalesce(%s, '')), '{self.weight_labels[i]}')"
+            for i in range(len(index.fields))
+        )
+
+    def upsert(self, index, rows, replace=True):
+        rows = list(rows)
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {index.table} (id, owner, document) '
+                f'VALUES (%s, %s, {self._document_sql(index)}) '
+                'ON CONFLICT (id) DO UPDATE SET owner = EXCLUDED.owner, document = EXCLUDED.document',
+                rows,
+            )
+
+    def delete(self, index, pks):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {index.table} WHERE id = ANY(%s)', [list(pks)])
+
+    def search(self, index, owner_id, query, limit, offset):
+        if not TERM_RE.search(query):
+            return []
+        # ts_rank_cd weights are ordered {D, C, B, A}.
+        weights = [0.1] * 4
+        for i, weight in enumerate(index.weights):
+            weights[3 - i] = min(weight / max(index.weights), 1.0)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT id, ts_rank_cd(%s::float4[], document, q) AS score '
+                f"FROM {index.table}, websearch_to_tsquery('{self.config}', %s) q "
+                'WHERE owner = %s AND document @@ q '
+                'ORDER BY score DESC LIMIT %s OFFSET %s',
+                [weights, query, owner_id, limit, offset],
+            )
+            return cursor.fetchall()
+
+
+BACKENDS = {
+    'sqlite': SQLiteBackend,
+    'postgresql': PostgresBackend,
+}
+
+
+def get_backend(vendor=None):
+    vendor = vendor or connection.vendor
+    try:
+        return BACKENDS[vendor]()
+    except KeyError:
+        raise ImproperlyConfigured(f'Full-text search is not supported on {vendor}.')
@@ -0,0 +1,65 @@
+from dataclasses import dataclass
+from functools import cached_property
+
+from django.apps import apps
+
+
+@dataclass(frozen=True)
+class SearchIndex:
+    """
+    Declares which text fields of a model are searchable and who owns a row.
+
+    ``owner`` is a lookup path (``'user_id'``, ``'session__user_id'``) to the
+    id of the user allowed to see the row.
+    """
+    name: str
+    model_label: str
+    table: str
+    fields: tuple
+    weights: tuple
+    owner: str
+
+    @cached_property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def owner_id(self, instance):
+        value = instance
+        for attr in self.owner.split('__'):
+            value = getattr(value, attr)
+        return value
+
+    def row(self, instance):
+        return (instance.pk, self.owner_id(instance), *(getattr(instance, field) for field in self.fields))
+
+    def rows(self, chunk_size=2000):
+        """All rows of the model as index tuples, without instantiating models."""
+        return (
+            self.model._default_manager
+            .order_by()
+            .values_list('pk', self.owner, *self.fields)
+            .iterator(chunk_size=chunk_size)
+        )
+
+
+INDEXES = {
+    index.name: index
+    for index in (
+        SearchIndex(
+            name='messages',
+            model_label='chat.ChatMessages',
+            table='search_chat_messages',
+            fields=('message',),
+            weights=(1.0,),
+            owner='session__user_id',
+        ),
+        SearchIndex(
+            name='tasks',
+            model_label='tasks.CodingTasks',
+            table='search_coding_tasks',
+            fields=('title', 'task_goal'),
+            weights=(10.0, 1.0),
+            owner='user_id',
+        ),
+    )
+}
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from search.backends import get_backend
+from search.indexes import INDEXES
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search indexes from their source tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'indexes',
+            nargs='*',
+            choices=sorted(INDEXES),
+            help='Indexes to rebuild (default: all).',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        batch_size = options['batch_size']
+        for name in options['indexes'] or sorted(INDEXES):
+            index = INDEXES[name]
+            total = 0
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DELETE FROM {index.table}')
+                batch = []
+                for row in index.rows(chunk_size=batch_size):
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        backend.upsert(index, batch, replace=False)
+                        total += len(batch)
+                        batch = []
+                backend.upsert(index, batch, replace=False)
+                total += len(batch)
+            self.stdout.write(f'Indexed {total} rows into {name}')
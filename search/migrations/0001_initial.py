@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+
+from django.db import migrations
+
+from search.backends import get_backend
+
+# Frozen copies of the index layouts in search/indexes.py at this migration.
+INDEXES = (
+    SimpleNamespace(table='search_chat_messages', fields=('message',)),
+    SimpleNamespace(table='search_coding_tasks', fields=('title', 'task_goal')),
+)
+
+
+def create_indexes(apps, schema_editor):
+    backend = get_backend(schema_editor.connection.vendor)
+    for index in INDEXES:
+        backend.create_index(schema_editor, index)
+
+
+def drop_indexes(apps, schema_editor):
+    backend = get_backend(schema_editor.connection.vendor)
+    for index in INDEXES:
+        backend.drop_index(schema_editor, index)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('chat', '0001_initial'),
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,20 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+
+from .indexes import INDEXES
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    """
+    Query parameters for the search endpoint.
+
+    Fields:
+        q: The search terms; the last term also matches as a prefix
+        type: Which catalogue to search (messages or tasks)
+        page: 1-based page number
+        page_size: Results per page (max 50)
+    """
+    q = serializers.CharField(max_length=200, help_text=_("Search terms."))
+    type = serializers.ChoiceField(choices=sorted(INDEXES), default='messages')
+    page = serializers.IntegerField(min_value=1, max_value=100, default=1)
+    page_size = serializers.IntegerField(min_value=1, max_value=50, default=20)
@@ -0,0 +1,35 @@
+"""Keep the search indexes in step with their source tables."""
+from django.db.models.signals import post_delete, post_save
+
+from chat.models import ChatSession
+from chat.signals import messages_restored
+
+from .backends import get_backend
+from .indexes import INDEXES
+
+
+def index_instance(sender, instance, created, update_fields=None, **kwargs):
+    index = INDEXES_BY_MODEL[sender]
+    if update_fields is not None and not set(update_fields) & set(index.fields):
+        return
+    get_backend().upsert(index, [index.row(instance)], replace=not created)
+
+
+def unindex_instance(sender, instance, **kwargs):
+    get_backend().delete(INDEXES_BY_MODEL[sender], [instance.pk])
+
+
+def index_restored_messages(sender, session, messages, **kwargs):
+    get_backend().upsert(
+        INDEXES['messages'],
+        ((message.pk, session.user_id, message.message) for message in messages),
+        replace=False,
+    )
+
+
+INDEXES_BY_MODEL = {index.model: index for index in INDEXES.values()}
+
+for model in INDEXES_BY_MODEL:
+    post_save.connect(index_instance, sender=model, dispatch_uid=f'search_index_{model._meta.label}')
+    post_delete.connect(unindex_instance, sender=model, dispatch_uid=f'search_unindex_{model._meta.label}')
+messages_restored.connect(index_restored_messages, sender=ChatSession)
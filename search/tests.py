@@ -0,0 +1,91 @@
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from chat.models import ChatMessages, ChatSession
+from tasks.models import CodingTasks
+from users.models import User
+
+from .views import make_snippet
+
+
+class MakeSnippetTests(SimpleTestCase):
+    def test_highlights_whole_words_from_the_term(self):
+        self.assertEqual(make_snippet('Pythonic code in python', 'pyth'), '<b>Pythonic</b> code in <b>python</b>')
+
+    def test_terms_never_match_inside_entities(self):
+        self.assertEqual(make_snippet('fish & chips', 'amp'), 'fish &amp; chips')
+        self.assertEqual(make_snippet('<script> "lt"', 'lt'), '&lt;script&gt; &quot;<b>lt</b>&quot;')
+        self.assertEqual(make_snippet('a <b> tag', 'b'), 'a &lt;<b>b</b>&gt; tag')
+
+    def test_long_text_is_cut_around_the_first_hit(self):
+        snippet = make_snippet('x ' * 200 + 'needle' + ' y' * 200, 'needle')
+        self.assertTrue(snippet.startswith('…'))
+        self.assertTrue(snippet.endswith('…'))
+        self.assertIn('<b>needle</b>', snippet)
+
+
+class SearchViewTests(APITestCase):
+    url = reverse('search:search')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='x')
+        cls.other = User.objects.create_user(email='other@example.com', password='x')
+        session = ChatSession.objects.create(user=cls.user, topic_name='mine')
+        other_session = ChatSession.objects.create(user=cls.other, topic_name='theirs')
+        ChatMessages.objects.create(session=session, message='How do I profile a python loop?', author='User')
+        ChatMessages.objects.create(session=session, message='fish & chips', author='User')
+        ChatMessages.objects.create(session=other_session, message='python secrets of someone else', author='User')
+        CodingTasks.objects.create(user=cls.user, title='Binary search', task_goal='Write it in python', time_limit=30)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_only_the_callers_rows_are_returned(self):
+        data = self.search(q='python')
+        self.assertEqual([hit['snippet'] for hit in data['results']], ['How do I profile a <b>python</b> loop?'])
+        self.client.force_authenticate(self.other)
+        self.assertEqual(
+            [hit['snippet'] for hit in self.search(q='python')['results']],
+            ['<b>python</b> secrets of someone else'],
+        )
+        self.assertEqual(self.search(q='profile')['results'], [])
+
+    def test_last_term_matches_as_a_prefix(self):
+        self.assertEqual(len(self.search(q='pyth')['results']), 1)
+        self.assertEqual(len(self.search(q='profile loo')['results']), 1)
+        # Only the last term is a prefix, and only from MIN_PREFIX_LENGTH.
+        self.assertEqual(self.search(q='pro loop')['results'], [])
+        self.assertEqual(self.search(q='py')['results'], [])
+
+    def test_result_fields(self):
+        [hit] = self.search(q='loop')['results']
+        message = ChatMessages.objects.get(message__contains='loop')
+        self.assertEqual(hit['id'], str(message.pk))
+        self.assertEqual(hit['session_id'], message.session_id)
+        [task] = self.search(q='binary', type='tasks')['results']
+        self.assertEqual(task['title'], 'Binary search')
+
+    def test_snippets_are_escaped_without_breaking_entities(self):
+        [hit] = self.search(q='chips')['results']
+        self.assertEqual(hit['snippet'], 'fish &amp; <b>chips</b>')
+        self.assertEqual(self.search(q='amp')['results'], [])
+
+    def test_has_next(self):
+        session = ChatSession.objects.create(user=self.user)
+        # create(), not bulk_create(): rows are indexed by post_save.
+        for i in range(5):
+            ChatMessages.objects.create(session=session, message=f'paged result {i}', author='User')
+        pages = [self.search(q='paged', page=page, page_size=2) for page in (1, 2, 3)]
+        self.assertEqual([len(page['results']) for page in pages], [2, 2, 1])
+        self.assertEqual([page['has_next'] for page in pages], [True, True, False])
+        self.assertEqual(len({hit['id'] for page in pages for hit in page['results']}), 5)
+
+    def test_query_is_required(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
@@ -0,0 +1,123 @@
+import re
+
+from django.utils.html import escape
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from users.schemas import RESPONSES, get_error_response
+
+from .backends import TERM_RE, get_backend
+from .indexes import INDEXES
+from .serializers import SearchQuerySerializer
+
+SNIPPET_LENGTH = 200
+
+
+def make_snippet(text, query):
+    """Return an escaped excerpt of ``text`` around the first hit, hits in <b>."""
+    terms = TERM_RE.findall(query.lower())
+    pattern = re.compile(r'\b(' + '|'.join(re.escape(term) for term in terms) + r')\w*', re.IGNORECASE)
+    match = pattern.search(text)
+    start = max(match.start() - SNIPPET_LENGTH // 4, 0) if match else 0
+    excerpt = text[start:start + SNIPPET_LENGTH]
+    # Match on the raw text and escape each piece, so terms never match
+    # inside the entities escaping produces.
+    pieces, end = [], 0
+    for match in pattern.finditer(excerpt):
+        pieces.append(escape(excerpt[end:match.start()]))
+        pieces.append(f'<b>{escape(match.group(0))}</b>')
+        end = match.end()
+    pieces.append(escape(excerpt[end:]))
+    return ('…' if start else '') + ''.join(pieces) + ('…' if start + SNIPPET_LENGTH < len(text) else '')
+
+
+def serialize_result(kind, obj, score, query):
+    if kind == 'messages':
+        data = {
+            # Snowflake ids exceed the 2**53 that JavaScript clients can hold
+            # exactly; rendered as strings like ChatMessageSerializer does.
+            'id': str(obj.pk),
+            'session_id': obj.session_id,
+            'author': obj.author,
+            'date': obj.date,
+        }
+        text = obj.message
+    else:
+        data = {
+            'id': obj.pk,
+            'title': obj.title,
+            'completed': obj.completed,
+        }
+        text = obj.task_goal
+    data['snippet'] = make_snippet(text, query)
+    data['score'] = score
+    return data
+
+
+class SearchView(APIView):
+    """
+    get:
+    Search the authenticated user's chat history or coding tasks
+
+    Results are ranked by relevance and only ever include the caller's own
+    rows. Messages of archived chat sessions are not searched.
+    """
+    permission_classes = (permissions.IsAuthenticated,)
+
+    @swagger_auto_schema(
+        operation_description="Full-text search over the user's chat messages or coding tasks",
+        query_serializer=SearchQuerySerializer,
+        responses={
+            status.HTTP_200_OK: openapi.Response(
+                description='Ranked search results',
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'results': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(type=openapi.TYPE_OBJECT)
+                        ),
+                        'page': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'has_next': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                    }
+                )
+            ),
+            status.HTTP_400_BAD_REQUEST: get_error_response(
+                'Validation Error',
+                {'q': ['This field is required.']}
+            ),
+            **{k: v for k, v in RESPONSES.items() if k in ['401_UNAUTHORIZED']}
+        },
+        tags=['Search']
+    )
+    def get(self, request):
+        params = SearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        kind = params.validated_data['type']
+        page = params.validated_data['page']
+        page_size = params.validated_data['page_size']
+        query = params.validated_data['q']
+        index = INDEXES[kind]
+
+        # Fetch one extra hit to learn whether there is a next page without
+        # counting every match.
+        hits = get_backend().search(
+            index,
+            request.user.pk,
+            query,
+            limit=page_size + 1,
+            offset=(page - 1) * page_size,
+        )
+        has_next = len(hits) > page_size
+        hits = hits[:page_size]
+
+        objects = index.model._default_manager.in_bulk([pk for pk, _score in hits])
+        results = [
+            serialize_result(kind, objects[pk], score, query)
+            for pk, score in hits
+            if pk in objects
+        ]
+        return Response({'results': results, 'page': page, 'has_next': has_next})
@@ -0,0 +1,38 @@
+"""
+In-process publish/subscribe for task events.
+
+Subscribers are the server-sent event streams open in this process, keyed by
+user. ``publish`` must be called from the event loop that serves them.
+"""
+import asyncio
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Events a slow client has not read yet; newer ones are dropped past this.
+MAX_QUEUED_EVENTS = 100
+
+
+class EventBroker:
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+
+    def publish(self, user_id, event):
+        for queue in self._subscribers.get(user_id, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                pass
+
+    @contextmanager
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=MAX_QUEUED_EVENTS)
+        self._subscribers[user_id].add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers[user_id].discard(queue)
+            if not self._subscribers[user_id]:
+                del self._subscribers[user_id]
+
+
+broker = EventBroker()
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CodingTasks',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255, verbose_name='title')),
+                ('task_goal', models.TextField(verbose_name='task goal')),
+                ('time_limit', models.PositiveIntegerField(help_text='In minutes.', verbose_name='time limit')),
+                ('started', models.BooleanField(default=False, verbose_name='started')),
+                ('completed', models.BooleanField(default=False, verbose_name='completed')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coding_tasks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'coding tasks',
+            },
+        ),
+    ]
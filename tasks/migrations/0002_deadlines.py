@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='codingtasks',
+            name='deadline',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='deadline'),
+        ),
+        migrations.AddField(
+            model_name='codingtasks',
+            name='expired',
+            field=models.BooleanField(default=False, verbose_name='expired'),
+        ),
+        migrations.AddField(
+            model_name='codingtasks',
+            name='started_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='started at'),
+        ),
+        migrations.AddIndex(
+            model_name='codingtasks',
+            index=models.Index(condition=models.Q(('completed', False), ('expired', False), ('started_at__isnull', False)), fields=['started_at'], name='tasks_pending_started_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_deadlines'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='codingtasks',
+            index=models.Index(fields=['user', 'id'], name='tasks_user_id_idx'),
+        ),
+    ]
@@ -1,3 +1,78 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class CodingTasksQuerySet(models.QuerySet):
+    def pending(self):
+        """Started tasks that have neither been completed nor expired."""
+        return self.filter(started_at__isnull=False, completed=False, expired=False)
+
+
+class CodingTasks(models.Model):
+    """
+    A coding challenge assigned to a user, with a time limit in minutes.
+
+    Starting a task sets its deadline; ``tasks.scheduler`` marks it expired
+    once the deadline passes without it being completed.
+    """
+    title = models.CharField(_('title'), max_length=255)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='coding_tasks',
+    )
+    task_goal = models.TextField(_('task goal'))
+    time_limit = models.PositiveIntegerField(_('time limit'), help_text=_('In minutes.'))
+    started = models.BooleanField(_('started'), default=False)
+    completed = models.BooleanField(_('completed'), default=False)
+    expired = models.BooleanField(_('expired'), default=False)
+    started_at = models.DateTimeField(_('started at'), null=True, blank=True, editable=False)
+    deadline = models.DateTimeField(_('deadline'), null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    objects = CodingTasksQuerySet.as_manager()
+
+    class Meta:
+        verbose_name_plural = 'coding tasks'
+        indexes = [
+            # Keyset pagination of a user's tasks, newest first.
+            models.Index(fields=['user', 'id'], name='tasks_user_id_idx'),
+            # Serves the scheduler's restore and incremental loads only, so
+            # it stays as small as the set of running tasks.
+            models.Index(
+                fields=['started_at'],
+                condition=models.Q(started_at__isnull=False, completed=False, expired=False),
+                name='tasks_pending_started_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    def start(self):
+        """
+        Start the task's clock. Returns False if it was already started,
+        including by a concurrent request since this instance was loaded.
+        """
+        started_at = timezone.now()
+        deadline = started_at + timedelta(minutes=self.time_limit)
+        updated = CodingTasks.objects.filter(pk=self.pk, started=False).update(
+            started=True, started_at=started_at, deadline=deadline,
+        )
+        if updated:
+            self.started, self.started_at, self.deadline = True, started_at, deadline
+        return bool(updated)
 
-# Create your models here.
+    def complete(self):
+        """
+        Mark a running task completed. Returns False if its deadline has
+        passed, even when the scheduler has not flagged it expired yet.
+        """
+        updated = CodingTasks.objects.pending().filter(pk=self.pk, deadline__gt=timezone.now()).update(completed=True)
+        if updated:
+            self.completed = True
+        return bool(updated)
@@ -0,0 +1,170 @@
+"""
+Expiry of coding tasks whose time limit has run out.
+
+The scheduler runs as a background coroutine inside the ASGI application
+(see ``SchedulerLifespan``). On startup it loads the deadline of every
+running task into a ``TimingWheel``; afterwards it only reads tasks started
+since its last load, every ``SYNC_INTERVAL`` seconds, through a partial
+index that covers running tasks alone. Each tick it expires the due tasks
+with batched UPDATEs and pushes a ``task.expired`` event to the owner's
+open event streams.
+
+Every ASGI process runs its own scheduler. Expiring is idempotent, and each
+process notifies its own subscribers of every due task it sees, whichever
+process flipped the flag.
+"""
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .events import broker
+from .models import CodingTasks
+from .timing_wheel import TimingWheel
+
+logger = logging.getLogger(__name__)
+
+
+class TaskScheduler:
+    def __init__(self, tick, slot_bits, levels, batch_size, sync_interval):
+        self.wheel = TimingWheel(time.time(), tick=tick, slot_bits=slot_bits, levels=levels)
+        self.tick = tick
+        self.batch_size = batch_size
+        self.sync_interval = sync_interval
+        self.loaded_at = None
+
+    def load(self):
+        """
+        Add the deadlines of running tasks to the wheel: all of them on the
+        first call, then those started since the previous call.
+        """
+        close_old_connections()
+        queryset = CodingTasks.objects.pending()
+        started = timezone.now()
+        if self.loaded_at is not None:
+            # Overlap the previous load so tasks whose transaction committed
+            # after it ran are not missed; re-adding a deadline is a no-op.
+            queryset = queryset.filter(started_at__gte=self.loaded_at - timedelta(seconds=self.sync_interval))
+        rows = queryset.values_list('pk', 'deadline').iterator(chunk_size=10000)
+        count = 0
+        for pk, deadline in rows:
+            self.wheel.add(pk, deadline.timestamp())
+            count += 1
+        self.loaded_at = started
+        return count
+
+    def expire(self, task_ids):
+        """
+        Flag ``task_ids`` as expired if they are still running past their
+        deadline. Returns ``(pk, user_id, deadline)`` for each due task.
+        """
+        close_old_connections()
+        now = timezone.now()
+        due = []
+        for start in range(0, len(task_ids), self.batch_size):
+            batch = task_ids[start:start + self.batch_size]
+            with transaction.atomic():
+                rows = list(
+                    CodingTasks.objects
+                    .select_for_update()
+                    .filter(pk__in=batch, completed=False, deadline__lte=now)
+                    .values_list('pk', 'user_id', 'deadline')
+                )
+                CodingTasks.objects.filter(
+                    pk__in=[pk for pk, _user_id, _deadline in rows],
+                    completed=False,
+                    expired=False,
+                ).update(expired=True)
+            due.extend(rows)
+        return due
+
+    def notify(self, rows):
+        for pk, user_id, deadline in rows:
+            broker.publish(user_id, {
+                'type': 'task.expired',
+                'id': pk,
+                'deadline': deadline.isoformat(),
+            })
+
+    async def run(self):
+        # Off the thread that serves sync views: a restore can take seconds.
+        load = sync_to_async(self.load, thread_sensitive=False)
+        expire = sync_to_async(self.expire, thread_sensitive=False)
+        # The first load restores every running task, retried until it succeeds.
+        next_load = 0
+        while True:
+            due = self.wheel.advance(time.time())
+            if due:
+                try:
+                    rows = await expire(due)
+                except Exception:
+                    logger.exception('Expiring %d coding tasks failed; retrying', len(due))
+                    # Already past their deadline, so they are due again on the next tick.
+                    for pk in due:
+                        self.wheel.add(pk, 0)
+                else:
+                    self.notify(rows)
+
+            if time.monotonic() >= next_load:
+                try:
+                    await load()
+                except Exception:
+                    logger.exception('Loading coding task deadlines failed')
+                next_load = time.monotonic() + self.sync_interval
+
+            # Wake up on tick boundaries.
+            await asyncio.sleep(self.tick - time.time() % self.tick)
+
+
+scheduler = TaskScheduler(
+    tick=settings.TASK_SCHEDULER['TICK'],
+    slot_bits=settings.TASK_SCHEDULER['SLOT_BITS'],
+    levels=settings.TASK_SCHEDULER['LEVELS'],
+    batch_size=settings.TASK_SCHEDULER['BATCH_SIZE'],
+    sync_interval=settings.TASK_SCHEDULER['SYNC_INTERVAL'],
+)
+
+
+class SchedulerLifespan:
+    """
+    ASGI wrapper that runs ``scheduler`` next to the Django application.
+
+    The scheduler starts on the lifespan startup event, or with the first
+    request on servers that do not send lifespan events.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.task = None
+
+    def start(self):
+        if self.task is None and settings.TASK_SCHEDULER['ENABLED']:
+            self.task = asyncio.get_running_loop().create_task(scheduler.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'lifespan':
+            self.start()
+            return await self.app(scope, receive, send)
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.stop()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
@@ -0,0 +1,28 @@
+from rest_framework import serializers
+
+from .models import CodingTasks
+
+
+class CodingTaskSerializer(serializers.ModelSerializer):
+    """
+    Serializer for coding tasks.
+
+    Fields:
+        id: The unique identifier for the task (read-only)
+        title: Short title of the task
+        task_goal: What the user has to build
+        time_limit: Minutes allowed once the task is started
+        started: Whether the task has been started (read-only)
+        completed: Whether the task was completed in time (read-only)
+        expired: Whether the time limit ran out first (read-only)
+        started_at: When the task was started (read-only)
+        deadline: When the time limit runs out (read-only)
+        created_at: When the task was created (read-only)
+    """
+    class Meta:
+        model = CodingTasks
+        fields = (
+            'id', 'title', 'task_goal', 'time_limit', 'started', 'completed',
+            'expired', 'started_at', 'deadline', 'created_at',
+        )
+        read_only_fields = ('started', 'completed', 'expired', 'started_at', 'deadline', 'created_at')
@@ -1,3 +1,294 @@
-from django.test import TestCase
+import json
+import math
+import random
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from users.models import User
+
+from . import views
+from .events import broker
+from .models import CodingTasks
+from .scheduler import TaskScheduler
+from .timing_wheel import TimingWheel
+
+
+class TimingWheelTests(SimpleTestCase):
+    # 4 ticks per level-0 rotation, 16 per level 1, 64 per level 2; anything
+    # further out starts in the overflow heap.
+    def make_wheel(self, now=0.0):
+        return TimingWheel(now, tick=1.0, slot_bits=2, levels=3)
+
+    def run_wheel(self, wheel, until, step=1):
+        """Advance ``wheel`` to ``until`` and return {key: tick it expired on}."""
+        fired = {}
+        now = wheel.current
+        while now < until:
+            now = min(now + step, until)
+            for key in wheel.advance(now):
+                self.assertNotIn(key, fired, f'{key} expired twice')
+                fired[key] = now
+        return fired
+
+    def test_expires_on_the_deadline_tick_across_levels_and_overflow(self):
+        start = 5
+        wheel = self.make_wheel(start)
+        deadlines = {}
+        # Every boundary of level 1 (16), level 2 (64) and the overflow
+        # range, plus the ticks on either side and fractional deadlines.
+        for boundary in (4, 16, 64, 128, 192, 256):
+            for offset in (-1, -0.5, 0, 0.25, 1):
+                deadline = boundary + offset
+                if deadline > start:
+                    deadlines[f'{boundary}{offset:+}'] = deadline
+        for key, deadline in deadlines.items():
+            wheel.add(key, deadline)
+
+        fired = self.run_wheel(wheel, 300)
+        self.assertEqual(fired, {key: math.ceil(deadline) for key, deadline in deadlines.items()})
+        self.assertEqual(len(wheel), 0)
+
+    def test_randomized_deadlines_expire_exactly_once_on_time(self):
+        rnd = random.Random(0)
+        start = 1000.3
+        wheel = self.make_wheel(start)
+        deadlines = {key: start + rnd.uniform(0, 400) for key in range(2000)}
+        for key, deadline in deadlines.items():
+            wheel.add(key, deadline)
+
+        fired = self.run_wheel(wheel, 1500)
+        expected = {key: max(math.ceil(deadline), 1001) for key, deadline in deadlines.items()}
+        # Only the mismatches, so a failure doesn't diff 2000 entries.
+        wrong = {key: (fired.get(key), tick) for key, tick in expected.items() if fired.get(key) != tick}
+        self.assertEqual(wrong, {})
+        self.assertEqual(len(fired), len(expected))
+
+    def test_large_jumps_expire_everything_due(self):
+        rnd = random.Random(1)
+        wheel = self.make_wheel()
+        deadlines = {key: rnd.uniform(1, 500) for key in range(500)}
+        for key, deadline in deadlines.items():
+            wheel.add(key, deadline)
+
+        fired = self.run_wheel(wheel, 600, step=37)
+        for key, deadline in deadlines.items():
+            # Expired on the first advance at or after its deadline.
+            self.assertGreaterEqual(fired[key], deadline)
+            self.assertLess(fired[key] - 37, deadline)
+
+    def test_remove(self):
+        wheel = self.make_wheel()
+        wheel.add('a', 10)
+        wheel.add('b', 100)
+        self.assertTrue(wheel.remove('a'))
+        self.assertFalse(wheel.remove('a'))
+        self.assertFalse(wheel.remove('missing'))
+        self.assertNotIn('a', wheel)
+        self.assertEqual(self.run_wheel(wheel, 200), {'b': 100})
+
+    def test_readd_with_a_new_deadline(self):
+        wheel = self.make_wheel()
+        wheel.add('later', 10)
+        wheel.add('later', 90)
+        wheel.add('earlier', 90)
+        wheel.add('earlier', 10)
+        wheel.add('removed', 20)
+        wheel.remove('removed')
+        wheel.add('removed', 70)
+        self.assertEqual(self.run_wheel(wheel, 200), {'later': 90, 'earlier': 10, 'removed': 70})
+
+    def test_readd_after_expiry(self):
+        wheel = self.make_wheel()
+        wheel.add('a', 3)
+        self.assertEqual(self.run_wheel(wheel, 5), {'a': 3})
+        wheel.add('a', 8)
+        self.assertEqual(self.run_wheel(wheel, 20), {'a': 8})
+
+    def test_retry_with_deadline_zero(self):
+        # TaskScheduler.run() puts keys whose expiry failed back with
+        # deadline 0; they must come out of the very next advance, even if
+        # no tick has passed, and only once.
+        wheel = self.make_wheel(50)
+        wheel.add(1, 52)
+        wheel.add(2, 80)
+        self.assertEqual(wheel.advance(52), [1])
+        wheel.add(1, 0)
+        self.assertEqual(wheel.advance(52), [1])
+        self.assertEqual(wheel.advance(53), [])
+        self.assertEqual(self.run_wheel(wheel, 100), {2: 80})
+
+    def test_deadline_on_the_current_tick_is_due_immediately(self):
+        wheel = self.make_wheel(50)
+        wheel.add(1, 50)
+        self.assertEqual(wheel.advance(50), [1])
+
+    def test_retry_with_deadline_zero_replaces_a_pending_deadline(self):
+        wheel = self.make_wheel(50)
+        wheel.add(1, 500)
+        wheel.add(1, 0)
+        self.assertEqual(wheel.advance(50), [1])
+        self.assertEqual(self.run_wheel(wheel, 600), {})
+
+
+class TaskMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='coder@example.com', password='x')
+
+    def make_task(self, started_ago=None, time_limit=30, **fields):
+        task = CodingTasks.objects.create(user=self.user, title='FizzBuzz', task_goal='Print it', time_limit=time_limit)
+        if started_ago is not None:
+            started_at = timezone.now() - started_ago
+            fields = {
+                'started': True, 'started_at': started_at,
+                'deadline': started_at + timedelta(minutes=time_limit), **fields,
+            }
+        CodingTasks.objects.filter(pk=task.pk).update(**fields)
+        task.refresh_from_db()
+        return task
+
+
+class TaskViewTests(TaskMixin, APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def start(self, task):
+        return self.client.post(reverse('tasks:task_start', args=[task.pk]))
+
+    def complete(self, task):
+        return self.client.post(reverse('tasks:task_complete', args=[task.pk]))
+
+    def test_start_sets_the_deadline_once(self):
+        task = self.make_task()
+        response = self.start(task)
+        self.assertEqual(response.status_code, 200)
+        task.refresh_from_db()
+        self.assertTrue(response.data['started'])
+        self.assertEqual(task.deadline - task.started_at, timedelta(minutes=30))
+
+        response = self.start(task)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.data)
+        self.assertEqual(CodingTasks.objects.get(pk=task.pk).deadline, task.deadline)
+
+    def test_concurrent_start_keeps_the_first_deadline(self):
+        task = self.make_task()
+        get_object_or_404 = views.get_object_or_404
+
+        def racing_get(*args, **kwargs):
+            loaded = get_object_or_404(*args, **kwargs)
+            # Another request starts the task after this one loaded it.
+            CodingTasks.objects.get(pk=loaded.pk).start()
+            return loaded
+        with mock.patch.object(views, 'get_object_or_404', racing_get):
+            response = self.start(task)
+        self.assertEqual(response.status_code, 400)
+        winner = CodingTasks.objects.get(pk=task.pk)
+        self.assertTrue(winner.started)
+        self.assertFalse(task.start())
+        self.assertEqual(CodingTasks.objects.get(pk=task.pk).deadline, winner.deadline)
+
+    def test_other_users_tasks_are_not_found(self):
+        task = self.make_task()
+        self.client.force_authenticate(User.objects.create_user(email='other@example.com', password='x'))
+        self.assertEqual(self.start(task).status_code, 404)
+        self.assertEqual(self.complete(task).status_code, 404)
+
+    def test_complete_a_running_task(self):
+        task = self.make_task(started_ago=timedelta(minutes=5))
+        response = self.complete(task)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['completed'])
+        self.assertEqual(self.complete(task).status_code, 400)
+
+    def test_only_running_tasks_within_their_deadline_complete(self):
+        cases = {
+            'not started': self.make_task(),
+            # Past the deadline, though the scheduler hasn't flagged it yet.
+            'overdue': self.make_task(started_ago=timedelta(minutes=31)),
+            'expired': self.make_task(started_ago=timedelta(minutes=31), expired=True),
+        }
+        for label, task in cases.items():
+            with self.subTest(label):
+                self.assertFalse(task.complete())
+                self.assertEqual(self.complete(task).status_code, 400)
+                self.assertFalse(CodingTasks.objects.get(pk=task.pk).completed)
+
+
+class TaskSchedulerTests(TaskMixin, TestCase):
+    def setUp(self):
+        self.scheduler = TaskScheduler(tick=1.0, slot_bits=6, levels=3, batch_size=2, sync_interval=15)
+
+    def test_first_load_restores_every_running_task_then_only_new_ones(self):
+        old = self.make_task(started_ago=timedelta(hours=1), time_limit=120)
+        recent = self.make_task(started_ago=timedelta(seconds=1))
+        self.make_task()
+        self.make_task(started_ago=timedelta(minutes=1), completed=True)
+        self.make_task(started_ago=timedelta(hours=1), expired=True)
+
+        self.assertEqual(self.scheduler.load(), 2)
+        self.assertIn(old.pk, self.scheduler.wheel)
+        self.assertIn(recent.pk, self.scheduler.wheel)
+
+        # Later loads only read tasks started within SYNC_INTERVAL of the
+        # previous one.
+        new = self.make_task(started_ago=timedelta(0))
+        self.assertEqual(self.scheduler.load(), 2)
+        self.assertIn(new.pk, self.scheduler.wheel)
+
+    def test_expire_flags_due_running_tasks(self):
+        due = [self.make_task(started_ago=timedelta(minutes=31)) for _ in range(3)]
+        running = self.make_task(started_ago=timedelta(minutes=1))
+        completed = self.make_task(started_ago=timedelta(minutes=31), completed=True)
+        task_ids = [task.pk for task in (*due, running, completed)]
+
+        rows = self.scheduler.expire(task_ids)
+        self.assertEqual(sorted(rows), sorted((task.pk, self.user.pk, task.deadline) for task in due))
+        self.assertEqual(
+            set(CodingTasks.objects.filter(expired=True).values_list('pk', flat=True)), {task.pk for task in due},
+        )
+        # Expiring again is harmless and still reports the due tasks, so
+        # every process notifies its own subscribers.
+        self.assertEqual(sorted(self.scheduler.expire(task_ids)), sorted(rows))
+
+    def test_notify_publishes_to_the_owner(self):
+        task = self.make_task(started_ago=timedelta(minutes=31))
+        with broker.subscribe(self.user.pk) as queue, broker.subscribe(self.user.pk + 1) as other:
+            self.scheduler.notify(self.scheduler.expire([task.pk]))
+            self.assertEqual(queue.get_nowait(), {
+                'type': 'task.expired', 'id': task.pk, 'deadline': task.deadline.isoformat(),
+            })
+            self.assertTrue(other.empty())
+
+
+class TaskEventsTests(TaskMixin, TestCase):
+    url = reverse('tasks:task_events')
+
+    async def test_requires_a_valid_token(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(self.url, headers={'authorization': 'Bearer not-a-jwt'})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_streams_the_users_events(self):
+        with mock.patch.object(JWTAuthentication, 'authenticate', return_value=(self.user, None)):
+            response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+
+        event = {'type': 'task.expired', 'id': 1, 'deadline': '2024-01-01T00:00:00+00:00'}
+        broker.publish(self.user.pk + 1, {**event, 'id': 2})
+        broker.publish(self.user.pk, event)
+        self.assertEqual(await anext(stream), f'event: task.expired\ndata: {json.dumps(event)}\n\n'.encode())
+
+        with mock.patch.object(views, 'KEEPALIVE_INTERVAL', 0.01):
+            self.assertEqual(await anext(stream), b': keepalive\n\n')
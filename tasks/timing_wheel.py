@@ -0,0 +1,104 @@
+"""
+Hierarchical timing wheel.
+
+Deadlines are rounded up to whole ticks. Level 0 has one slot per tick, and
+each level above it has slots ``2 ** slot_bits`` times as wide. A deadline
+goes into the lowest level whose current rotation contains it; when a
+higher-level slot comes round, its entries are cascaded down. Deadlines
+beyond the top level's range wait in a heap until they come into range.
+Adding, cancelling and expiring a deadline are all O(1) amortized, however
+many deadlines are pending.
+"""
+import heapq
+import math
+
+
+class TimingWheel:
+    def __init__(self, now, tick=1.0, slot_bits=6, levels=3):
+        self.tick = tick
+        self.slot_bits = slot_bits
+        self.levels = levels
+        self.mask = (1 << slot_bits) - 1
+        self.current = math.floor(now / tick)
+        self.wheels = [[[] for _ in range(1 << slot_bits)] for _ in range(levels)]
+        # (tick, key) pairs beyond the range of the top level.
+        self.overflow = []
+        # Keys that were already due when added.
+        self.due = []
+        # Slots only hold keys; an entry is live while it matches this map,
+        # so cancelling or rescheduling leaves stale entries to be skipped.
+        self.deadlines = {}
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def __contains__(self, key):
+        return key in self.deadlines
+
+    def add(self, key, deadline):
+        """Schedule ``key`` to expire at the ``deadline`` timestamp, replacing any earlier deadline."""
+        # Round up so nothing ever expires early.
+        tick = math.ceil(deadline / self.tick)
+        if self.deadlines.get(key) == tick:
+            return
+        self.deadlines[key] = tick
+        if tick <= self.current:
+            self.due.append(key)
+        else:
+            self._place(key, tick)
+
+    def remove(self, key):
+        """Cancel ``key``. Returns whether it was pending."""
+        return self.deadlines.pop(key, None) is not None
+
+    def _place(self, key, tick):
+        # The lowest level whose current rotation contains ``tick`` is given
+        # by the highest bit in which ``tick`` and the current tick differ.
+        level = (((tick ^ self.current) | 1).bit_length() - 1) // self.slot_bits
+        if level >= self.levels:
+            heapq.heappush(self.overflow, (tick, key))
+        else:
+            self.wheels[level][(tick >> (self.slot_bits * level)) & self.mask].append(key)
+
+    def _cascade(self, level):
+        shift = self.slot_bits * level
+        slot = self.wheels[level][(self.current >> shift) & self.mask]
+        self.wheels[level][(self.current >> shift) & self.mask] = []
+        for key in slot:
+            tick = self.deadlines.get(key)
+            if tick is not None and tick >> shift == self.current >> shift:
+                self._place(key, tick)
+
+    def advance(self, now):
+        """Move the wheel to the ``now`` timestamp and return the keys that expired."""
+        expired = []
+        due, self.due = self.due, []
+        for key in due:
+            tick = self.deadlines.get(key)
+            if tick is not None and tick <= self.current:
+                del self.deadlines[key]
+                expired.append(key)
+
+        target = math.floor(now / self.tick)
+        top_shift = self.slot_bits * self.levels
+        while self.current < target:
+            self.current += 1
+            if not self.current & ((1 << top_shift) - 1):
+                while self.overflow and self.overflow[0][0] >> top_shift == self.current >> top_shift:
+                    tick, key = heapq.heappop(self.overflow)
+                    if self.deadlines.get(key) == tick:
+                        self._place(key, tick)
+            for level in range(self.levels - 1, 0, -1):
+                if not self.current & ((1 << (self.slot_bits * level)) - 1):
+                    self._cascade(level)
+
+            index = self.current & self.mask
+            slot = self.wheels[0][index]
+            if not slot:
+                continue
+            self.wheels[0][index] = []
+            for key in slot:
+                if self.deadlines.get(key) == self.current:
+                    del self.deadlines[key]
+                    expired.append(key)
+        return expired
@@ -0,0 +1,12 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'tasks'
+
+urlpatterns = [
+    path('', views.CodingTaskListCreateView.as_view(), name='task_list'),
+    path('<int:task_id>/start/', views.CodingTaskStartView.as_view(), name='task_start'),
+    path('<int:task_id>/complete/', views.CodingTaskCompleteView.as_view(), name='task_complete'),
+    path('events/', views.task_events, name='task_events'),
+]
@@ -1,3 +1,161 @@
-from django.shortcuts import render
+import asyncio
+import json
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.translation import gettext_lazy as _
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from core.pagination import paginated
+from users.schemas import RESPONSES, get_error_response
+
+from .events import broker
+from .models import CodingTasks
+from .serializers import CodingTaskSerializer
+
+# Comment lines keep idle event streams open through proxies.
+KEEPALIVE_INTERVAL = 15
+
+
+class CodingTaskListCreateView(generics.ListCreateAPIView):
+    """
+    get:
+    List the authenticated user's coding tasks
+
+    post:
+    Create a coding task
+    """
+    serializer_class = CodingTaskSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_queryset(self):
+        return CodingTasks.objects.filter(user=self.request.user).order_by('-id')
+
+    @swagger_auto_schema(
+        operation_description="List the authenticated user's coding tasks",
+        responses={
+            status.HTTP_200_OK: paginated(CodingTaskSerializer)(),
+            **{k: v for k, v in RESPONSES.items() if k in ['401_UNAUTHORIZED']}
+        },
+        tags=['Tasks']
+    )
+    def get(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_description="Create a coding task",
+        request_body=CodingTaskSerializer,
+        responses={
+            status.HTTP_201_CREATED: CodingTaskSerializer(),
+            status.HTTP_400_BAD_REQUEST: get_error_response(
+                'Validation Error',
+                {'time_limit': ['This field is required.']}
+            ),
+            **{k: v for k, v in RESPONSES.items() if k in ['401_UNAUTHORIZED']}
+        },
+        tags=['Tasks']
+    )
+    def post(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class CodingTaskStartView(APIView):
+    """
+    post:
+    Start a coding task
+
+    The time limit starts counting now; the task expires at the returned
+    deadline unless it is completed first.
+    """
+    permission_classes = (permissions.IsAuthenticated,)
+
+    @swagger_auto_schema(
+        operation_description="Start a coding task",
+        request_body=None,
+        responses={
+            status.HTTP_200_OK: CodingTaskSerializer(),
+            status.HTTP_400_BAD_REQUEST: get_error_response(
+                'Task already started',
+                {}
+            ),
+            **{k: v for k, v in RESPONSES.items() if k in ['401_UNAUTHORIZED', '404_NOT_FOUND']}
+        },
+        tags=['Tasks']
+    )
+    def post(self, request, task_id):
+        task = get_object_or_404(CodingTasks, pk=task_id, user=request.user)
+        if not task.start():
+            return Response({'error': _('Task already started')}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(CodingTaskSerializer(task).data)
+
+
+class CodingTaskCompleteView(APIView):
+    """
+    post:
+    Mark a running coding task as completed
+    """
+    permission_classes = (permissions.IsAuthenticated,)
+
+    @swagger_auto_schema(
+        operation_description="Mark a running coding task as completed",
+        request_body=None,
+        responses={
+            status.HTTP_200_OK: CodingTaskSerializer(),
+            status.HTTP_400_BAD_REQUEST: get_error_response(
+                'Task is not running',
+                {}
+            ),
+            **{k: v for k, v in RESPONSES.items() if k in ['401_UNAUTHORIZED', '404_NOT_FOUND']}
+        },
+        tags=['Tasks']
+    )
+    def post(self, request, task_id):
+        task = get_object_or_404(CodingTasks, pk=task_id, user=request.user)
+        if not task.complete():
+            return Response({'error': _('Task is not running')}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(CodingTaskSerializer(task).data)
+
+
+async def event_stream(user_id):
+    with broker.subscribe(user_id) as queue:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield f'event: {event["type"]}\ndata: {json.dumps(event)}\n\n'
+
+
+async def task_events(request):
+    """
+    Server-sent events for the authenticated user's coding tasks.
+
+    Emits ``task.expired`` when a running task's time limit runs out. Served
+    only by the ASGI application, which holds the scheduler.
+    """
+    try:
+        auth = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except AuthenticationFailed:
+        return JsonResponse({'error': _('Invalid token')}, status=status.HTTP_401_UNAUTHORIZED)
+    if auth is None:
+        return JsonResponse(
+            {'error': _('Authentication credentials were not provided.')},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
+    user, _token = auth
+    response = StreamingHttpResponse(event_stream(user.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
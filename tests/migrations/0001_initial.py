@@ -0,0 +1,97 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Questions',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_type', models.CharField(choices=[('FreeText', 'Free text'), ('MultipleChoice', 'Multiple choice')], max_length=16, verbose_name='question type')),
+                ('text', models.TextField(verbose_name='text')),
+            ],
+            options={
+                'verbose_name_plural': 'questions',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.CreateModel(
+            name='Tests',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+            ],
+            options={
+                'verbose_name': 'test',
+                'verbose_name_plural': 'tests',
+            },
+        ),
+        migrations.CreateModel(
+            name='Answers',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('choice', models.TextField(verbose_name='choice')),
+                ('is_correct', models.BooleanField(default=False, verbose_name='is correct')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='tests.questions')),
+            ],
+            options={
+                'verbose_name_plural': 'answers',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.CreateModel(
+            name='Submissions',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveIntegerField(verbose_name='score')),
+                ('question_count', models.PositiveIntegerField(verbose_name='question count')),
+                ('submitted_at', models.DateTimeField(auto_now_add=True, verbose_name='submitted at')),
+                ('idempotency_key', models.CharField(max_length=255, verbose_name='idempotency key')),
+                ('payload_hash', models.CharField(editable=False, max_length=64)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='test_submissions', to=settings.AUTH_USER_MODEL)),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='tests.tests')),
+            ],
+            options={
+                'verbose_name_plural': 'submissions',
+            },
+        ),
+        migrations.AddField(
+            model_name='questions',
+            name='test',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='questions', to='tests.tests'),
+        ),
+        migrations.CreateModel(
+            name='SubmissionAnswers',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField(blank=True, verbose_name='text')),
+                ('is_correct', models.BooleanField(verbose_name='is correct')),
+                ('answer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tests.answers')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tests.questions')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='tests.submissions')),
+            ],
+            options={
+                'verbose_name_plural': 'submission answers',
+                'constraints': [models.UniqueConstraint(fields=('submission', 'question'), name='tests_submission_answer_unique')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='submissions',
+            index=models.Index(fields=['user', 'test', 'id'], name='tests_submission_user_test_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='submissions',
+            constraint=models.UniqueConstraint(fields=('user', 'idempotency_key'), name='tests_submission_idempotency_key'),
+        ),
+    ]
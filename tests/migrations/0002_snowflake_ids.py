@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:52
+
+import core.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='submissionanswers',
+            name='id',
+            field=core.fields.SnowflakeField(),
+        ),
+        migrations.AlterField(
+            model_name='submissions',
+            name='id',
+            field=core.fields.SnowflakeField(),
+        ),
+    ]
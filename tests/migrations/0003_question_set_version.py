@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0002_snowflake_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tests',
+            name='question_set_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
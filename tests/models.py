@@ -1,3 +1,107 @@
+from django.conf import settings
 from django.db import models
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+from core.fields import SnowflakeField
+
+
+class QuestionType(models.TextChoices):
+    FREE_TEXT = 'FreeText', _('Free text')
+    MULTIPLE_CHOICE = 'MultipleChoice', _('Multiple choice')
+
+
+class Tests(models.Model):
+    """A test made of questions, taken by users through submissions."""
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    # Bumped whenever a question or answer of the test changes; part of the
+    # question set's cache key (see tests/questions.py).
+    question_set_version = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        verbose_name = 'test'
+        verbose_name_plural = 'tests'
+
+    def __str__(self):
+        return f'Test {self.pk}'
+
+
+class Questions(models.Model):
+    test = models.ForeignKey(Tests, on_delete=models.CASCADE, related_name='questions')
+    question_type = models.CharField(_('question type'), max_length=16, choices=QuestionType.choices)
+    text = models.TextField(_('text'))
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name_plural = 'questions'
+
+    def __str__(self):
+        return self.text[:50]
+
+
+class Answers(models.Model):
+    """
+    An answer option. Multiple-choice questions list every option; for
+    free-text questions the correct options are the accepted answers.
+    """
+    question = models.ForeignKey(Questions, on_delete=models.CASCADE, related_name='answers')
+    choice = models.TextField(_('choice'))
+    is_correct = models.BooleanField(_('is correct'), default=False)
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name_plural = 'answers'
+
+    def __str__(self):
+        return self.choice[:50]
+
+
+class Submissions(models.Model):
+    """
+    A user's completed attempt at a test. ``idempotency_key`` is supplied by
+    the client so a retried submission is stored only once.
+    """
+    id = SnowflakeField()
+    test = models.ForeignKey(Tests, on_delete=models.CASCADE, related_name='submissions')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='test_submissions',
+    )
+    score = models.PositiveIntegerField(_('score'))
+    question_count = models.PositiveIntegerField(_('question count'))
+    submitted_at = models.DateTimeField(_('submitted at'), auto_now_add=True)
+    idempotency_key = models.CharField(_('idempotency key'), max_length=255)
+    # Hash of the submitted answers, to tell a retry from a reused key.
+    payload_hash = models.CharField(max_length=64, editable=False)
+
+    class Meta:
+        verbose_name_plural = 'submissions'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='tests_submission_idempotency_key'),
+        ]
+        indexes = [
+            # Keyset pagination of a user's submissions for a test.
+            models.Index(fields=['user', 'test', 'id'], name='tests_submission_user_test_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} on {self.test}: {self.score}/{self.question_count}'
+
+
+class SubmissionAnswers(models.Model):
+    """The answer given to one question in a submission."""
+    id = SnowflakeField()
+    submission = models.ForeignKey(Submissions, on_delete=models.CASCADE, related_name='answers')
+    question = models.ForeignKey(Questions, on_delete=models.CASCADE, related_name='+')
+    answer = models.ForeignKey(Answers, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    text = models.TextField(_('text'), blank=True)
+    is_correct = models.BooleanField(_('is correct'))
+
+    class Meta:
+        verbose_name_plural = 'submission answers'
+        constraints = [
+            models.UniqueConstraint(fields=['submission', 'question'], name='tests_submission_answer_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.submission_id}: {self.question_id}'
@@ -0,0 +1,80 @@
+"""
+Cached question sets.
+
+Validating and scoring a submission needs every question of the test with
+its answer options. That set is read once and cached under
+``tests:question-set:<test id>:<version>``. tests/signals.py bumps
+``Tests.question_set_version`` in the same transaction as any change to a
+question or answer, so every worker moves to a new key as soon as the change
+commits, whatever cache backend it uses; stale entries simply expire.
+"""
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import Answers, QuestionType, Questions, Tests
+
+
+@dataclass(frozen=True)
+class Question:
+    id: int
+    question_type: str
+    text: str
+    # answer id -> (choice, is_correct)
+    answers: dict
+    # Normalized texts accepted for a free-text question.
+    accepted: frozenset
+
+    def score(self, answer_id=None, text=''):
+        if self.question_type == QuestionType.MULTIPLE_CHOICE:
+            return answer_id in self.answers and self.answers[answer_id][1]
+        return normalize(text) in self.accepted
+
+
+def normalize(text):
+    return ' '.join(text.split()).casefold()
+
+
+def cache_key(test):
+    return f'tests:question-set:{test.pk}:{test.question_set_version}'
+
+
+def load_question_set(test_id):
+    questions = {
+        pk: (question_type, text)
+        for pk, question_type, text in Questions.objects.filter(test_id=test_id).values_list(
+            'pk', 'question_type', 'text'
+        )
+    }
+    answers = {pk: {} for pk in questions}
+    for pk, question_id, choice, is_correct in Answers.objects.filter(question__test_id=test_id).values_list(
+        'pk', 'question_id', 'choice', 'is_correct'
+    ):
+        answers[question_id][pk] = (choice, is_correct)
+    return {
+        pk: Question(
+            id=pk,
+            question_type=question_type,
+            text=text,
+            answers=answers[pk],
+            accepted=frozenset(normalize(choice) for choice, is_correct in answers[pk].values() if is_correct),
+        )
+        for pk, (question_type, text) in questions.items()
+    }
+
+
+def get_question_set(test):
+    """``{question id: Question}`` for a test, in question order."""
+    key = cache_key(test)
+    question_set = cache.get(key)
+    if question_set is None:
+        question_set = load_question_set(test.pk)
+        cache.set(key, question_set, settings.TESTS['QUESTION_SET_TIMEOUT'])
+    return question_set
+
+
+def bump_question_set_version(**lookups):
+    """Move the tests matching ``lookups`` to a new question set cache key."""
+    Tests.objects.filter(**lookups).update(question_set_version=F('question_set_version') + 1)
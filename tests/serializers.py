@@ -0,0 +1,123 @@
+import hashlib
+import json
+
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+
+from core.fields import SnowflakeIdField
+
+from .models import QuestionType, SubmissionAnswers, Submissions
+
+
+class QuestionSerializer(serializers.Serializer):
+    """
+    A question as shown to the user taking the test, without correct answers.
+
+    Fields:
+        id: The unique identifier for the question
+        question_type: FreeText or MultipleChoice
+        text: The question
+        choices: Options to pick from (multiple-choice questions only)
+    """
+    id = serializers.IntegerField()
+    question_type = serializers.CharField()
+    text = serializers.CharField()
+    choices = serializers.SerializerMethodField()
+
+    def get_choices(self, question):
+        if question.question_type != QuestionType.MULTIPLE_CHOICE:
+            return []
+        return [{'id': pk, 'choice': choice} for pk, (choice, _is_correct) in question.answers.items()]
+
+
+class SubmittedAnswerSerializer(serializers.Serializer):
+    question = serializers.IntegerField()
+    answer = serializers.IntegerField(required=False, allow_null=True, help_text=_('Chosen answer id (multiple choice).'))
+    text = serializers.CharField(required=False, allow_blank=True, max_length=10000, help_text=_('Answer text (free text).'))
+
+
+class SubmissionCreateSerializer(serializers.Serializer):
+    """
+    All answers of one attempt at a test, validated against the test's
+    cached question set (``context['question_set']``). Unanswered questions
+    count as wrong.
+
+    Fields:
+        answers: List of {question, answer} or {question, text}
+    """
+    answers = SubmittedAnswerSerializer(many=True, allow_empty=False)
+
+    def validate_answers(self, answers):
+        question_set = self.context['question_set']
+        errors, seen = [], set()
+        for item in answers:
+            question = question_set.get(item['question'])
+            error = {}
+            if question is None:
+                error['question'] = [_('Question is not part of this test.')]
+            elif item['question'] in seen:
+                error['question'] = [_('Question is answered more than once.')]
+            elif question.question_type == QuestionType.MULTIPLE_CHOICE:
+                if item.get('answer') not in question.answers:
+                    error['answer'] = [_('Choose one of the question\'s answers.')]
+            elif not item.get('text', '').strip():
+                error['text'] = [_('This field is required.')]
+            seen.add(item['question'])
+            errors.append(error)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return answers
+
+    @staticmethod
+    def payload_hash(data):
+        """Fingerprint of a raw request payload, to recognise retries."""
+        payload = json.dumps(data.get('answers'), sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @transaction.atomic
+    def create(self, validated_data):
+        question_set = self.context['question_set']
+        answers = []
+        for item in validated_data['answers']:
+            question = question_set[item['question']]
+            answer_id = item.get('answer') if question.question_type == QuestionType.MULTIPLE_CHOICE else None
+            text = item.get('text', '') if answer_id is None else ''
+            answers.append(SubmissionAnswers(
+                question_id=question.id,
+                answer_id=answer_id,
+                text=text,
+                is_correct=question.score(answer_id, text),
+            ))
+
+        submission = Submissions.objects.create(
+            test=validated_data['test'],
+            user=validated_data['user'],
+            idempotency_key=validated_data['idempotency_key'],
+            payload_hash=validated_data['payload_hash'],
+            score=sum(answer.is_correct for answer in answers),
+            question_count=len(question_set),
+        )
+        for answer in answers:
+            answer.submission = submission
+        SubmissionAnswers.objects.bulk_create(answers, batch_size=500)
+        return submission
+
+
+class SubmissionSerializer(serializers.ModelSerializer):
+    """
+    Serializer for test submissions.
+
+    Fields:
+        id: The unique identifier for the submission, a string (read-only)
+        test: The test that was taken (read-only)
+        score: Number of correctly answered questions (read-only)
+        question_count: Number of questions in the test (read-only)
+        submitted_at: When the answers were submitted (read-only)
+    """
+    id = SnowflakeIdField()
+
+    class Meta:
+        model = Submissions
+        fields = ('id', 'test', 'score', 'question_count', 'submitted_at')
+        read_only_fields = fields
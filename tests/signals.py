@@ -0,0 +1,21 @@
+"""Retire cached question sets when their questions or answers change."""
+from django.db.models.signals import post_delete, post_save
+
+from .models import Answers, Questions
+from .questions import bump_question_set_version
+
+
+def invalidate_for_question(sender, instance, **kwargs):
+    # In the change's own transaction: the new version becomes visible
+    # exactly when the new rows do.
+    bump_question_set_version(pk=instance.test_id)
+
+
+def invalidate_for_answer(sender, instance, **kwargs):
+    bump_question_set_version(questions=instance.question_id)
+
+
+post_save.connect(invalidate_for_question, sender=Questions, dispatch_uid='tests_question_saved')
+post_delete.connect(invalidate_for_question, sender=Questions, dispatch_uid='tests_question_deleted')
+post_save.connect(invalidate_for_answer, sender=Answers, dispatch_uid='tests_answer_saved')
+post_delete.connect(invalidate_for_answer, sender=Answers, dispatch_uid='tests_answer_deleted')
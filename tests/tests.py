@@ -1,3 +1,147 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from users.models import User
+
+from .models import Answers, QuestionType, Questions, SubmissionAnswers, Submissions, Tests
+from .questions import cache_key, get_question_set
+from .serializers import SubmissionCreateSerializer
+
+
+class SubmissionTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='taker@example.com', password='x')
+        cls.test = Tests.objects.create()
+        cls.choice = Questions.objects.create(
+            test=cls.test, question_type=QuestionType.MULTIPLE_CHOICE, text='2 + 2?',
+        )
+        cls.right = Answers.objects.create(question=cls.choice, choice='4', is_correct=True)
+        cls.wrong = Answers.objects.create(question=cls.choice, choice='5')
+        cls.free = Questions.objects.create(
+            test=cls.test, question_type=QuestionType.FREE_TEXT, text='Capital of France?',
+        )
+        Answers.objects.create(question=cls.free, choice='Paris', is_correct=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('tests:submission_list', args=[self.test.pk])
+
+    def submit(self, answers, key='key-1'):
+        return self.client.post(self.url, {'answers': answers}, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def answers(self, choice=None, text='  paris '):
+        return [
+            {'question': self.choice.pk, 'answer': (choice or self.right).pk},
+            {'question': self.free.pk, 'text': text},
+        ]
+
+    def test_scores_multiple_choice_and_normalized_free_text(self):
+        response = self.submit(self.answers())
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual((response.data['score'], response.data['question_count']), (2, 2))
+        self.assertIsInstance(response.data['id'], str)
+
+        response = self.submit(self.answers(choice=self.wrong, text='Lyon'), key='key-2')
+        self.assertEqual(response.data['score'], 0)
+        submission = Submissions.objects.get(pk=response.data['id'])
+        self.assertEqual(
+            sorted(submission.answers.values_list('question_id', 'answer_id', 'text', 'is_correct')),
+            sorted([(self.choice.pk, self.wrong.pk, '', False), (self.free.pk, None, 'Lyon', False)]),
+        )
+
+    def test_unanswered_questions_count_as_wrong(self):
+        response = self.submit(self.answers()[:1])
+        self.assertEqual((response.data['score'], response.data['question_count']), (1, 2))
+
+    def test_retry_replays_the_original_submission(self):
+        first = self.submit(self.answers())
+        self.assertNotIn('Idempotent-Replayed', first)
+        retry = self.submit(self.answers())
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(Submissions.objects.count(), 1)
+        self.assertEqual(SubmissionAnswers.objects.count(), 2)
+
+    def test_reusing_a_key_for_other_answers_is_rejected(self):
+        self.submit(self.answers())
+        response = self.submit(self.answers(choice=self.wrong))
+        self.assertEqual(response.status_code, 422)
+        self.assertIn('error', response.data)
+        self.assertEqual(Submissions.objects.count(), 1)
+
+    def test_key_is_required(self):
+        self.assertEqual(self.submit(self.answers(), key='').status_code, 400)
+        self.assertEqual(self.submit(self.answers(), key='k' * 256).status_code, 400)
+
+    def test_invalid_answers(self):
+        other = Questions.objects.create(
+            test=Tests.objects.create(), question_type=QuestionType.FREE_TEXT, text='?',
+        )
+        response = self.submit([
+            {'question': self.choice.pk, 'answer': 999999},
+            {'question': other.pk, 'text': 'x'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data['answers'][0]), {'answer'})
+        self.assertEqual(set(response.data['answers'][1]), {'question'})
+        self.assertFalse(Submissions.objects.exists())
+
+    def test_lost_race_replays_the_winner(self):
+        winner = self.submit(self.answers(), key='raced')
+        # The existence check ran before the winner committed; the insert
+        # after it.
+        lookups = [Submissions.objects.none(), Submissions.objects.filter(idempotency_key='raced')]
+        with mock.patch.object(Submissions.objects, 'filter', side_effect=lookups):
+            response = self.submit(self.answers(), key='raced')
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(response.data['id'], winner.data['id'])
+
+    def test_lost_race_to_an_invisible_row_is_a_conflict(self):
+        with mock.patch.object(SubmissionCreateSerializer, 'create', side_effect=IntegrityError):
+            response = self.submit(self.answers())
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('error', response.data)
+
+
+class QuestionSetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.test = Tests.objects.create()
+        cls.question = Questions.objects.create(test=cls.test, question_type=QuestionType.FREE_TEXT, text='Q?')
+        cls.answer = Answers.objects.create(question=cls.question, choice='yes', is_correct=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def fresh_test(self):
+        return Tests.objects.get(pk=self.test.pk)
+
+    def test_cached_under_the_current_version(self):
+        test = self.fresh_test()
+        question_set = get_question_set(test)
+        self.assertEqual(cache.get(cache_key(test)), question_set)
+        with self.assertNumQueries(0):
+            get_question_set(test)
+
+    def test_edits_move_every_reader_to_a_new_key(self):
+        test = self.fresh_test()
+        get_question_set(test)
+
+        self.answer.choice = 'absolutely'
+        self.answer.save()
+        edited = self.fresh_test()
+        self.assertGreater(edited.question_set_version, test.question_set_version)
+        self.assertEqual(get_question_set(edited)[self.question.pk].accepted, frozenset({'absolutely'}))
+
+        Questions.objects.create(test=self.test, question_type=QuestionType.FREE_TEXT, text='Another?')
+        self.assertEqual(len(get_question_set(self.fresh_test())), 2)
+
+        self.question.delete()
+        self.assertEqual(len(get_question_set(self.fresh_test())), 1)
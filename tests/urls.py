@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'tests'
+
+urlpatterns = [
+    path('<int:test_id>/', views.TestDetailView.as_view(), name='test_detail'),
+    path('<int:test_id>/submissions/', views.SubmissionListCreateView.as_view(), name='submission_list'),
+]
@@ -1,3 +1,167 @@
-from django.shortcuts import render
+from django.db import IntegrityError
+from django.shortcuts import get_object_or_404
+from django.utils.translation import gettext_lazy as _
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from core.pagination import paginated
+from users.schemas import RESPONSES, get_error_response
+
+from .models import Submissions, Tests
+from .questions import get_question_set
+from .serializers import QuestionSerializer, SubmissionCreateSerializer, SubmissionSerializer
+
+IDEMPOTENCY_KEY_HEADER = openapi.Parameter(
+    'Idempotency-Key',
+    openapi.IN_HEADER,
+    description='Client-generated unique key (e.g. a UUID). Retrying with the same key and answers '
+                'returns the original submission instead of creating another.',
+    type=openapi.TYPE_STRING,
+    required=True,
+)
+
+
+class TestDetailView(APIView):
+    """
+    get:
+    Retrieve a test with its questions and answer choices
+    """
+    permission_classes = (permissions.IsAuthenticated,)
+
+    @swagger_auto_schema(
+        operation_description="Retrieve a test with its questions and answer choices",
+        responses={
+            status.HTTP_200_OK: openapi.Response(
+                description='The test',
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'created_at': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+                        'questions': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(type=openapi.TYPE_OBJECT)
+                        ),
+                    }
+                )
+            ),
+            **{k: v for k, v in RESPONSES.items() if k in ['401_UNAUTHORIZED', '404_NOT_FOUND']}
+        },
+        tags=['Tests']
+    )
+    def get(self, request, test_id):
+        test = get_object_or_404(Tests, pk=test_id)
+        questions = get_question_set(test).values()
+        return Response({
+            'id': test.pk,
+            'created_at': test.created_at,
+            'questions': QuestionSerializer(questions, many=True).data,
+        })
+
+
+class SubmissionListCreateView(generics.ListCreateAPIView):
+    """
+    get:
+    List the authenticated user's submissions for a test
+
+    post:
+    Submit all answers to a test at once
+
+    The answers and the scored submission are written in one transaction.
+    Requests are idempotent per Idempotency-Key header: a retry returns the
+    original submission with an ``Idempotent-Replayed: true`` header.
+    """
+    serializer_class = SubmissionSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_test(self):
+        return get_object_or_404(Tests, pk=self.kwargs['test_id'])
+
+    def get_queryset(self):
+        return Submissions.objects.filter(user=self.request.user, test_id=self.kwargs['test_id'])
+
+    @swagger_auto_schema(
+        operation_description="List the authenticated user's submissions for a test",
+        responses={
+            status.HTTP_200_OK: paginated(SubmissionSerializer)(),
+            **{k: v for k, v in RESPONSES.items() if k in ['401_UNAUTHORIZED']}
+        },
+        tags=['Tests']
+    )
+    def get(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_description="Submit all answers to a test at once",
+        manual_parameters=[IDEMPOTENCY_KEY_HEADER],
+        request_body=SubmissionCreateSerializer,
+        responses={
+            status.HTTP_201_CREATED: SubmissionSerializer(),
+            status.HTTP_400_BAD_REQUEST: get_error_response(
+                'Validation Error',
+                {'answers': ['This list may not be empty.']}
+            ),
+            status.HTTP_409_CONFLICT: get_error_response(
+                'A submission with this Idempotency-Key is still in progress; retry shortly.',
+                {}
+            ),
+            status.HTTP_422_UNPROCESSABLE_ENTITY: get_error_response(
+                'Idempotency-Key was already used for a different submission.',
+                {}
+            ),
+            **{k: v for k, v in RESPONSES.items() if k in ['401_UNAUTHORIZED', '404_NOT_FOUND']}
+        },
+        tags=['Tests']
+    )
+    def post(self, request, *args, **kwargs):
+        test = self.get_test()
+        key = request.headers.get('Idempotency-Key', '').strip()
+        if not key or len(key) > 255:
+            return Response(
+                {'error': _('An Idempotency-Key header of at most 255 characters is required.')},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        payload_hash = SubmissionCreateSerializer.payload_hash(request.data)
+
+        # Replays are answered before validation, so a retry still succeeds
+        # after the test has been edited.
+        existing = Submissions.objects.filter(user=request.user, idempotency_key=key).first()
+        if existing is not None:
+            return self.replay(existing, test, payload_hash)
+
+        serializer = SubmissionCreateSerializer(
+            data=request.data,
+            context={'question_set': get_question_set(test)},
+        )
+        serializer.is_valid(raise_exception=True)
+        try:
+            submission = serializer.save(
+                test=test,
+                user=request.user,
+                idempotency_key=key,
+                payload_hash=payload_hash,
+            )
+        except IntegrityError:
+            # A concurrent request with the same key won the race. Its row
+            # may not be visible yet; the client should retry.
+            existing = Submissions.objects.filter(user=request.user, idempotency_key=key).first()
+            if existing is None:
+                return Response(
+                    {'error': _('A submission with this Idempotency-Key is still in progress; retry shortly.')},
+                    status=status.HTTP_409_CONFLICT
+                )
+            return self.replay(existing, test, payload_hash)
+        return Response(SubmissionSerializer(submission).data, status=status.HTTP_201_CREATED)
+
+    def replay(self, submission, test, payload_hash):
+        if submission.test_id != test.pk or submission.payload_hash != payload_hash:
+            return Response(
+                {'error': _('Idempotency-Key was already used for a different submission.')},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        response = Response(SubmissionSerializer(submission).data, status=status.HTTP_201_CREATED)
+        response['Idempotent-Replayed'] = 'true'
+        return response
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        # simplejwt resolves its backend through this module attribute on
+        # every token, so swapping it here covers auth, refresh and verify.
+        from rest_framework_simplejwt import state
+        from .keys import get_token_backend
+
+        state.token_backend = get_token_backend()
+
+        from . import checks  # noqa: F401
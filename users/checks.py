@@ -0,0 +1,33 @@
+import os
+
+from django.core.checks import Error, register
+
+from .keys import keyring
+
+
+@register()
+def check_signing_keys(app_configs, **kwargs):
+    """Surface a key ring that can't sign tokens at startup, not on the first login."""
+    active, pending = keyring._split()
+    if active:
+        return []
+    if pending:
+        return [Error(
+            f'No JWT signing key in {keyring.key_dir} is active yet; '
+            f'the earliest signs from {pending[0].activates_at:%Y-%m-%d %H:%M:%S} UTC.',
+            hint='Run `manage.py rotate_signing_keys --now`.',
+            id='users.E001',
+        )]
+    # Empty: a bootstrap key is created on first use, if the directory can
+    # be written.
+    existing = os.path.abspath(keyring.key_dir)
+    while not os.path.exists(existing):
+        existing = os.path.dirname(existing)
+    if not os.access(existing, os.W_OK | os.X_OK):
+        return [Error(
+            f'There are no JWT signing keys in {keyring.key_dir} and {existing} is not writable, '
+            'so none can be created.',
+            hint='Make the directory writable, or run `manage.py rotate_signing_keys --now` as its owner.',
+            id='users.E002',
+        )]
+    return []
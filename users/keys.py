@@ -0,0 +1,236 @@
+"""
+Asymmetric JWT signing keys.
+
+Private keys are stored as PEM files in ``JWT_KEYS['KEY_DIR']``, one file per
+key, named ``<kid>.pem``. The kid starts with the key's UTC activation time
+(``YYYYMMDDTHHMMSSZ``), so the schedule is encoded in the file names and no
+separate manifest has to be kept in sync:
+
+* a key is *published* in the JWKS as soon as its file exists, which lets
+  downstream caches pick it up before it starts signing;
+* the newest key whose activation time has passed is the *signing* key;
+* an older key is *retired* once its successor has been active for longer
+  than the refresh token lifetime, i.e. when no token it signed can still be
+  valid.
+
+A key ring with no keys at all gets a bootstrap key on first use, so a fresh
+checkout works without running ``rotate_signing_keys --now`` first. A key
+directory that cannot be written is reported by ``manage.py check``.
+"""
+import logging
+import os
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import cached_property
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+
+KID_TIME_FORMAT = '%Y%m%dT%H%M%SZ'
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    kid: str
+    activates_at: datetime
+    private_key: object
+
+    @cached_property
+    def public_key(self):
+        return self.private_key.public_key()
+
+    def to_jwk(self, algorithm):
+        jwk = jwt.algorithms.get_default_algorithms()[algorithm].to_jwk(
+            self.public_key, as_dict=True
+        )
+        jwk.update(kid=self.kid, use='sig', alg=algorithm)
+        return jwk
+
+
+def generate_key(algorithm, activates_at):
+    """Create a new private key for ``algorithm`` and return ``(kid, pem)``."""
+    if algorithm == 'EdDSA':
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    elif algorithm.startswith(('RS', 'PS')):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        raise ImproperlyConfigured(f'Unsupported JWT signing algorithm: {algorithm}')
+    kid = f'{activates_at.astimezone(timezone.utc):{KID_TIME_FORMAT}}-{secrets.token_hex(2)}'
+    pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+    return kid, pem
+
+
+def write_key(key_dir, kid, pem):
+    """Store a private key as ``<kid>.pem`` in ``key_dir``, readable by the owner only."""
+    os.makedirs(key_dir, mode=0o700, exist_ok=True)
+    fd = os.open(os.path.join(key_dir, f'{kid}.pem'), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(pem)
+
+
+class KeyRing:
+    """
+    In-process cache of the parsed keys in a key directory.
+
+    The directory is re-scanned only when its mtime changes (a key was added
+    or pruned), and at most once per ``check_interval`` seconds.
+    """
+
+    def __init__(self, key_dir, overlap, algorithm='EdDSA', check_interval=1.0):
+        self.key_dir = key_dir
+        self.overlap = overlap
+        self.algorithm = algorithm
+        self.check_interval = check_interval
+        self._keys = []
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        keys = []
+        for name in os.listdir(self.key_dir):
+            kid, ext = os.path.splitext(name)
+            if ext != '.pem':
+                continue
+            try:
+                activates_at = datetime.strptime(kid.split('-')[0], KID_TIME_FORMAT)
+            except ValueError:
+                continue
+            with open(os.path.join(self.key_dir, name), 'rb') as f:
+                private_key = serialization.load_pem_private_key(f.read(), password=None)
+            keys.append(SigningKey(kid, activates_at.replace(tzinfo=timezone.utc), private_key))
+        keys.sort(key=lambda key: key.activates_at)
+        return keys
+
+    def keys(self):
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            with self._lock:
+                try:
+                    mtime = os.stat(self.key_dir).st_mtime_ns
+                except FileNotFoundError:
+                    mtime = None
+                if mtime != self._mtime:
+                    self._keys = self._load() if mtime is not None else []
+                    self._mtime = mtime
+                self._checked_at = now
+        return self._keys
+
+    def _split(self, now=None):
+        """Return ``(active, pending)`` where active is ordered newest first."""
+        now = now or datetime.now(timezone.utc)
+        keys = self.keys()
+        active = [key for key in reversed(keys) if key.activates_at <= now]
+        pending = [key for key in keys if key.activates_at > now]
+        return active, pending
+
+    def signing_key(self):
+        active, pending = self._split()
+        if not active and not pending:
+            self.bootstrap()
+            active, pending = self._split()
+        if not active:
+            raise ImproperlyConfigured(
+                f'No active JWT signing key in {self.key_dir}; '
+                'run `manage.py rotate_signing_keys --now`.'
+            )
+        return active[0]
+
+    def bootstrap(self):
+        """Create a key that signs from now on. Returns its kid."""
+        kid, pem = generate_key(self.algorithm, datetime.now(timezone.utc))
+        write_key(self.key_dir, kid, pem)
+        logger.warning('Created bootstrap JWT signing key %s in %s', kid, self.key_dir)
+        # Re-scan on the next lookup instead of after check_interval.
+        self._checked_at = 0.0
+        return kid
+
+    def retired(self, now=None):
+        """Keys whose successor has been active for longer than the overlap window."""
+        now = now or datetime.now(timezone.utc)
+        active, _pending = self._split(now)
+        return [
+            key for successor, key in zip(active, active[1:])
+            if successor.activates_at + self.overlap <= now
+        ]
+
+    def published(self):
+        """All keys a verifier may encounter: pending, signing and overlapping."""
+        retired = {key.kid for key in self.retired()}
+        return [key for key in self.keys() if key.kid not in retired]
+
+    def get(self, kid):
+        for key in self.published():
+            if key.kid == kid:
+                return key
+        return None
+
+
+keyring = KeyRing(
+    settings.JWT_KEYS['KEY_DIR'],
+    overlap=api_settings.REFRESH_TOKEN_LIFETIME,
+    algorithm=api_settings.ALGORITHM,
+)
+
+
+class KeyRingTokenBackend(TokenBackend):
+    """
+    Token backend that signs with the key ring's current key and stamps the
+    ``kid`` header, and verifies against whichever published key it names.
+    """
+
+    def __init__(self, *args, keyring=keyring, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.keyring = keyring
+
+    def get_verifying_key(self, token):
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError as e:
+            raise TokenBackendError(_('Token is invalid')) from e
+        key = self.keyring.get(kid)
+        if key is None:
+            raise TokenBackendError(_('Token is invalid'))
+        return key.public_key
+
+    def encode(self, payload):
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+
+        key = self.keyring.signing_key()
+        return jwt.encode(
+            jwt_payload,
+            key.private_key,
+            algorithm=self.algorithm,
+            headers={'kid': key.kid},
+            json_encoder=self.json_encoder,
+        )
+
+
+def get_token_backend():
+    return KeyRingTokenBackend(
+        api_settings.ALGORITHM,
+        audience=api_settings.AUDIENCE,
+        issuer=api_settings.ISSUER,
+        leeway=api_settings.LEEWAY,
+        json_encoder=api_settings.JSON_ENCODER,
+    )
@@ -0,0 +1,42 @@
+import os
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users.keys import generate_key, keyring, write_key
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the next JWT signing key and prune retired ones. The new key "
+        "is published immediately and starts signing after JWT_KEYS['ROTATION_LEAD']."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--now',
+            action='store_true',
+            help='Activate the new key immediately (use only to bootstrap an empty key ring).',
+        )
+        parser.add_argument(
+            '--prune-only',
+            action='store_true',
+            help='Only delete retired keys, do not generate a new one.',
+        )
+
+    def handle(self, *args, **options):
+        key_dir = settings.JWT_KEYS['KEY_DIR']
+        os.makedirs(key_dir, mode=0o700, exist_ok=True)
+
+        now = datetime.now(timezone.utc)
+        if not options['prune_only']:
+            activates_at = now if options['now'] else now + settings.JWT_KEYS['ROTATION_LEAD']
+            kid, pem = generate_key(settings.SIMPLE_JWT['ALGORITHM'], activates_at)
+            write_key(key_dir, kid, pem)
+            self.stdout.write(f'Created key {kid} (signs from {activates_at:%Y-%m-%d %H:%M:%S} UTC)')
+
+        keyring.check_interval = 0
+        for key in keyring.retired(now):
+            os.remove(os.path.join(key_dir, f'{key.kid}.pem'))
+            self.stdout.write(f'Pruned retired key {key.kid}')
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='updated at'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Incremented on every save; used as the profile ETag.', verbose_name='version'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_email_lower_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Incremented when a profile field changes; used as the profile ETag.', verbose_name='version'),
+        ),
+    ]
@@ -1,7 +1,14 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.utils.translation import gettext_lazy as _
 
+
+class VersionConflict(Exception):
+    """The row was changed since the version a conditional save expected."""
+
+
 class UserManager(BaseUserManager):
     """Custom user model manager where email is the unique identifier."""
     def create_user(self, email, password=None, **extra_fields):
@@ -47,15 +54,123 @@ class User(AbstractBaseUser, PermissionsMixin):
     )
     date_joined = models.DateTimeField(_('date joined'), auto_now_add=True)
     last_login = models.DateTimeField(_('last login'), auto_now=True)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+    version = models.PositiveIntegerField(
+        _('version'),
+        default=0,
+        editable=False,
+        help_text=_('Incremented when a profile field changes; used as the profile ETag.'),
+    )
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
+    class Meta:
+        indexes = [
+            models.Index(Lower('email'), name='users_user_email_lower_idx'),
+        ]
+
     def __str__(self):
         return self.email
 
+    # The fields of the profile representation (UserSerializer). Only
+    # changes to them bump the version, so saves such as update_last_login
+    # leave clients' cached profiles and If-Match tokens valid.
+    VERSIONED_FIELDS = ('email', 'first_name', 'last_name', 'is_staff')
+
+    # Set by expect_version() for the next save only.
+    _expected_version = None
+    # VERSIONED_FIELDS values as loaded or last saved.
+    _saved_values = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_values = instance._versioned_values()
+        return instance
+
+    def _versioned_values(self):
+        deferred = self.get_deferred_fields()
+        return {name: getattr(self, name) for name in self.VERSIONED_FIELDS if name not in deferred}
+
+    def _versioned_changes(self, update_fields):
+        """Whether this save may change a field of the profile representation."""
+        names = set(self.VERSIONED_FIELDS)
+        if update_fields is not None:
+            names &= set(update_fields)
+        if self._saved_values is None:
+            return bool(names)
+        current = self._versioned_values()
+        return any(
+            name not in self._saved_values or current.get(name) != self._saved_values[name] for name in names
+        )
+
+    def save(self, *args, **kwargs):
+        """
+        Bump the version stamp when a profile field changes, so cached
+        representations are invalidated.
+
+        The bump is done by the database (``version = version + 1``), so two
+        saves of instances loaded at the same version never store the same
+        version. After an unconditional bump the new value is read back.
+        """
+        if self._state.adding:
+            self.version += 1
+            super().save(*args, **kwargs)
+            self._saved_values = self._versioned_values()
+            return
+        update_fields = kwargs.get('update_fields')
+        expected = self._expected_version
+        try:
+            if not self._versioned_changes(update_fields):
+                if update_fields is None:
+                    # updated_at backs Last-Modified, which must agree with
+                    # the ETag.
+                    kwargs['update_fields'] = [
+                        field.name for field in self._meta.concrete_fields
+                        if not field.primary_key and field.name not in ('version', 'updated_at')
+                    ]
+                return super().save(*args, **kwargs)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'version', 'updated_at'}
+            version = self.version
+            self.version = F('version') + 1
+            try:
+                super().save(*args, **kwargs)
+            except Exception:
+                self.version = version
+                raise
+        finally:
+            self._expected_version = None
+        if expected is not None:
+            # The UPDATE only matched the row at the expected version.
+            self.version = expected + 1
+        else:
+            self.refresh_from_db(fields=['version'])
+        self._saved_values = self._versioned_values()
+
+    def expect_version(self, version):
+        """
+        Make the next save conditional: its UPDATE only matches the row while
+        it is still at ``version``, and raises ``VersionConflict`` otherwise.
+        """
+        self._expected_version = version
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        if self._expected_version is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        base_qs = base_qs.filter(version=self._expected_version)
+        if not super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update):
+            raise VersionConflict
+        return True
+
+    @property
+    def etag(self):
+        """Strong ETag for the user's current version."""
+        return f'"{self.pk}-{self.version}"'
+
     def get_full_name(self):
         """Return the first_name plus the last_name, with a space in between."""
         full_name = f'{self.first_name} {self.last_name}'
@@ -1,3 +1,316 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
+from unittest import mock
 
-# Create your tests here.
+import jwt
+from django.contrib.admin import helpers
+from django.core.checks import Error
+from django.db import connection
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.exceptions import TokenBackendError
+
+from .admin import CURSOR_VAR, UserAdmin, batched_update
+from .checks import check_signing_keys
+from .keys import KeyRing, KeyRingTokenBackend, generate_key, keyring, write_key
+from .models import User
+from .serializers import UserSerializer
+
+
+class KeyDirMixin:
+    """Point the process-wide key ring at an empty temporary directory."""
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.key_dir = tmp.name
+        saved = keyring.key_dir, keyring.check_interval
+        keyring.key_dir, keyring.check_interval = self.key_dir, 0
+
+        def restore():
+            keyring.key_dir, keyring.check_interval = saved
+            keyring._mtime = None
+        self.addCleanup(restore)
+
+    def add_key(self, activates_in):
+        kid, pem = generate_key('EdDSA', datetime.now(timezone.utc) + activates_in)
+        write_key(self.key_dir, kid, pem)
+        return kid
+
+
+class KeyRingTests(KeyDirMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ring = KeyRing(self.key_dir, overlap=timedelta(days=1), check_interval=0)
+        self.backend = KeyRingTokenBackend('EdDSA', keyring=self.ring)
+
+    def kid(self, token):
+        return jwt.get_unverified_header(token)['kid']
+
+    def test_signs_with_the_newest_active_key(self):
+        self.add_key(-timedelta(days=3))
+        active = self.add_key(-timedelta(hours=1))
+        self.add_key(timedelta(hours=1))
+        token = self.backend.encode({'sub': '1'})
+        self.assertEqual(self.kid(token), active)
+        self.assertEqual(self.backend.decode(token)['sub'], '1')
+
+    def test_superseded_key_verifies_until_it_retires(self):
+        old = self.add_key(-timedelta(days=3))
+        token = self.backend.encode({'sub': '1'})
+        self.assertEqual(self.kid(token), old)
+
+        self.add_key(-timedelta(hours=1))
+        self.assertNotEqual(self.kid(self.backend.encode({'sub': '2'})), old)
+        self.assertIn(old, [key.kid for key in self.ring.published()])
+        self.assertEqual(self.backend.decode(token)['sub'], '1')
+
+        # The successor has now been active for longer than the overlap.
+        self.add_key(-timedelta(days=2))
+        self.assertEqual([key.kid for key in self.ring.retired()], [old])
+        with self.assertRaises(TokenBackendError):
+            self.backend.decode(token)
+
+    def test_unknown_kid_is_rejected(self):
+        self.add_key(-timedelta(hours=1))
+        other = KeyRing(self.key_dir + '-other', overlap=timedelta(days=1))
+        self.addCleanup(shutil.rmtree, other.key_dir)
+        with self.assertLogs('users.keys', 'WARNING'):
+            token = KeyRingTokenBackend('EdDSA', keyring=other).encode({'sub': '1'})
+        with self.assertRaises(TokenBackendError):
+            self.backend.decode(token)
+        unsigned = jwt.encode({'sub': '1'}, 'a shared secret of at least 32 bytes', algorithm='HS256')
+        with self.assertRaises(TokenBackendError):
+            self.backend.decode(unsigned)
+
+    def test_empty_ring_bootstraps_a_key(self):
+        self.assertEqual(check_signing_keys(None), [])
+        with self.assertLogs('users.keys', 'WARNING'):
+            token = self.backend.encode({'sub': '1'})
+        self.assertEqual([key.kid for key in self.ring.keys()], [self.kid(token)])
+        self.assertEqual(self.backend.decode(token)['sub'], '1')
+
+    def test_check_reports_a_ring_with_only_pending_keys(self):
+        self.add_key(timedelta(hours=1))
+        [error] = check_signing_keys(None)
+        self.assertIsInstance(error, Error)
+        self.assertEqual(error.id, 'users.E001')
+
+
+class JWKSViewTests(KeyDirMixin, APITestCase):
+    def test_publishes_pending_and_overlapping_keys(self):
+        pending = self.add_key(timedelta(hours=1))
+        active = self.add_key(-timedelta(hours=1))
+        overlapping = self.add_key(-timedelta(days=2))
+        self.add_key(-timedelta(days=3))  # Retired: its successor is two days old.
+
+        response = self.client.get(reverse('users:jwks'))
+        self.assertEqual(response.status_code, 200)
+        keys = response.json()['keys']
+        self.assertEqual({key['kid'] for key in keys}, {pending, active, overlapping})
+        self.assertTrue(all(key['alg'] == 'EdDSA' and key['use'] == 'sig' for key in keys))
+        # Half of JWT_KEYS['ROTATION_LEAD'].
+        self.assertEqual(response['Cache-Control'], 'public, max-age=1800')
+
+
+class ProfileConditionalRequestTests(KeyDirMixin, APITestCase):
+    url = reverse('users:user_profile')
+
+    def setUp(self):
+        super().setUp()
+        self.add_key(-timedelta(minutes=1))
+        self.user = User.objects.create_user(email='etag@example.com', password='Str0ngPassw0rd!', first_name='Ann')
+        self.login()
+
+    def login(self):
+        response = self.client.post(
+            reverse('users:token_obtain_pair'),
+            {'email': 'etag@example.com', 'password': 'Str0ngPassw0rd!'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+
+    def get(self, **headers):
+        return self.client.get(self.url, headers=headers)
+
+    def patch(self, data, **headers):
+        return self.client.patch(self.url, data, format='json', headers=headers)
+
+    def test_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        for if_none_match in (etag, f'W/{etag}', f'"other", {etag}', '*'):
+            with self.subTest(if_none_match=if_none_match):
+                response = self.get(if_none_match=if_none_match)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.get(if_none_match='"other"').status_code, 200)
+
+    def test_logging_in_again_keeps_the_etag(self):
+        before = self.get()
+        self.login()
+        self.login()
+        after = self.get(if_none_match=before['ETag'])
+        self.assertEqual(after.status_code, 304)
+        self.assertEqual(after['Last-Modified'], before['Last-Modified'])
+
+    def test_conditional_update_returns_the_new_etag(self):
+        etag = self.get()['ETag']
+        response = self.patch({'first_name': 'Anne'}, if_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['first_name'], 'Anne')
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.get()['ETag'], response['ETag'])
+        self.assertEqual(self.get(if_none_match=response['ETag']).status_code, 304)
+
+    def test_stale_if_match_is_rejected(self):
+        stale = self.get()['ETag']
+        current = self.patch({'first_name': 'Anne'})['ETag']
+        response = self.patch({'first_name': 'Overwritten'}, if_match=stale)
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(response['ETag'], current)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Anne')
+
+    def test_write_racing_the_precondition_check_is_rejected(self):
+        etag = self.get()['ETag']
+        # Another request updates the row between the If-Match check and
+        # this request's UPDATE.
+        original = UserSerializer.update
+
+        def racing_update(serializer, instance, validated_data):
+            User.objects.filter(pk=instance.pk).update(version=F('version') + 1)
+            return original(serializer, instance, validated_data)
+        with mock.patch.object(UserSerializer, 'update', racing_update):
+            response = self.patch({'first_name': 'Lost'}, if_match=etag)
+        self.assertEqual(response.status_code, 412)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Ann')
+
+    def test_version_only_tracks_profile_fields(self):
+        version = self.user.version
+        self.user.is_active = True
+        self.user.set_password('An0therPassw0rd!')
+        self.user.save()
+        self.assertEqual(self.user.version, version)
+        self.user.last_name = 'Smith'
+        with self.assertNumQueries(2):  # The UPDATE, and reading the new version back.
+            self.user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.version, version + 1)
+
+
+class UserAdminTests(TestCase):
+    url = reverse('admin:users_user_changelist')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(email='admin@example.com', password='x')
+        cls.users = [
+            User.objects.create_user(email=email, password='x')
+            for email in ('Alice@example.com', 'alicia@example.com', 'bob@example.com', 'al@example.com')
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        patcher = mock.patch.object(UserAdmin, 'list_per_page', 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def changelist(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl']
+
+    def emails(self, changelist):
+        return [user.email for user in changelist.result_list]
+
+    def test_keyset_pages_walk_every_user_once(self):
+        pages, params = [], {}
+        while True:
+            changelist = self.changelist(**params)
+            pages.append(self.emails(changelist))
+            if changelist.next_page_url is None:
+                break
+            params = {CURSOR_VAR: changelist.next_cursor}
+            self.assertIn(f'{CURSOR_VAR}={changelist.next_cursor}', changelist.next_page_url)
+        expected = [user.email for user in User.objects.order_by('-pk')]
+        self.assertEqual(pages, [expected[:2], expected[2:4], expected[4:]])
+        self.assertTrue(changelist.multi_page)
+        self.assertNotIn(CURSOR_VAR, changelist.first_page_url)
+        # Unfiltered lists are counted from the highest primary key.
+        self.assertEqual(changelist.result_count, User.objects.order_by('-pk').first().pk)
+
+    def test_cursor_combines_with_filters(self):
+        bob = User.objects.get(email='bob@example.com')
+        changelist = self.changelist(**{CURSOR_VAR: bob.pk, 'is_staff__exact': '0'})
+        self.assertEqual(self.emails(changelist), ['alicia@example.com', 'Alice@example.com'])
+        self.assertEqual(changelist.result_count, 4)
+        self.assertEqual(self.changelist(**{CURSOR_VAR: 'not-a-pk'}).cursor, None)
+
+    def test_search_is_a_case_insensitive_email_prefix(self):
+        cases = {
+            'ALI': ['alicia@example.com', 'Alice@example.com'],
+            '  alice@ ': ['Alice@example.com'],
+            'al': ['al@example.com', 'alicia@example.com', 'Alice@example.com'],
+            'lice': [],
+            'admin@example.com': ['admin@example.com'],
+        }
+        for term, emails in cases.items():
+            with self.subTest(term=term), mock.patch.object(UserAdmin, 'list_per_page', 10):
+                self.assertEqual(self.emails(self.changelist(q=term)), emails)
+
+    def test_delete_selected_is_not_offered(self):
+        response = self.client.get(self.url)
+        actions = [name for name, _label in response.context['action_form'].fields['action'].choices]
+        self.assertNotIn('delete_selected', actions)
+        self.assertIn('deactivate_users', actions)
+
+    def test_deactivate_skips_the_acting_admin(self):
+        response = self.client.post(self.url, {
+            'action': 'deactivate_users',
+            helpers.ACTION_CHECKBOX_NAME: [self.admin.pk, self.users[0].pk, self.users[1].pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            set(User.objects.filter(is_active=False).values_list('pk', flat=True)), {self.users[0].pk, self.users[1].pk},
+        )
+
+
+class BatchedUpdateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create([User(email=f'user{i}@example.com') for i in range(5)])
+
+    def test_updates_every_row_in_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            updated = batched_update(User.objects.all(), batch_size=2, is_active=False)
+        self.assertEqual(updated, 5)
+        self.assertFalse(User.objects.filter(is_active=True).exists())
+        updates = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 3)
+
+    def test_only_updates_the_queryset(self):
+        queryset = User.objects.filter(email__in=['user1@example.com', 'user3@example.com'])
+        self.assertEqual(batched_update(queryset, batch_size=1, first_name='Batched'), 2)
+        self.assertEqual(
+            sorted(User.objects.filter(first_name='Batched').values_list('email', flat=True)),
+            ['user1@example.com', 'user3@example.com'],
+        )
+
+    def test_versions_bump_only_for_profile_fields(self):
+        versions = dict(User.objects.values_list('pk', 'version'))
+        batched_update(User.objects.all(), is_active=False)
+        self.assertEqual(dict(User.objects.values_list('pk', 'version')), versions)
+        batched_update(User.objects.all(), is_staff=True)
+        self.assertEqual(
+            dict(User.objects.values_list('pk', 'version')), {pk: version + 1 for pk, version in versions.items()},
+        )
@@ -15,6 +15,7 @@ urlpatterns = [
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('token/verify/', TokenVerifyView.as_view(), name='token_verify'),
     path('logout/', views.LogoutView.as_view(), name='logout'),
+    path('jwks/', views.JWKSView.as_view(), name='jwks'),
     
     # User profile endpoints
     path('profile/', views.UserProfileView.as_view(), name='user_profile'),
@@ -0,0 +1,51 @@
+"""
+Local verification of access tokens for downstream services.
+
+Depends only on PyJWT (with ``cryptography``), so other services can vendor
+or import it without Django. The key set is fetched from ``/api/auth/jwks/``
+once per ``lifespan`` seconds; parsed keys are cached by kid, and an unknown
+kid triggers a single refetch, so steady-state verification makes no calls
+to the auth service.
+
+    verifier = JWKSVerifier('https://auth.example.com/api/auth/jwks/')
+    claims = verifier.verify(request.headers['Authorization'].split()[1])
+"""
+import jwt
+
+
+class JWKSVerifier:
+    def __init__(self, jwks_url, algorithms=('EdDSA', 'RS256'), audience=None,
+                 issuer=None, lifespan=1800, leeway=0):
+        self.client = jwt.PyJWKClient(
+            jwks_url,
+            cache_keys=True,
+            cache_jwk_set=True,
+            lifespan=lifespan,
+        )
+        self.algorithms = list(algorithms)
+        self.audience = audience
+        self.issuer = issuer
+        self.leeway = leeway
+
+    def verify(self, token, token_type='access'):
+        """
+        Return the claims of a valid token of ``token_type``.
+
+        Raises ``jwt.InvalidTokenError`` (or a subclass) otherwise.
+        """
+        try:
+            signing_key = self.client.get_signing_key_from_jwt(token)
+        except jwt.PyJWKClientError as e:
+            raise jwt.InvalidTokenError(str(e)) from e
+        claims = jwt.decode(
+            token,
+            signing_key.key,
+            algorithms=self.algorithms,
+            audience=self.audience,
+            issuer=self.issuer,
+            leeway=self.leeway,
+            options={'verify_aud': self.audience is not None},
+        )
+        if token_type is not None and claims.get('token_type') != token_type:
+            raise jwt.InvalidTokenError('Token has wrong type')
+        return claims
@@ -3,16 +3,22 @@ from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
 from django.utils.translation import gettext_lazy as _
 from drf_yasg.utils import swagger_auto_schema
-import openapi
+from drf_yasg import openapi
 
 from .serializers import (
     UserSerializer,
     RegisterSerializer,
     CustomTokenObtainPairSerializer as TokenObtainPairSerializer,
 )
+from .keys import keyring
+from .models import VersionConflict
 from .schemas import (
     get_token_response_schema,
     RESPONSES,
@@ -91,12 +97,17 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
         operation_description="Retrieve the authenticated user's profile",
         responses={
             status.HTTP_200_OK: UserSerializer(),
+            status.HTTP_304_NOT_MODIFIED: 'Not Modified (If-None-Match / If-Modified-Since)',
             **{k: v for k, v in RESPONSES.items() if k in ['401_UNAUTHORIZED', '403_FORBIDDEN']}
         },
         tags=['User Profile']
     )
     def get(self, request, *args, **kwargs):
-        return super().retrieve(request, *args, **kwargs)
+        user = self.get_object()
+        if self.is_not_modified(request, user):
+            # Skip serialization entirely; the client's copy is current.
+            return self.set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), user)
+        return self.set_validators(super().retrieve(request, *args, **kwargs), user)
         
     @swagger_auto_schema(
         operation_description="Update the authenticated user's profile",
@@ -107,6 +118,7 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
                 'Validation Error',
                 {'field_name': ['Error message']}
             ),
+            status.HTTP_412_PRECONDITION_FAILED: 'Precondition Failed (If-Match does not match the current ETag)',
             **{k: v for k, v in RESPONSES.items() if k in ['401_UNAUTHORIZED', '403_FORBIDDEN']}
         },
         tags=['User Profile']
@@ -123,6 +135,7 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
                 'Validation Error',
                 {'field_name': ['Error message']}
             ),
+            status.HTTP_412_PRECONDITION_FAILED: 'Precondition Failed (If-Match does not match the current ETag)',
             **{k: v for k, v in RESPONSES.items() if k in ['401_UNAUTHORIZED', '403_FORBIDDEN']}
         },
         tags=['User Profile']
@@ -131,8 +144,64 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
         return super().partial_update(request, *args, **kwargs)
 
     def get_object(self):
+        if self.request.method in ('PUT', 'PATCH'):
+            return User.objects.get(pk=self.request.user.pk)
         return self.request.user
 
+    @transaction.atomic
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        user = self.get_object()
+        if not self.matches_precondition(request, user):
+            return self.precondition_failed(user)
+        serializer = self.get_serializer(user, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        if request.META.get('HTTP_IF_MATCH'):
+            # The check above may be stale by now: the write itself is an
+            # UPDATE ... WHERE version = <checked version>, which matches no
+            # row if another write got in first.
+            user.expect_version(user.version)
+        try:
+            with transaction.atomic():
+                self.perform_update(serializer)
+        except VersionConflict:
+            return self.precondition_failed(User.objects.get(pk=user.pk))
+        return self.set_validators(Response(serializer.data), user)
+
+    def precondition_failed(self, user):
+        return self.set_validators(
+            Response(
+                {"error": _("Precondition Failed")},
+                status=status.HTTP_412_PRECONDITION_FAILED
+            ),
+            user
+        )
+
+    def is_not_modified(self, request, user):
+        """Evaluate If-None-Match (weak comparison) or, failing that, If-Modified-Since."""
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            etags = [etag.removeprefix('W/') for etag in parse_etags(if_none_match)]
+            return '*' in etags or user.etag in etags
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE'))
+        return (
+            if_modified_since is not None
+            and int(user.updated_at.timestamp()) <= if_modified_since
+        )
+
+    def matches_precondition(self, request, user):
+        """Evaluate If-Match (strong comparison); absent header always matches."""
+        if_match = request.META.get('HTTP_IF_MATCH')
+        if not if_match:
+            return True
+        etags = parse_etags(if_match)
+        return '*' in etags or user.etag in etags
+
+    def set_validators(self, response, user):
+        response['ETag'] = user.etag
+        response['Last-Modified'] = http_date(user.updated_at.timestamp())
+        return response
+
 
 class LogoutView(APIView):
     """
@@ -235,4 +304,43 @@ class CustomTokenObtainPairView(generics.GenericAPIView):
         serializer.is_valid(raise_exception=True)
         return Response(serializer.validated_data, status=status.HTTP_200_OK)
 
+
+class JWKSView(APIView):
+    """
+    get:
+    Public JSON Web Key Set
+
+    Returns the public keys used to sign access and refresh tokens, so other
+    services can verify tokens locally instead of calling token/verify/.
+    """
+    authentication_classes = ()
+    permission_classes = (permissions.AllowAny,)
+
+    @swagger_auto_schema(
+        operation_description="Public keys for verifying issued JWTs (RFC 7517)",
+        responses={
+            status.HTTP_200_OK: openapi.Response(
+                description='JSON Web Key Set',
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'keys': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(type=openapi.TYPE_OBJECT)
+                        )
+                    }
+                )
+            )
+        },
+        tags=['Authentication']
+    )
+    def get(self, request):
+        algorithm = settings.SIMPLE_JWT['ALGORITHM']
+        response = Response({'keys': [key.to_jwk(algorithm) for key in keyring.published()]})
+        # Verifiers may cache the set for half the rotation lead time and
+        # still see a new key before it starts signing.
+        max_age = int(settings.JWT_KEYS['ROTATION_LEAD'].total_seconds() // 2)
+        patch_cache_control(response, public=True, max_age=max_age)
+        return response
+
 # Create your views here.
\ No newline at end of file